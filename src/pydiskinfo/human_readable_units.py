@@ -22,6 +22,10 @@ CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
+from bisect import bisect_left, bisect_right
+from functools import lru_cache, partial
+from typing import Callable, Iterable, List
+
 UNITS = { '': 1,
           'K': 1_000, 
           'M': 1_000_000, 
@@ -50,6 +54,108 @@ class ReadableUnitError(Exception):
         self.status = status
 
 
+def _percent_format(decimal_places: int, suffix: str) -> Callable[[float], str]:
+    # % formatting is quicker than str.format, which counts over a million values
+    return ("%." + str(decimal_places) + "f" + suffix.replace("%", "%%")).__mod__
+
+
+class UnitScale:
+    """A series of units, each base times the one before it, for formatting 
+    values with the largest unit they exceed.
+
+    The thresholds between the units are computed once, and a unit is chosen 
+    by bisecting them, or from the bit length of an int when base is 1024. 
+    %-format strings are made once for each number of decimal places. 
+    inclusive chooses a unit once a value reaches it, rather than exceeds 
+    it. The base unit is shown with base_decimal_places."""
+
+    def __init__(self, 
+                 units: tuple, 
+                 base: int, 
+                 inclusive: bool = False, 
+                 separator: str = '', 
+                 base_decimal_places: int = 0
+                 ) -> None:
+        self.units = units
+        self.base = base
+        self._inclusive = inclusive
+        self._separator = separator
+        self._base_decimal_places = base_decimal_places
+        self._top = len(units) - 1
+        self._divisors = tuple(pow(base, power) for power in range(len(units)))
+        self._thresholds = list(self._divisors[1:])
+        self._bisect = bisect_right if inclusive else bisect_left
+        self._bit_length = base == 1_024
+        self._formats = {}
+
+    def formats(self, decimal_places: int) -> tuple:
+        """A function formatting a float for each unit."""
+        formats = self._formats.get(decimal_places)
+        if formats is None:
+            formats = self._formats[decimal_places] = tuple(
+                _percent_format(self._base_decimal_places if index == 0 else decimal_places, 
+                                self._separator + unit)
+                for index, unit in enumerate(self.units))
+        return formats
+
+    def index(self, value: float) -> int:
+        """The index of the unit to show value with."""
+        if self._bit_length and type(value) is int and value > 1:
+            # 1024 ** n takes 10 * n + 1 bits
+            index = ((value if self._inclusive else value - 1).bit_length() - 1) // 10
+            return index if index < self._top else self._top
+        # there are only as many thresholds as units above the first
+        return self._bisect(self._thresholds, value)
+
+    def format(self, value: float, decimal_places: int = 2) -> str:
+        index = self.index(value)
+        return self.formats(decimal_places)[index](value / self._divisors[index])
+
+    def format_many(self, values: Iterable, decimal_places: int = 2) -> List[str]:
+        """Format a sequence of values in one call. A numpy array has its 
+        units chosen and its values scaled by numpy."""
+        formats = self.formats(decimal_places)
+        if type(values).__module__ == 'numpy':
+            return self._format_array(values, formats)
+        if not isinstance(values, (list, tuple)):
+            values = list(values)
+        divisors = self._divisors
+        # bisecting in C beats the bit length in Python, over a whole list
+        indexes = map(partial(self._bisect, self._thresholds), values)
+        return [formats[each_index](value / divisors[each_index]) 
+                for value, each_index in zip(values, indexes)]
+
+    def _format_array(self, values: 'numpy.ndarray', formats: tuple) -> List[str]:
+        import numpy
+        values = numpy.asarray(values, dtype=float).ravel()
+        indexes = numpy.searchsorted(numpy.array(self._thresholds, dtype=float), values, 
+                                     side='right' if self._inclusive else 'left')
+        scaled = values / numpy.array(self._divisors, dtype=float)[indexes]
+        return [formats[each_index](value) 
+                for each_index, value in zip(indexes.tolist(), scaled.tolist())]
+
+
+# the units human_readable_units chooses from, by value_type
+SCALES = {
+    'B': UnitScale(('B', 'KB', 'MB', 'GB', 'TB', 'PB'), 1_000),
+    'M': UnitScale(('', 'K', 'M', 'G', 'T', 'P'), 1_000),
+    'I': UnitScale(('B', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB'), 1_024),
+}
+
+
+def _decimal_places(decimal_places: int) -> int:
+    if type(decimal_places) != int or decimal_places < 0 or decimal_places > 9:
+        return 2
+    return decimal_places
+
+
+@lru_cache(maxsize=None)
+def _unit_format(unit: str, decimal_places: int) -> Callable[[float], str]:
+    if unit == 'B' or unit == '':
+        decimal_places = 0
+    return _percent_format(decimal_places, unit)
+
+
 def human_readable_units(value: int, 
                          unit: str = 'auto', 
                          value_type: str = 'B', 
@@ -69,36 +175,29 @@ def human_readable_units(value: int,
 
        Will raise a ReadableUnitError if passed the wrong value in unit
     """
+    decimal_places = _decimal_places(decimal_places)
     if unit == 'auto':
-        if value_type == 'M':
-            for each_unit in ('P', 'T', 'G', 'M', 'K', ''):
-                return_value = value/UNITS[each_unit]
-                return_unit = each_unit
-                if return_value > 1:
-                    break            
-        elif value_type == 'I':
-            for each_unit in ('PiB', 'TiB', 'GiB', 'MiB', 'KiB', 'B'):
-                return_value = value/UNITS[each_unit]
-                return_unit = each_unit
-                if return_value > 1:
-                    break
-        else:
-            for each_unit in ('PB', 'TB', 'GB', 'MB', 'KB', 'B'):
-                return_value = value/UNITS[each_unit]
-                return_unit = each_unit
-                if return_value > 1:
-                    break        
-    else:
-        return_unit = unit
-        try:
-            return_value = value/UNITS[unit]
-        except KeyError:
-            raise ReadableUnitError
-    if type(decimal_places) != int or decimal_places < 0 or decimal_places > 9:
-        decimal_places = 2
-    if return_unit == 'B' or return_unit =='':
-        decimal_places = 0
-    format_string = "{:." + str(decimal_places) + "f}{}"
-    return format_string.format(return_value, return_unit)
+        return SCALES.get(value_type, SCALES['B']).format(value, decimal_places)
+    try:
+        divisor = UNITS[unit]
+    except KeyError:
+        raise ReadableUnitError(f"unknown unit {unit}", -1)
+    return _unit_format(unit, decimal_places)(value / divisor)
 
 
+def human_readable_units_batch(values: Iterable[int], 
+                               unit: str = 'auto', 
+                               value_type: str = 'B', 
+                               decimal_places: int=2
+                               ) -> List[str]:
+    """Converts a sequence of ints, or a numpy array, to strings with units, 
+    as human_readable_units does for each."""
+    decimal_places = _decimal_places(decimal_places)
+    if unit == 'auto':
+        return SCALES.get(value_type, SCALES['B']).format_many(values, decimal_places)
+    try:
+        divisor = UNITS[unit]
+    except KeyError:
+        raise ReadableUnitError(f"unknown unit {unit}", -1)
+    unit_format = _unit_format(unit, decimal_places)
+    return [unit_format(value / divisor) for value in values]
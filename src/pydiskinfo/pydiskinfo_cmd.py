@@ -23,10 +23,112 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
 import argparse
+import functools
+import json
+import sys
+from typing import Callable, Iterator, List
 
 from pydiskinfo import System, PhysicalDisk, Partition, LogicalDisk
 from human_readable_units import human_readable_units
 
+# The property characters of each level, with the key of the property each one shows and how it
+# is shown as text. Characters that aren't properties (P, L and D) choose which levels are listed.
+PHYSICAL_DISK_PROPERTIES = {
+    's': ('Size', lambda value: f'Size: {human_readable_units(value)}'),
+    'S': ('Size', lambda value: f'Size: {value}'),
+    'i': ('Disk Number', lambda value: f'Disk Number: {value}'),
+    'd': ('Device I.D.', lambda value: f'Device I.D.: {value}'),
+    'p': ('Path', lambda value: f'Path: {value}'),
+    't': ('Media Type', lambda value: f'Media Type: {value}'),
+    'n': ('Serial Number', lambda value: f'Serical Number: {value}'),
+    'm': ('Model', lambda value: f'Model: {value}'),
+    'c': ('Sectors', lambda value: f'Sectors: {value}'),
+    'b': ('Bytes per Sector', lambda value: f'Bytes per Sector: {value}'),
+    'h': ('Heads', lambda value: f'Heads: {value}'),
+    'C': ('Cylinders', lambda value: f'Cylinders: {value}'),
+    'f': ('Firmware Version', lambda value: f'Firmware: {value}'),
+    'I': ('Interface Type', lambda value: f'Interface Type: {value}'),
+    'M': ('Media Loaded', lambda value: f'Media is {"" if value else "not "}Loaded'),
+    'a': ('Status', lambda value: f'Status: {value}'),
+}
+
+PARTITION_PROPERTIES = {
+    'b': ('Blocksize', lambda value: f'Blocksize: {value}'),
+    'B': ('Bootable', lambda value: f'is {"" if value else "not "}bootable'),
+    'o': ('Boot Partition',
+          lambda value: f'is {"" if value else "not "}the active boot partition'),
+    'x': ('Description', lambda value: f'Description: {value}'),
+    'p': ('Path', lambda value: f'Path: {value}'),
+    'd': ('Device I.D.', lambda value: f'Device I.D.: {value}'),
+    'i': ('Disk Number', lambda value: f'Disk Number: {value}'),
+    'N': ('Partition Number', lambda value: f'Partition Number: {value}'),
+    'c': ('Number of Blocks', lambda value: f'Blocks: {value}'),
+    'r': ('Primary Partition', lambda value: f'is {"" if value else "not "}a primary partition'),
+    's': ('Size', lambda value: f'Size: {human_readable_units(value)}'),
+    'S': ('Size', lambda value: f'Size: {value}'),
+    'e': ('Starting Offset', lambda value: f'Offset: {value}'),
+    't': ('Type', lambda value: f'Type: {value}'),
+}
+
+LOGICAL_DISK_PROPERTIES = {
+    'x': ('Description', lambda value: f'Description: {value}'),
+    'd': ('Device I.D.', lambda value: f'Device I.D.: {value}'),
+    't': ('Drive Type', lambda value: f'Type: {value}'),
+    'f': ('File System', lambda value: f'File System: {value}'),
+    'F': ('Free Space', lambda value: f'Free Space: {human_readable_units(value)}'),
+    'U': ('Maximum Component Length', lambda value: f'Max Component Length: {value}'),
+    'v': ('Name', lambda value: f'Logical Disk Name: {value}'),
+    'p': ('Path', lambda value: f'Path: {value}'),
+    's': ('Size', lambda value: f'Size: {human_readable_units(value)}'),
+    'S': ('Size', lambda value: f'Size: {value}'),
+    'V': ('Volume Name', lambda value: f'Volume Name: {value}'),
+    'n': ('Volume Serial Number', lambda value: f'Volume Serial Number: {value}'),
+}
+
+LEVELS = {
+    'Physical Disk': PHYSICAL_DISK_PROPERTIES,
+    'Partition': PARTITION_PROPERTIES,
+    'Logical Disk': LOGICAL_DISK_PROPERTIES,
+}
+
+
+def _formatter(key: str, text: Callable[[object], str]) -> Callable[[dict], str]:
+    def formatter(element: dict) -> str:
+        return text(element[key])
+    return formatter
+
+
+def compile_properties(properties: str, table: dict) -> List[Callable[[dict], str]]:
+    """Compile a string of property characters into a list of formatters, 
+    each rendering one property of an element as text, in the order given."""
+    return [_formatter(*table[each_property]) for each_property in properties 
+            if each_property in table]
+
+
+class Renderer:
+    """Renders the elements of one level (physical disks, partitions or 
+    logical disks), with the chosen properties compiled once."""
+
+    def __init__(self, level: str, properties: str) -> None:
+        table = LEVELS[level]
+        self._prefix = level + ': '
+        self._formatters = compile_properties(properties, table)
+        # each key once, for the json output
+        self.keys = list(dict.fromkeys(table[each_property][0] for each_property in properties 
+                                       if each_property in table))
+
+    def text(self, element: dict) -> str:
+        return self._prefix + ', '.join([formatter(element) for formatter in self._formatters])
+
+    def fields(self, element: dict) -> dict:
+        return {key: element[key] for key in self.keys}
+
+
+@functools.lru_cache(maxsize=None)
+def renderer(level: str, properties: str) -> Renderer:
+    return Renderer(level, properties)
+
+
 def str_system(system: System) -> str:
     """Returns a string representation of the system consisting of the 
     properties chosen on the command line."""
@@ -38,110 +140,111 @@ def str_system(system: System) -> str:
 def str_physical_disk(physical_disk: PhysicalDisk, properties: str) -> str:
     """Returns a string representation of the physical disk consisting of the 
     properties chosen on the command line."""
-    strings = []
-    sanitized_properties = [property for property in properties if property in set(properties)]
-    for each_property in sanitized_properties:
-        if each_property == 's':
-            strings.append(f'Size: {human_readable_units(physical_disk["Size"])}')
-        elif each_property == 'S':
-            strings.append(f'Size: {physical_disk["Size"]}')
-        elif each_property == 'i':
-            strings.append(f'Disk Number: {physical_disk["Disk Number"]}')
-        elif each_property == 'd':
-            strings.append(f'Device I.D.: {physical_disk["Device I.D."]}')
-        elif each_property == 'p':
-            strings.append(f'Path: {physical_disk["Path"]}')
-        elif each_property == 't':
-            strings.append(f'Media Type: {physical_disk["Media Type"]}')
-        elif each_property == 'n':
-            strings.append(f'Serical Number: {physical_disk["Serial Number"]}')
-        elif each_property == 'm':
-            strings.append(f'Model: {physical_disk["Model"]}')
-        elif each_property == 'c':
-            strings.append(f'Sectors: {physical_disk["Sectors"]}')
-        elif each_property == 'b':
-            strings.append(f'Bytes per Sector: {physical_disk["Bytes per Sector"]}')
-        elif each_property == 'h':
-            strings.append(f'Heads: {physical_disk["Heads"]}')
-        elif each_property == 'C':
-            strings.append(f'Cylinders: {physical_disk["Cylinders"]}')
-        elif each_property == 'f':
-            strings.append(f'Firmware: {physical_disk["Firmware Version"]}')
-        elif each_property == 'I':
-            strings.append(f'Interface Type: {physical_disk["Interface Type"]}')
-        elif each_property == 'M':
-            strings.append(f'Media is {"" if physical_disk["Media Loaded"] else "not "}Loaded')
-        elif each_property == 'a':
-            strings.append(f'Status: {physical_disk["Status"]}')
-    return 'Physical Disk: ' + ', '.join(strings)
+    return renderer('Physical Disk', properties).text(physical_disk)
 
 def str_partition(partition: Partition, properties: str) -> str:
     """Returns a string representation of the partition consisting of the 
     properties chosen on the command line."""
-    strings = []
-    sanitized_properties = [property for property in properties if property in set(properties)]
-    for each_property in sanitized_properties:
-        if each_property == 'b':
-            strings.append(f'Blocksize: {partition["Blocksize"]}')
-        elif each_property == 'B':
-            strings.append(f'is {"" if partition["Bootable"] else "not "}bootable')
-        elif each_property == 'o':
-            strings.append(f'is {"" if partition["Boot Partition"] else "not "}the active boot partition')
-        elif each_property == 'x':
-            strings.append(f'Description: {partition["Description"]}')
-        elif each_property == 'p':
-            strings.append(f'Path: {partition["Path"]}')
-        elif each_property == 'd':
-            strings.append(f'Device I.D.: {partition["Device I.D."]}')
-        elif each_property == 'i':
-            strings.append(f'Disk Number: {partition["Disk Number"]}')
-        elif each_property == 'N':
-            strings.append(f'Partition Number: {partition["Partition Number"]}')
-        elif each_property == 'c':
-            strings.append(f'Blocks: {partition["Number of Blocks"]}')
-        elif each_property == 'r':
-            strings.append(f'is {"" if partition["Primary Partition"] else "not "}a primary partition')
-        elif each_property == 's':
-            strings.append(f'Size: {human_readable_units(partition["Size"])}')
-        elif each_property == 'S':
-            strings.append(f'Size: {partition["Size"]}')
-        elif each_property == 'e':
-            strings.append(f'Offset: {partition["Starting Offset"]}')
-        elif each_property == 't':
-            strings.append(f'Type: {partition["Type"]}')
-    return 'Partition: ' + ', '.join(strings)
+    return renderer('Partition', properties).text(partition)
 
 def str_logical_disk(logical_disk: LogicalDisk, properties: str) -> str:
     """Returns a string representation of the logical disk consisting of the 
     properties chosen on the command line."""
-    strings = []
-    sanitized_properties = [property for property in properties if property in set(properties)]
-    for each_property in sanitized_properties:
-        if each_property == 'x':
-            strings.append(f'Description: {logical_disk["Description"]}')
-        elif each_property == 'd':
-            strings.append(f'Device I.D.: {logical_disk["Device I.D."]}')
-        elif each_property == 't':
-            strings.append(f'Type: {logical_disk["Drive Type"]}')
-        elif each_property == 'f':
-            strings.append(f'File System: {logical_disk["File System"]}')
-        elif each_property == 'F':
-            strings.append(f'Free Space: {human_readable_units(logical_disk["Free Space"])}')
-        elif each_property == 'U':
-            strings.append(f'Max Component Length: {logical_disk["Maximum Component Length"]}')
-        elif each_property == 'v':
-            strings.append(f'Logical Disk Name: {logical_disk["Name"]}')
-        elif each_property == 'p':
-            strings.append(f'Path: {logical_disk["Path"]}')
-        elif each_property == 's':
-            strings.append(f'Size: {human_readable_units(logical_disk["Size"])}')
-        elif each_property == 'S':
-            strings.append(f'Size: {logical_disk["Size"]}')
-        elif each_property == 'V':
-            strings.append(f'Volume Name: {logical_disk["Volume Name"]}')
-        elif each_property == 'n':
-            strings.append(f'Volume Serial Number: {logical_disk["Volume Serial Number"]}')
-    return 'Logical Disk: ' + ', '.join(strings)
+    return renderer('Logical Disk', properties).text(logical_disk)
+
+
+# the elements listed at the top, for each view
+VIEWS = {
+    'disks': 'Physical Disks',
+    'logical disks': 'Logical Disks',
+}
+
+
+def walk(system: System, view: str, dp: str, pp: str, lp: str) -> Iterator[tuple]:
+    """Yield a tree for each element listed at the top of a view, as soon 
+    as it has been parsed. A tree is (renderer, element, children), where 
+    children is a list of (key, tree or list of trees). 
+    
+    Disks are yielded as they are discovered. Listing logical disks has to wait for the whole system, as a 
+    logical disk can span disks."""
+    disk_renderer = renderer('Physical Disk', dp)
+    partition_renderer = renderer('Partition', pp)
+    logical_disk_renderer = renderer('Logical Disk', lp)
+
+    def logical_disk_trees(partition):
+        return [(logical_disk_renderer, logical_disk, []) 
+                for logical_disk in partition['Logical Disks']]
+
+    if view == 'disks':
+        for each_disk in system.discover():
+            children = []
+            if 'P' in dp:
+                children.append(('Partitions', [
+                    (partition_renderer, partition, 
+                     [('Logical Disks', logical_disk_trees(partition))] if 'L' in pp else [])
+                    for partition in each_disk['Partitions']]))
+            yield disk_renderer, each_disk, children
+    else:
+        for _each_disk in system.discover():
+            pass
+        for each_logical_disk in system['Logical Disks']:
+            children = []
+            if 'P' in lp:
+                children.append(('Partitions', [
+                    (partition_renderer, partition, 
+                     [('Physical Disk', (disk_renderer, partition['Physical Disk'], []))] 
+                     if 'D' in pp else [])
+                    for partition in each_logical_disk['Partitions']]))
+            yield logical_disk_renderer, each_logical_disk, children
+
+
+def _tree_lines(tree: tuple, depth: int) -> Iterator[str]:
+    tree_renderer, element, children = tree
+    yield '  ' * depth + tree_renderer.text(element)
+    for _key, child in children:
+        for each_tree in (child if isinstance(child, list) else [child]):
+            yield from _tree_lines(each_tree, depth + 1)
+
+
+def _tree_object(tree: tuple) -> dict:
+    tree_renderer, element, children = tree
+    fields = tree_renderer.fields(element)
+    for key, child in children:
+        if isinstance(child, list):
+            fields[key] = [_tree_object(each_tree) for each_tree in child]
+        else:
+            fields[key] = _tree_object(child)
+    return fields
+
+
+def render(system: System, view: str = 'disks', dp: str = 'Pipts', pp: str = 'LDdtse', 
+           lp: str = 'PpVtfF', output_format: str = 'text') -> Iterator[str]:
+    """Render a view of the system in the given format, yielding the text 
+    for each element at the top of the view as soon as it is parsed.
+
+    text: a line for the system, then an indented line for each element.
+    json: one document, of the system and its elements.
+    ndjson: a json object for each element at the top of the view, naming 
+    the system it is on."""
+    trees = walk(system, view, dp, pp, lp)
+    if output_format == 'text':
+        yield str_system(system)
+        for each_tree in trees:
+            yield '\n'.join(_tree_lines(each_tree, 1))
+    elif output_format == 'ndjson':
+        for each_tree in trees:
+            element = {'System': system['Name']}
+            element.update(_tree_object(each_tree))
+            yield json.dumps(element, default=str)
+    else:
+        header = json.dumps({'Name': system['Name'], 'Type': system['Type']})
+        # the document is written as the elements come, so it can't be built and dumped whole
+        yield f'{header[:-1]}, {json.dumps(VIEWS[view])}: ['
+        separator = ''
+        for each_tree in trees:
+            yield separator + json.dumps(_tree_object(each_tree), default=str)
+            separator = ','
+        yield ']}'
 
 
 def main():
@@ -187,8 +290,8 @@ Default: -pp LDdtse
 
     L   List logical disks under each partition. The logical disk properties 
         will be listed according to the -lp option.
-    D   Show the physical disk the partition is part of. Ignored unless -l is 
-        specified.
+    D   Show the physical disk the partition is part of. Ignored unless -l or 
+        -p is specified.
     b   Show blocksize.
     B   Show if partition is bootable.
     o   Show if partition is the active boot partition.
@@ -271,25 +374,23 @@ normal behaviour.
         type=str,
         help='Add a system name, if you need to differentiate between outputs.'
     )
+    argument_parser.add_argument(
+        '-f',
+        '--format',
+        choices=['text', 'json', 'ndjson'],
+        default='text',
+        help='Output format. ndjson gives a json object per line for each element listed.'
+    )
     args = vars(argument_parser.parse_args())
-    system = System()
-    print(str_system(system))
-    if args['l']:
-        for each_logical_disk in system['Logical Disks']:
-            print(f'  {str_logical_disk(each_logical_disk, args["lp"])}')
-            if 'P' in args['lp']:
-                for each_partition in each_logical_disk['Partitions']:
-                    print(f'    {str_partition(each_partition, args["pp"])}')
-                    if 'D' in args['pp']:
-                        print(f'      {str_physical_disk(each_partition["Physical Disk"], args["dp"])}')
-    else:
-        for each_physical_disk in system['Physical Disks']:
-            print(f'  {str_physical_disk(each_physical_disk, args["dp"])}')
-            if 'P' in args['dp']:
-                for each_partition in each_physical_disk["Partitions"]:
-                    print(f'    {str_partition(each_partition, args["pp"])}')
-                    if 'L' in args['pp']:
-                        for each_logical_disk in each_partition["Logical Disks"]:
-                            print(f'      {str_logical_disk(each_logical_disk, args["lp"])}')
+    system_args = {'parse': False}
+    if args['n']:
+        system_args['name'] = args['n']
+    system = System(**system_args)
+    view = 'logical disks' if args['l'] else 'disks'
+    # the system is parsed as it's written out, so the first disks show up right away
+    for each_block in render(system, view, args['dp'], args['pp'], args['lp'], args['format']):
+        sys.stdout.write(each_block + '\n')
+        sys.stdout.flush()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,186 @@
+"""pydiskinfo Linux block device and mount scanning
+
+Copyright (c) 2022 Lars Henrik Ericson
+
+Permission is hereby granted, free of charge, to any person obtaining
+a copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be
+included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import re
+from typing import Iterator
+
+# sysfs gives sizes and offsets in 512 byte sectors, whatever the sector size of the device
+SECTOR_SIZE = 512
+
+_DISK_ATTRIBUTES = ('dev', 'size', 'removable')
+_QUEUE_ATTRIBUTES = ('logical_block_size', 'rotational')
+_DEVICE_ATTRIBUTES = ('model', 'vendor', 'serial', 'rev', 'firmware_rev', 'state')
+_PARTITION_ATTRIBUTES = ('dev', 'partition', 'start', 'size')
+_INTERFACE_PREFIXES = (('nvme', "NVMe"), ('vd', "VirtIO"), ('xvd', "Xen"), ('mmcblk', "MMC"))
+_MOUNTINFO_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+
+def read_file(path: str) -> str:
+    """Return the stripped contents of a sysfs or procfs file, or "" if it can't be read."""
+    try:
+        with open(path, 'r') as file:
+            return file.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+
+def parse_udev_data(text: str) -> dict:
+    """Return the properties (E:KEY=value lines) of a udev database entry."""
+    properties = {}
+    for line in text.splitlines():
+        if line.startswith('E:'):
+            key, _, value = line[2:].partition('=')
+            properties[key] = value
+    return properties
+
+
+def _list_dir(path: str) -> set:
+    try:
+        return set(os.listdir(path))
+    except OSError:
+        return set()
+
+
+def _to_int(text: str, default: int = 0) -> int:
+    try:
+        return int(text)
+    except ValueError:
+        return default
+
+
+def _read_attributes(directory: str, names: tuple, present: set) -> dict:
+    """Read the named files of a directory, only opening those the listing says exist."""
+    return {name: read_file(os.path.join(directory, name)) if name in present else ""
+            for name in names}
+
+
+def _natural_key(name: str) -> tuple:
+    # sdz comes before sdaa, as the kernel hands them out
+    return len(name), name
+
+
+def _interface_type(name: str, device_path: str) -> str:
+    if '/usb' in device_path:
+        return "USB"
+    for prefix, interface_type in _INTERFACE_PREFIXES:
+        if name.startswith(prefix):
+            return interface_type
+    return "SCSI"
+
+
+def _read_partition(partition_dir: str, udev_dir: str) -> dict:
+    attributes = _read_attributes(partition_dir, _PARTITION_ATTRIBUTES,
+                                  set(_PARTITION_ATTRIBUTES))
+    return {
+        'name': os.path.basename(partition_dir),
+        'devno': attributes['dev'],
+        'number': _to_int(attributes['partition'], -1),
+        'start': _to_int(attributes['start']) * SECTOR_SIZE,
+        'size': _to_int(attributes['size']) * SECTOR_SIZE,
+        'udev': parse_udev_data(read_file(os.path.join(udev_dir, f"b{attributes['dev']}"))),
+    }
+
+
+def iter_block_devices(root: str = '/') -> Iterator[dict]:
+    """Read every physical disk, and its partitions, from one pass over <root>/sys/block.
+
+    A disk is a block device with a device link, so loop, ram, device-mapper and md devices
+    are left out. Each directory is listed once, and only the files it holds are read. The
+    udev database (<root>/run/udev/data) is read for partition types and filesystem labels
+    when it is there. Sizes and offsets are converted to bytes. Yields a dict per disk, as it
+    is read, in kernel name order.
+    """
+    sys_block = os.path.join(root, 'sys', 'block')
+    udev_dir = os.path.join(root, 'run', 'udev', 'data')
+    for name in sorted(_list_dir(sys_block), key=_natural_key):
+        disk_dir = os.path.join(sys_block, name)
+        present = _list_dir(disk_dir)
+        if 'device' not in present:
+            continue
+        attributes = _read_attributes(disk_dir, _DISK_ATTRIBUTES, present)
+        queue = _read_attributes(os.path.join(disk_dir, 'queue'), _QUEUE_ATTRIBUTES,
+                                 _list_dir(os.path.join(disk_dir, 'queue')))
+        device = _read_attributes(os.path.join(disk_dir, 'device'), _DEVICE_ATTRIBUTES,
+                                  _list_dir(os.path.join(disk_dir, 'device')))
+        try:
+            # /sys/block/<name> links to the device's place in the bus hierarchy
+            device_path = os.readlink(disk_dir)
+        except OSError:
+            device_path = ""
+        partitions = [_read_partition(os.path.join(disk_dir, child), udev_dir)
+                      for child in sorted(present, key=_natural_key)
+                      if child.startswith(name) and child != name]
+        yield {
+            'name': name,
+            'devno': attributes['dev'],
+            'interface_type': _interface_type(name, device_path),
+            'size': _to_int(attributes['size']) * SECTOR_SIZE,
+            'removable': attributes['removable'] == '1',
+            'logical_block_size': _to_int(queue['logical_block_size'], SECTOR_SIZE),
+            'rotational': queue['rotational'] == '1',
+            'model': device['model'],
+            'vendor': device['vendor'],
+            'serial': device['serial'],
+            'firmware': device['rev'] or device['firmware_rev'],
+            'state': device['state'],
+            'partitions': partitions,
+        }
+
+
+def read_block_devices(root: str = '/') -> list:
+    """Read every physical disk, and its partitions. See iter_block_devices."""
+    return list(iter_block_devices(root))
+
+
+def _unescape(field: str) -> str:
+    # mountinfo escapes spaces, tabs, newlines and backslashes as octal (\040)
+    if '\\' not in field:
+        return field
+    return _MOUNTINFO_ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse_mountinfo(text: str) -> list:
+    """Parse the lines of a /proc/<pid>/mountinfo file into a dict per mount."""
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split(' ')
+        try:
+            separator = fields.index('-', 6)
+            mounts.append({
+                'devno': fields[2],
+                'root': _unescape(fields[3]),
+                'mount_point': _unescape(fields[4]),
+                'options': fields[5],
+                'fs_type': fields[separator + 1],
+                'source': _unescape(fields[separator + 2]),
+            })
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def read_mounts(root: str = '/') -> list:
+    """Read the mounts of this process's mount namespace."""
+    return parse_mountinfo(read_file(os.path.join(root, 'proc', 'self', 'mountinfo')))
@@ -22,6 +22,8 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
+import os
+
 from human_readable_units import human_readable_units
 
 class LogicalDisk(dict):
@@ -55,8 +57,43 @@ class LogicalDisk(dict):
 
 
 class LinuxLogicalDisk(LogicalDisk):
-    def __init__(self, system: object) -> None:
+    """Subclass of LogicalDisk for a mount point, read from /proc/self/mountinfo"""
+    def __init__(self, mount: dict, system: 'System', root: str = "/") -> None:
         super().__init__(system)
+        self._set_device_id_and_path_and_name(mount)
+        self._set_file_system(mount)
+        self._set_space(os.path.join(root, self['Path'].lstrip("/")))
+        self['Description'] = mount.get('source', "")
+
+    def _set_device_id_and_path_and_name(self, mount: dict) -> None:
+        """The mount point is the device I.D., name and path of a mount."""
+        self['Device I.D.'] = mount.get('mount_point', "")
+        self['Name'] = self['Device I.D.']
+        self['Path'] = self['Device I.D.']
+
+    def _set_file_system(self, mount: dict) -> None:
+        self['File System'] = mount.get('fs_type', "unknown")
+
+    def _set_space(self, path: str) -> None:
+        """Set size, free space and max file name length from statvfs of the mount point.
+        Free space is what an unprivileged user can use, as df shows it."""
+        try:
+            stat = os.statvfs(path)
+        except OSError:
+            return
+        self['Size'] = stat.f_blocks * stat.f_frsize
+        self['Free Space'] = stat.f_bavail * stat.f_frsize
+        self['Maximum Component Length'] = stat.f_namemax
+
+    def set_disk(self, disk: 'PhysicalDisk', udev: dict) -> None:
+        """Set the drive type from the disk holding the filesystem, and the volume name and
+        serial from its udev properties."""
+        if disk['Media Type'] == "Removable Media":
+            self['Drive Type'] = "Removable Disk"
+        else:
+            self['Drive Type'] = "Local Disk"
+        self['Volume Name'] = udev.get('ID_FS_LABEL', "")
+        self['Volume Serial Number'] = udev.get('ID_FS_UUID', "")
 
 class WindowsLogicalDisk(LogicalDisk):
     _DRIVETYPES = [ 'Unknown', 
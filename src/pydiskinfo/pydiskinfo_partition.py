@@ -49,14 +49,12 @@ class Partition(dict):
         self['Size'] = 0
         self['Starting Offset'] = -1
         self['Type'] = ""
+        self._logical_disk_ids = set()
 
     def add_logical_disk(self, logical_disk: 'LogicalDisk') -> None:
         """Set the logical disk connected to this partition."""
-        new_logical_disk = True
-        for each_logical_disk in self['Logical Disks']:
-            if each_logical_disk['Device I.D.'] == logical_disk['Device I.D.']:
-                new_logical_disk = False
-        if new_logical_disk:
+        if logical_disk['Device I.D.'] not in self._logical_disk_ids:
+            self._logical_disk_ids.add(logical_disk['Device I.D.'])
             self['Logical Disks'].append(logical_disk)
 
     def __str__(self) -> str:
@@ -71,8 +69,58 @@ class Partition(dict):
 
 
 class LinuxPartition(Partition):
-    def __init__(self, disk: 'PhysicalDisk') -> None:
+    """Subclass of Partition built from a partition read from /sys/block. The partition
+    table details come from the udev database, when there is one."""
+    def __init__(self, partition: dict, disk: 'PhysicalDisk') -> None:
         super().__init__(disk)
+        self['Disk Number'] = disk['Disk Number']
+        self['Blocksize'] = disk['Bytes per Sector']
+        self._set_device_id_and_path(partition)
+        self._set_partition_number(partition)
+        self._set_size_and_offset(partition)
+        self._set_table_entry(partition)
+
+    def _set_device_id_and_path(self, partition: dict) -> None:
+        try:
+            self['Device I.D.'] = partition['name']
+            self['Path'] = "/dev/" + partition['name']
+        except KeyError:
+            self['Device I.D.'] = ""
+            self['Path'] = ""
+
+    def _set_partition_number(self, partition: dict) -> None:
+        try:
+            self['Partition Number'] = int(partition['number'])
+        except (KeyError, ValueError):
+            self['Partition Number'] = -1
+
+    def _set_size_and_offset(self, partition: dict) -> None:
+        """Set size and starting offset in bytes, and the size in blocks."""
+        try:
+            self['Size'] = int(partition['size'])
+            self['Starting Offset'] = int(partition['start'])
+        except (KeyError, ValueError):
+            self['Size'] = 0
+            self['Starting Offset'] = -1
+        if self['Blocksize'] > 0:
+            self['Number of Blocks'] = self['Size'] // self['Blocksize']
+
+    def _set_table_entry(self, partition: dict) -> None:
+        """Set type, description, and the bootable and primary flags from the partition
+        table entry."""
+        udev = partition.get('udev', {})
+        table = udev.get('ID_PART_ENTRY_SCHEME', "")
+        self['Type'] = udev.get('ID_PART_ENTRY_TYPE', "")
+        self['Description'] = ": ".join(part for part in (table.upper(),
+                                                          udev.get('ID_PART_ENTRY_NAME', ""))
+                                        if part)
+        try:
+            self['Bootable'] = int(udev.get('ID_PART_ENTRY_FLAGS', "0"), 16) & 0x80 != 0
+        except ValueError:
+            self['Bootable'] = False
+        # only dos partition tables have extended and logical partitions
+        self['Primary Partition'] = (table != "dos"
+                                     or 0 < self['Partition Number'] <= 4)
 
 class WindowsPartition(Partition):
     def __init__(self, partition: 'wmi._wmi_object', disk: 'PhysicalDisk') -> None:
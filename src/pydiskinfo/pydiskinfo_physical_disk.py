@@ -59,9 +59,70 @@ class PhysicalDisk(dict):
                       for partition in self['Partitions']]
         return "\n".join( (disk, *partitions, "" ) )
 
+    def add_partition(self, partition: 'Partition') -> None:
+        """add a Partition object to the disk."""
+        self['Partitions'].append(partition)
+
+
 class LinuxPhysicalDisk(PhysicalDisk):
-    def __init__(self, system: object) -> None:
+    """Subclass of PhysicalDisk built from a disk read from /sys/block"""
+    def __init__(self, disk: dict, disk_number: int, system: object) -> None:
         super().__init__(system)
+        self['Disk Number'] = disk_number
+        self._set_size(disk)
+        self._set_device_id_and_path(disk)
+        self._set_media_type(disk)
+        self._set_identity(disk)
+        self._set_geometry(disk)
+        self._set_interface_type(disk)
+        self._set_status(disk)
+
+    def _set_size(self, disk: dict) -> None:
+        """set size of disk in bytes."""
+        try:
+            self['Size'] = int(disk['size'])
+        except (KeyError, ValueError):
+            self['Size'] = -1
+
+    def _set_device_id_and_path(self, disk: dict) -> None:
+        """The kernel name is the device I.D., and the device node the path."""
+        try:
+            self['Device I.D.'] = disk['name']
+            self['Path'] = "/dev/" + disk['name']
+        except KeyError:
+            self['Device I.D.'] = ""
+            self['Path'] = ""
+
+    def _set_media_type(self, disk: dict) -> None:
+        """Use the media type names windows does."""
+        if disk.get('removable', False):
+            self['Media Type'] = "Removable Media"
+        else:
+            self['Media Type'] = "Fixed hard disk media"
+
+    def _set_identity(self, disk: dict) -> None:
+        self['Model'] = " ".join(part for part in (disk.get('vendor', ""), disk.get('model', ""))
+                                 if part)
+        self['Serial Number'] = disk.get('serial', "")
+        self['Firmware Version'] = disk.get('firmware', "")
+
+    def _set_geometry(self, disk: dict) -> None:
+        """Set bytes per sector and the number of sectors. Heads and cylinders mean nothing
+        to the kernel, and are left at 0."""
+        try:
+            self['Bytes per Sector'] = int(disk['logical_block_size'])
+            self['Sectors'] = self['Size'] // self['Bytes per Sector']
+        except (KeyError, ValueError, ZeroDivisionError):
+            self['Bytes per Sector'] = -1
+            self['Sectors'] = -1
+
+    def _set_interface_type(self, disk: dict) -> None:
+        self['Interface Type'] = disk.get('interface_type', "")
+
+    def _set_status(self, disk: dict) -> None:
+        """A removable drive without media has a size of 0."""
+        self['Media Loaded'] = self['Size'] > 0
+        self['Status'] = disk.get('state', "")
 
 
 class WindowsPhysicalDisk(PhysicalDisk):
@@ -82,10 +143,6 @@ class WindowsPhysicalDisk(PhysicalDisk):
         self._set_interface_type(wmi_physical_disk)
         self._set_media_loaded(wmi_physical_disk)
         self._set_status(wmi_physical_disk)
-        
-    def add_partition(self, partition: 'Partition') -> None:
-        """add a Partition object to the disk."""
-        self['Partitions'].append(partition)
 
     def _set_size(self, wmi_physical_disk: 'wmi._wmi_object') -> None:
         """set size of disk in bytes."""
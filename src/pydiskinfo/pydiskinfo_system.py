@@ -22,20 +22,14 @@ TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-from human_readable_units import human_readable_units
 import sys
+from typing import Iterator
 
-
-from human_readable_units import UNITS, human_readable_units
-from pydiskinfo_logical_disk import LogicalDisk
-from pydiskinfo_partition import Partition
-from pydiskinfo_physical_disk import PhysicalDisk
-
-if sys.platform == 'win32':
-    import wmi
-    from pydiskinfo_logical_disk import WindowsLogicalDisk
-    from pydiskinfo_partition import WindowsPartition
-    from pydiskinfo_physical_disk import WindowsPhysicalDisk
+from pydiskinfo_linux import iter_block_devices, read_mounts
+from pydiskinfo_logical_disk import LogicalDisk, LinuxLogicalDisk, WindowsLogicalDisk
+from pydiskinfo_partition import Partition, LinuxPartition, WindowsPartition
+from pydiskinfo_physical_disk import PhysicalDisk, LinuxPhysicalDisk, WindowsPhysicalDisk
+from pydiskinfo_wmi import LiveWMIProvider, WMIProvider, associations
 
 
 class DiskInfoParseError(Exception):
@@ -61,10 +55,13 @@ class System(dict):
     access information based on physical drives, partitions on those drives, 
     and volumes(windows) or mount points(linux). """
 
-    def __new__(cls, name: str = "System"):
-        """If on windows, create a WIndowsSystem object instead."""
+    def __new__(cls, *args, **kwargs):
+        """If on windows, create a WIndowsSystem object instead. Subclasses 
+        are created as they are."""
         created_object = None
-        if sys.platform == "win32":
+        if cls is not System:
+            created_object = super().__new__(cls)
+        elif sys.platform == "win32":
             created_object =  super().__new__(WindowsSystem)
         elif sys.platform == "linux":
             created_object =  super().__new__(LinuxSystem)
@@ -72,17 +69,75 @@ class System(dict):
             created_object = System
         return created_object
 
-    def __init__(self, name: str = "System") -> None:
+    def __init__(self, name: str = "System", parse: bool = True) -> None:
+        """Unless parse is False, the system is parsed here. Otherwise it is 
+        parsed as discover() is iterated over."""
         self['Name'] = name
         self['Type'] = "generic"
         self['Physical Disks'] = []
         self['Partitions'] = []
         self['Logical Disks'] = []
-        self._parse_system()
+        # the lists above indexed by their keys, so the backends can link 
+        # the objects together without searching the lists
+        self.disks_by_number = {}
+        self.partitions_by_id = {}
+        self.logical_disks_by_id = {}
+        self._discovery = self._discover()
+        if parse:
+            self._parse_system()
+
+    def add_physical_disk(self, disk: PhysicalDisk) -> None:
+        """Add a physical disk to the system."""
+        self['Physical Disks'].append(disk)
+        self.disks_by_number[disk['Disk Number']] = disk
+
+    def add_partition(self, partition: Partition) -> Partition:
+        """Add a partition to the system, unless it has one with the same 
+        device I.D. already. Returns the partition the system has."""
+        existing_partition = self.partitions_by_id.get(partition['Device I.D.'])
+        if existing_partition is not None:
+            return existing_partition
+        self['Partitions'].append(partition)
+        self.partitions_by_id[partition['Device I.D.']] = partition
+        return partition
+
+    def add_logical_disk(self, logical_disk: LogicalDisk) -> LogicalDisk:
+        """Add a logical disk to the system, unless it has one with the same 
+        device I.D. already. Returns the logical disk the system has."""
+        existing_logical_disk = self.logical_disks_by_id.get(logical_disk['Device I.D.'])
+        if existing_logical_disk is not None:
+            return existing_logical_disk
+        self['Logical Disks'].append(logical_disk)
+        self.logical_disks_by_id[logical_disk['Device I.D.']] = logical_disk
+        return logical_disk
+
+    def discover(self) -> Iterator[PhysicalDisk]:
+        """Yield each physical disk as soon as it has been parsed, with its 
+        partitions and their logical disks. Disks parsed already are 
+        yielded first, and the rest of the system is parsed along the way."""
+        position = 0
+        while True:
+            if position < len(self['Physical Disks']):
+                yield self['Physical Disks'][position]
+                position += 1
+            elif self._discovery is None:
+                return
+            else:
+                try:
+                    next(self._discovery)
+                except StopIteration:
+                    self._discovery = None
 
     def _parse_system(self) -> None:
-        """To be overloaded by subclasses"""
-        pass
+        """Parse all of the system"""
+        for _each_disk in self.discover():
+            pass
+
+    def _discover(self) -> Iterator[PhysicalDisk]:
+        """To be overloaded by subclasses: parse the system, yielding each 
+        physical disk after adding it and linking up its partitions and 
+        logical disks."""
+        return iter(())
 
     def __str__(self) -> str:
         system = ", ".join(("System name: {}".format(self['Name']), 
@@ -95,8 +150,56 @@ class System(dict):
 
 
 class LinuxSystem(System):
-    def _parse_system(self) -> None:
-        pass
+    """This is an inherited version of the System class, for linux.
+
+    The disks and partitions are read in one pass over /sys/block, and the 
+    logical disks are the mounts in /proc/self/mountinfo of filesystems on 
+    those disks. root is where sys, proc and run are found, so a copy of 
+    them can be parsed."""
+
+    # mounted here, a partition is the one the system boots from
+    _BOOT_MOUNT_POINTS = ("/boot", "/boot/efi", "/efi")
+
+    def __init__(self, name: str = "Linux System", parse: bool = True, 
+                 root: str = "/") -> None:
+        self._root = root
+        super().__init__(name, parse)
+        self['Type'] = "Linux"
+
+    def _discover(self) -> Iterator[PhysicalDisk]:
+        """Parse the system, a disk at a time"""
+        # a mount point mounted over again shows the last mount
+        mounts = {}
+        for each_mount in read_mounts(self._root):
+            mounts[each_mount['mount_point']] = each_mount
+        # mountinfo refers to the filesystem's device by major:minor
+        mounts_by_devno = {}
+        for each_mount in mounts.values():
+            mounts_by_devno.setdefault(each_mount['devno'], []).append(each_mount)
+        for disk_number, each_disk in enumerate(iter_block_devices(self._root)):
+            disk = LinuxPhysicalDisk(each_disk, disk_number, self)
+            self.add_physical_disk(disk)
+            # a filesystem can be on a disk without a partition table
+            self._add_mounts(mounts_by_devno.get(each_disk['devno'], []), disk, None, {})
+            for each_partition in each_disk['partitions']:
+                partition = self.add_partition(LinuxPartition(each_partition, disk))
+                disk.add_partition(partition)
+                self._add_mounts(mounts_by_devno.get(each_partition['devno'], []), disk, 
+                                 partition, each_partition['udev'])
+            yield disk
+
+    def _add_mounts(self, mounts: list, disk: PhysicalDisk, partition: Partition, 
+                    udev: dict) -> None:
+        """Add a logical disk for each mount of a disk or partition"""
+        for each_mount in mounts:
+            logical_disk = self.add_logical_disk(LinuxLogicalDisk(each_mount, self, self._root))
+            logical_disk.set_disk(disk, udev)
+            if partition is not None:
+                logical_disk.add_partition(partition)
+                partition.add_logical_disk(logical_disk)
+                if logical_disk['Path'] in self._BOOT_MOUNT_POINTS:
+                    partition['Boot Partition'] = True
+
 
 class WindowsSystem(System):
     """This is an inherited version of the System class.
@@ -104,43 +207,49 @@ class WindowsSystem(System):
     This class will take care of the special cases when the module is runnning 
     on windows."""
 
-    def __init__(self, name: str = "Windows System") -> None:
-        super().__init__(name)
+    def __init__(self, name: str = "Windows System", parse: bool = True, 
+                 provider: WMIProvider = None) -> None:
+        """provider answers the WMI queries. By default WMI itself is 
+        queried, through the wmi module."""
+        self._provider = provider
+        super().__init__(name, parse)
         self['Type'] = "Microsoft Windows"  
 
-    def _parse_system(self) -> None:
-        """Parse the system"""
-        try:
-            cursor = wmi.WMI()            
-        except wmi.x_access_denied as err:
-            raise DiskInfoParseError from err
-        except wmi.x_wmi_authentication as err:
-            raise DiskInfoParseError from err
-        for each_disk in cursor.Win32_DiskDrive():
+    def _discover(self) -> Iterator[PhysicalDisk]:
+        """Parse the system, a disk at a time.
+        
+        Each class of objects and associations is read in one query, and 
+        they are joined here, rather than asking WMI for the associators of 
+        each disk and partition."""
+        if self._provider is None:
+            try:
+                self._provider = LiveWMIProvider()
+            except PermissionError as err:
+                raise DiskInfoParseError(str(err), -1) from err
+        provider = self._provider
+        wmi_partitions = {record['DeviceID']: record
+                          for record in provider.query('Win32_DiskPartition')}
+        wmi_logical_disks = {record['DeviceID']: record
+                             for record in provider.query('Win32_LogicalDisk')}
+        partitions_on_disk = associations(provider.query('Win32_DiskDriveToDiskPartition'))
+        logical_disks_on_partition = associations(
+            provider.query('Win32_LogicalDiskToPartition'))
+        for each_disk in provider.query('Win32_DiskDrive'):
             disk = WindowsPhysicalDisk(each_disk, self)
-            self['Physical Disks'].append(disk)
-            for each_partition in each_disk.associators('Win32_DiskDriveToDiskPartition'):
-                partition = WindowsPartition(each_partition, disk)
-                new_partition = True
-                for each_existing_partition in self['Partitions']:
-                    if each_existing_partition['Device I.D.'] == partition['Device I.D.']:
-                        partition = each_existing_partition
-                        new_partition = False
-                        break
+            self.add_physical_disk(disk)
+            for partition_id in partitions_on_disk.get(each_disk['DeviceID'], []):
+                if partition_id not in wmi_partitions:
+                    continue
+                partition = self.add_partition(WindowsPartition(wmi_partitions[partition_id], 
+                                                                disk))
                 disk.add_partition(partition)
-                if new_partition:
-                    self['Partitions'].append(partition)
-                for each_logical_disk in each_partition.associators('Win32_LogicalDiskToPartition'):
-                    logical_disk = WindowsLogicalDisk(each_logical_disk, self)
-                    new_logical_disk = True
-                    for each_existing_logical_disk in self['Logical Disks']:
-                        if each_existing_logical_disk['Device I.D.'] == logical_disk['Device I.D.']:
-                            logical_disk = each_existing_logical_disk
-                            new_logical_disk = False
-                            break
-                    if new_logical_disk:
-                        self['Logical Disks'].append(logical_disk)
+                for logical_disk_id in logical_disks_on_partition.get(partition_id, []):
+                    if logical_disk_id not in wmi_logical_disks:
+                        continue
+                    logical_disk = self.logical_disks_by_id.get(logical_disk_id)
+                    if logical_disk is None:
+                        logical_disk = self.add_logical_disk(
+                            WindowsLogicalDisk(wmi_logical_disks[logical_disk_id], self))
                     logical_disk.add_partition(partition)
-                    partition.add_logical_disk(logical_disk)                  
-        
-
+                    partition.add_logical_disk(logical_disk)
+            yield disk
@@ -0,0 +1,135 @@
+"""pydiskinfo WMI providers: where the windows backend gets its data from
+
+Copyright (c) 2022 Lars Henrik Ericson
+
+Permission is hereby granted, free of charge, to any person obtaining
+a copy of this software and associated documentation files (the
+"Software"), to deal in the Software without restriction, including
+without limitation the rights to use, copy, modify, merge, publish,
+distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to
+the following conditions:
+
+The above copyright notice and this permission notice shall be
+included in all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+
+import json
+import re
+
+# every class the windows backend reads, each in a single query
+WMI_CLASSES = ('Win32_DiskDrive',
+               'Win32_DiskPartition',
+               'Win32_LogicalDisk',
+               'Win32_DiskDriveToDiskPartition',
+               'Win32_LogicalDiskToPartition')
+
+# the key of an object path: ...Win32_DiskPartition.DeviceID="Disk #0, Partition #0"
+_REFERENCE_KEY = re.compile(r'\.DeviceID="((?:[^"\\]|\\.)*)"$')
+_ESCAPE = re.compile(r'\\(.)')
+
+
+class WMIRecord(dict):
+    """The properties of a WMI object, readable as attributes as well,
+    like the objects of the wmi module."""
+
+    def __getattr__(self, name: str) -> object:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def reference_key(path: str) -> str:
+    """Return the DeviceID in the object path a reference property holds."""
+    match = _REFERENCE_KEY.search(path or "")
+    if match is None:
+        return ""
+    key = match.group(1)
+    return _ESCAPE.sub(r'\1', key) if '\\' in key else key
+
+
+def associations(records: list) -> dict:
+    """Group the instances of an association class by the DeviceID of
+    their antecedent. Returns {antecedent: [dependent, ...]}, in query
+    order."""
+    associated = {}
+    # a disk's path is repeated for each of its partitions
+    keys = {}
+    for record in records:
+        antecedent = keys.get(record['Antecedent'])
+        if antecedent is None:
+            antecedent = keys[record['Antecedent']] = reference_key(record['Antecedent'])
+        associated.setdefault(antecedent, []).append(reference_key(record['Dependent']))
+    return associated
+
+
+class WMIProvider:
+    """Answers queries for all instances of a WMI class.
+
+    round_trips counts the queries made, which is what takes the time with
+    real WMI."""
+
+    def __init__(self) -> None:
+        self.round_trips = 0
+
+    def query(self, wmi_class: str) -> list:
+        """Return a WMIRecord for each instance of wmi_class."""
+        self.round_trips += 1
+        return self._query(wmi_class)
+
+    def _query(self, wmi_class: str) -> list:
+        """To be overloaded by subclasses"""
+        return []
+
+
+class LiveWMIProvider(WMIProvider):
+    """Queries WMI through the wmi module.
+
+    Raises PermissionError if WMI can't be connected to."""
+
+    def __init__(self, wmi_module: object = None) -> None:
+        super().__init__()
+        if wmi_module is None:
+            import wmi as wmi_module
+        try:
+            self._cursor = wmi_module.WMI()
+        except (wmi_module.x_access_denied, wmi_module.x_wmi_authentication) as err:
+            raise PermissionError(str(err)) from err
+
+    def _query(self, wmi_class: str) -> list:
+        # wmi_property reads the raw value, so references stay object paths
+        # rather than each being fetched as an object
+        return [WMIRecord((name, instance.wmi_property(name).value)
+                          for name in instance.properties)
+                for instance in getattr(self._cursor, wmi_class)()]
+
+
+class RecordedWMIProvider(WMIProvider):
+    """Answers queries from a dataset recorded by record_dataset, so the
+    windows backend can run anywhere."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        with open(path, 'r') as file:
+            self._dataset = json.load(file)
+
+    def _query(self, wmi_class: str) -> list:
+        return [WMIRecord(record) for record in self._dataset.get(wmi_class, [])]
+
+
+def record_dataset(provider: WMIProvider, path: str) -> None:
+    """Save the answers of a provider to every query the windows backend
+    makes, for a RecordedWMIProvider."""
+    with open(path, 'w') as file:
+        json.dump({wmi_class: provider.query(wmi_class) for wmi_class in WMI_CLASSES},
+                  file, indent=1)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import time
 import argparse
@@ -7,6 +8,9 @@ import argparse
 from quickscan import Devices
 from quickscan.common.enums import ReportFormat, LogLevel
 from quickscan.common.filter import ObjectFilter
+from quickscan.common.report import report_writer
+from quickscan.common.instrument import instrumentation
+from quickscan.common import defaults
 import logging
 
 
@@ -19,7 +23,7 @@ logging.basicConfig(
 
 def main(args: argparse.Namespace) -> None:
 
-    ok_to_run, reasons = Devices.can_run()
+    ok_to_run, reasons = Devices.can_run(args.root)
     if not ok_to_run:
         print('Error: Unable to start')
         print('\n'.join(reasons))
@@ -27,27 +31,90 @@ def main(args: argparse.Namespace) -> None:
 
     dev_filter = None
     if args.filter:
-        dev_filter = ObjectFilter(args.filter)
+        dev_filter = ObjectFilter(args.filter, aliases=Devices.filter_aliases)
         if not dev_filter.valid:
             logger.error('invalid filter provided, ignored')
             dev_filter = None
 
+    # JSON records can be limited to some fields (text reports always show the same columns)
+    fields = None
+    if args.fields and args.format != ReportFormat.text:
+        fields = Devices.resolve_fields(args.fields.split(','))
+        unknown = [field for field in fields if field not in Devices.report_fields]
+        if unknown:
+            print(f'Error: unknown report fields: {",".join(unknown)}')
+            sys.exit(2)
+
+    # only the fields the report and filter use are read up front, the daemon serves them all
+    scan_fields = None
+    if args.mode == 'scan':
+        scan_fields = Devices.text_fields if args.format == ReportFormat.text else fields
+    if scan_fields is not None and dev_filter:
+        scan_fields = scan_fields + dev_filter.fields
+
+    timings = args.timings or bool(args.profile)
+    instrumentation.enable(timings)
+
+    # JSON reports are streamed, each device being written as soon as its analysis completes
+    writer = None
+    if args.mode == 'scan' and args.format != ReportFormat.text:
+        writer = report_writer(args.format.value, sys.stdout, sections=timings)
+
+    def write_device(dev) -> None:
+        if not dev_filter or dev_filter.ok(dev):
+            writer.write(dev.as_dict(fields))
+
     logging.info('Starting...')
     start_time = time.time()
-    devices = Devices(args.skip_analysis)
+    devices = Devices(args.skip_analysis,
+                      root=args.root,
+                      use_cache=not args.no_cache and args.mode == 'scan',
+                      cache_ttl=args.cache_ttl,
+                      on_device=write_device if writer else None,
+                      max_workers=args.jobs,
+                      probe_timeout=args.probe_timeout,
+                      native_lvm=not args.use_lvs,
+                      native_signatures=not args.use_wipefs,
+                      fields=scan_fields,
+                      track_changes=args.mode == 'serve')
     logging.info(f'Completed, runtime: {(time.time() - start_time):.6f}s')
+
+    if args.mode == 'serve':
+        # the daemon (and asyncio with it) is only imported when serving
+        from quickscan.quickscan.daemon import InventoryDaemon
+        socket_path = args.socket or os.path.join(args.root, defaults.socket_path)
+        daemon = InventoryDaemon(devices, socket_path,
+                                 event_file=args.events,
+                                 netlink=not args.events,
+                                 revalidate_interval=args.revalidate)
+        daemon.run()
+        return
+
+    if writer:
+        writer.close({'timings': instrumentation.report()} if timings else None)
+        return
+
     print(devices.report(mode=args.format.value, dev_filter=dev_filter))
+    if timings:
+        print(f'\n{instrumentation.as_text()}')
 
 
 def get_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
 
+    parser.add_argument(
+        'mode',
+        nargs='?',
+        default='scan',
+        choices=['scan', 'serve'],
+        help='scan once and print a report (default), or serve a live inventory on a UNIX socket')
+
     parser.add_argument(
         '--format',
         default='json',
         type=ReportFormat,
         choices=list(ReportFormat),
-        help='report format for the disk inventory')
+        help='report format for the disk inventory (ndjson writes one device per line)')
 
     parser.add_argument(
         '--loglevel',
@@ -65,7 +132,89 @@ def get_args() -> argparse.Namespace:
     parser.add_argument(
         '--filter',
         type=str,
-        help='filter the devices shown by key/value (e.g. key=value,key=value,...)')
+        help='filter the devices shown, with comma separated terms that must all match '
+             '(e.g. size>=1T,rotational=0,model~=SAMSUNG.*,available=true,vendor=ATA|SEAGATE)')
+
+    parser.add_argument(
+        '--fields',
+        type=str,
+        help='comma separated fields to include in JSON/NDJSON records (e.g. path,size,available), '
+             'only these are gathered for each device')
+
+    parser.add_argument(
+        '--jobs',
+        default=defaults.max_workers,
+        type=int,
+        help='threads used to read sysfs and analyse devices (1 = no threads)')
+
+    parser.add_argument(
+        '--probe-timeout',
+        default=defaults.probe_timeout,
+        type=float,
+        help='seconds a device may take to answer the exclusive lock probe, before it is '
+             'rejected with "probe timed out"')
+
+    parser.add_argument(
+        '--use-lvs',
+        default=False,
+        action='store_true',
+        help='always run lvs for LV tags, rather than reading the LVM metadata backups')
+
+    parser.add_argument(
+        '--use-wipefs',
+        default=False,
+        action='store_true',
+        help='always run wipefs to look for signatures, rather than reading them off the devices')
+
+    parser.add_argument(
+        '--timings',
+        default=False,
+        action='store_true',
+        help='time each phase of the scan (and each device), and add the timings to the report')
+
+    parser.add_argument(
+        '--profile',
+        type=str,
+        metavar='FILE',
+        help='run the scan under cProfile and save the stats to FILE (implies --timings)')
+
+    parser.add_argument(
+        '--root',
+        default='/',
+        type=str,
+        help='root directory holding the sys/ and dev/ trees to scan (e.g. a synthetic test tree)')
+
+    parser.add_argument(
+        '--no-cache',
+        default=False,
+        action='store_true',
+        help='rescan every device, ignoring (and not updating) the scan cache')
+
+    parser.add_argument(
+        '--cache-ttl',
+        default=defaults.cache_ttl,
+        type=float,
+        help='seconds a cached device result stays valid when the device is unchanged')
+
+    parser.add_argument(
+        '--socket',
+        type=str,
+        help='UNIX socket to serve the inventory on '
+             '(serve mode, default: <root>/run/quickscan/quickscan.sock)')
+
+    parser.add_argument(
+        '--revalidate',
+        default=defaults.revalidate_interval,
+        type=float,
+        metavar='SECONDS',
+        help='how often the daemon checks every device against its sysfs fingerprint, to catch '
+             'changes the uevents missed (serve mode, 0 = never)')
+
+    parser.add_argument(
+        '--events',
+        type=str,
+        help='replay uevents from this file (udevadm monitor --property layout) '
+             'instead of listening on netlink (serve mode)')
 
     return parser.parse_args()
 
@@ -78,4 +227,12 @@ if __name__ == '__main__':
     level = logging.getLevelName(str(args.loglevel).upper())
     logger.setLevel(level)
 
-    main(args)
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.runcall(main, args)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(20)
+    else:
+        main(args)
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import logging
+
+from typing import Dict, Any, List, Optional
+
+from .defaults import cache_ttl
+
+logger = logging.getLogger(__name__)
+
+
+def lvm_metadata_generation(backup_dir: str) -> Optional[List[List[Any]]]:
+    """Return a cheap marker that changes whenever LVM metadata changes.
+
+    LVM writes a backup of a VG's metadata (including its seqno) every time the metadata is
+    updated, so the name, size and mtime of each backup file track the seqno of every VG without
+    running lvs. Returns None when there is no backup directory to go by.
+    """
+    try:
+        with os.scandir(backup_dir) as it:
+            return sorted([entry.name, entry.stat().st_size, entry.stat().st_mtime_ns]
+                          for entry in it if entry.is_file())
+    except OSError:
+        return None
+
+
+class ScanCache:
+    """On-disk cache of per-device scan results, keyed by a fingerprint of the device.
+
+    A cached record is only returned when the device's current fingerprint matches the stored
+    one and the record is younger than ttl seconds. The ttl bounds how stale results can get for
+    changes a fingerprint can't see. Nothing that decides whether a disk is free is cached: the
+    caller reads the signatures and probes the locks again on every scan.
+    """
+
+    _version = 4
+
+    def __init__(self, path: str, ttl: float = cache_ttl) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._records: Dict[str, Dict[str, Any]] = self._load()
+        self._updated: Dict[str, Dict[str, Any]] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f'ignoring unreadable scan cache {self.path}: {str(e)}')
+            return {}
+
+        if data.get('version') != self._version:
+            logger.info('scan cache version mismatch, ignoring it')
+            return {}
+        return data.get('devices', {})
+
+    def lookup(self, dev_node: str, fingerprint: Optional[List[Any]]) -> Optional[Dict[str, Any]]:
+        """Return the cached data for a device, or None if it must be re-analysed"""
+        record = self._records.get(dev_node)
+        if (fingerprint is None
+                or record is None
+                or record['fingerprint'] != fingerprint
+                or time.time() - record['time'] > self.ttl):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._updated[dev_node] = record
+        return record['data']
+
+    def store(self, dev_node: str, fingerprint: Optional[List[Any]], data: Dict[str, Any]) -> None:
+        if fingerprint is None:
+            return
+        record = self._updated.get(dev_node)
+        if record and record['fingerprint'] == fingerprint:
+            # keep the original timestamp, so the ttl counts from when the data was gathered
+            record['data'] = data
+        else:
+            self._updated[dev_node] = {
+                'fingerprint': fingerprint,
+                'time': time.time(),
+                'data': data,
+            }
+
+    def save(self) -> None:
+        """Write the records stored during this scan, dropping devices that have gone away"""
+        logger.info(f'scan cache: {self.hits} hits, {self.misses} misses')
+        tmp_path = f'{self.path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self._version, 'devices': self._updated}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f'unable to save scan cache {self.path}: {str(e)}')
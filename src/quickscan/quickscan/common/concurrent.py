@@ -1,9 +1,14 @@
+import os
+import signal
 import asyncio
 
 from subprocess import CompletedProcess
-from typing import List, Callable
+from typing import Callable, List, Optional
 import logging
 
+from .defaults import max_concurrent_cmds, cmd_timeout
+from .instrument import instrumentation
+
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +29,58 @@ except ImportError:
                 loop.close()
 
 
-async def run_func(func: Callable, cmd: str) -> CompletedProcess:
-    logger.debug(f'running function {func.__name__}, with parms: {cmd}')
-    response = func(cmd)
-    return response
+async def run_cmd(cmd: str,
+                  semaphore: asyncio.Semaphore,
+                  timeout: Optional[float] = None) -> CompletedProcess:
+    """Run a command as an asyncio subprocess, bounded by the semaphore.
+
+    A command that exceeds the timeout is killed (along with any children it spawned), and
+    returned with the (negative) returncode of the kill signal and whatever output it produced.
+    """
+    args = cmd.split(' ')
+    async with semaphore:
+        logger.debug(f'running command: {cmd}')
+        instrumentation.count('subprocesses')
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True)
+        except OSError as e:
+            logger.error(f'unable to start {args[0]}: {str(e)}')
+            return CompletedProcess(args, 127, b'', str(e).encode('utf-8'))
+
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f'command timed out after {timeout}s, killing: {cmd}')
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                proc.kill()
+            stdout, stderr = await proc.communicate()
+
+    return CompletedProcess(args, proc.returncode, stdout, stderr)
+
+
+async def concurrent_cmds(cmd_list: List[str],
+                          max_concurrency: int = max_concurrent_cmds,
+                          timeout: Optional[float] = cmd_timeout,
+                          on_complete: Optional[Callable[[CompletedProcess], None]] = None
+                          ) -> List[CompletedProcess]:
+    """Run the commands concurrently, returning the results in the order of cmd_list.
 
+    on_complete, if given, is called with each result as soon as its command finishes.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
 
-async def concurrent_cmds(func: Callable, cmd_list: List[str]) -> List[CompletedProcess]:
-    tasks = []
-    for cmd in cmd_list:
-        tasks.append(run_func(func, cmd))
+    async def run(cmd: str) -> CompletedProcess:
+        completion = await run_cmd(cmd, semaphore, timeout)
+        if on_complete:
+            on_complete(completion)
+        return completion
 
-    data = await asyncio.gather(*tasks)
+    data = await asyncio.gather(*[run(cmd) for cmd in cmd_list])
 
     return data
@@ -1 +1,21 @@
 excluded_block_devices = ('sr', 'zram', 'dm-', 'md', 'loop')
+
+# upper limit on the number of external commands (e.g. wipefs) run at the same time
+max_concurrent_cmds = 8
+# seconds before an external command is considered hung and killed (None = wait forever)
+cmd_timeout = 30.0
+# threads used to build and analyse devices (sysfs reads, lock probes); 0 or 1 runs them in turn
+max_workers = 8
+# seconds an O_EXCL lock probe may take before the device is rejected as unresponsive
+probe_timeout = 5.0
+
+# scan cache location (relative to the scanned root) and max age of a cached result, in seconds
+cache_file = 'run/quickscan/cache.json'
+cache_ttl = 300.0
+# LVM metadata backups, written on every metadata change (relative to the scanned root)
+lvm_backup_dir = 'etc/lvm/backup'
+
+# UNIX socket the inventory daemon serves reports on (relative to the scanned root)
+socket_path = 'run/quickscan/quickscan.sock'
+# seconds between the daemon's checks of every device against its fingerprint (0 = never)
+revalidate_interval = 60.0
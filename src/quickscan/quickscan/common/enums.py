@@ -4,6 +4,7 @@ from enum import Enum
 class ReportFormat(Enum):
     text = 'text'
     json = 'json'
+    ndjson = 'ndjson'
 
     def __str__(self) -> str:
         return self.value
@@ -1,49 +1,239 @@
-from typing import Any
+import re
 import logging
 
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Set
+
 logger = logging.getLogger(__name__)
 
+# operators, longest first so '>=' isn't read as '>'
+_OPERATORS = ['~=', '!=', '>=', '<=', '=', '>', '<']
+_TERM_RE = re.compile(r'^\s*([\w/.-]+)\s*(' + '|'.join(re.escape(op) for op in _OPERATORS)
+                      + r')\s*(.*?)\s*$')
+_SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMGTPE])(?:i?B)?$', re.IGNORECASE)
+_UNITS = {unit: 1024 ** (power + 1) for power, unit in enumerate('KMGTPE')}
+
+# stands in for an attribute the object doesn't have
+_MISSING = object()
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _parse_bool(text: str) -> Optional[bool]:
+    return {'true': True, 'false': False}.get(text.lower())
+
+
+def _parse_number(text: str) -> Optional[float]:
+    """Parse a number, allowing a binary size suffix (500G, 1T, 1.5TiB)"""
+    match = _SIZE_RE.match(text)
+    if match:
+        return float(match.group(1)) * _UNITS[match.group(2).upper()]
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _accessor(key: str) -> Callable[[Any], Any]:
+    if '/' not in key:
+        def get_attr(obj: Any) -> Any:
+            return getattr(obj, key, _MISSING)
+        return get_attr
+
+    attr, subkey = key.split('/', 1)
+
+    def get_item(obj: Any) -> Any:
+        container = getattr(obj, attr, _MISSING)
+        getter = getattr(container, 'get', None)
+        if getter is None:
+            return _MISSING
+        return getter(subkey, _MISSING)
+    return get_item
+
+
+def _equals(text: str) -> Callable[[Any], bool]:
+    as_bool = _parse_bool(text)
+    as_number = _parse_number(text)
+
+    def equals(value: Any) -> bool:
+        if isinstance(value, bool):
+            return value is as_bool
+        if isinstance(value, (int, float)):
+            return value == as_number
+        return value is not None and str(value) == text
+    return equals
+
+
+def _compare(op: str, text: str) -> Callable[[Any], bool]:
+    number = _parse_number(text)
+    compare = {
+        '>=': lambda a, b: a >= b,
+        '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b,
+        '<': lambda a, b: a < b,
+    }[op]
+
+    def ordered(value: Any) -> bool:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return number is not None and compare(value, number)
+        if isinstance(value, str):
+            value_number = _parse_number(value)
+            if number is not None and value_number is not None:
+                return compare(value_number, number)
+            return compare(value, text)
+        return False
+    return ordered
+
+
+class FilterTerm:
+    """One compiled key/operator/value(s) test"""
+
+    def __init__(self, key: str, op: str, text: str) -> None:
+        if not text:
+            raise FilterError(f'no value given for {key}')
+        self.key = key
+        self.op = op
+        self.text = text
+        self.get = _accessor(key)
+
+        if op == '~=':
+            try:
+                regex = re.compile(text)
+            except re.error as e:
+                raise FilterError(f'invalid regular expression for {key}: {str(e)}')
+            self.test: Callable[[Any], bool] = (
+                lambda value: value is not None and regex.match(str(value)) is not None)
+            return
+
+        # a|b|c matches any of the values
+        tests = [_equals(value) if op in ('=', '!=') else _compare(op, value)
+                 for value in text.split('|')]
+        if len(tests) == 1:
+            test = tests[0]
+        else:
+            def test(value: Any) -> bool:
+                return any(t(value) for t in tests)
+        self.test = (lambda value: not test(value)) if op == '!=' else test
+
+    def matches(self, value: Any) -> bool:
+        # a key the object doesn't have is ignored, rather than failing the match
+        return value is _MISSING or self.test(value)
+
+    def ok(self, obj: Any) -> bool:
+        return self.matches(self.get(obj))
+
+    def __repr__(self) -> str:
+        return f'{self.key}{self.op}{self.text}'
+
+
+class FilterIndex:
+    """Per-key indexes over a fixed sequence of objects, built on first use.
+
+    An index maps each distinct value of a key to the positions of the objects holding it, so a
+    term is evaluated once per distinct value instead of once per object. The positions matched
+    by each term are remembered too, since the same queries tend to be repeated.
+    """
+
+    def __init__(self, objects: Sequence[Any]) -> None:
+        self.objects = objects
+        self._indexes: Dict[str, Optional[Dict[Hashable, List[int]]]] = {}
+        self._matched: Dict[str, Set[int]] = {}
+
+    def _index(self, term: FilterTerm) -> Optional[Dict[Hashable, List[int]]]:
+        if term.key not in self._indexes:
+            index: Optional[Dict[Hashable, List[int]]] = {}
+            for pos, obj in enumerate(self.objects):
+                value = term.get(obj)
+                try:
+                    # keep bools apart from the ints they hash equal to
+                    index.setdefault((type(value), value), []).append(pos)
+                except TypeError:
+                    logger.debug(f'{term.key} holds unhashable values, not indexed')
+                    index = None
+                    break
+            self._indexes[term.key] = index
+        return self._indexes[term.key]
+
+    def positions(self, term: FilterTerm) -> Optional[Set[int]]:
+        """Return the positions of the objects matching a term, or None if it can't be indexed"""
+        index = self._index(term)
+        if index is None:
+            return None
+        matched = self._matched.get(repr(term))
+        if matched is None:
+            matched = set()
+            for (_type, value), positions in index.items():
+                if term.matches(value):
+                    matched.update(positions)
+            self._matched[repr(term)] = matched
+        return matched
+
 
 class ObjectFilter:
+    """Select objects by a comma separated list of terms, all of which must match.
+
+    A term is key<op>value: = != >= <= > < or ~= (a regular expression, matched from the start
+    of the value). A key can reach into a dict attribute (sys_api/model), and aliases map short
+    keys to full ones (size -> sys_api/size). Values can be true/false, numbers, binary sizes
+    (500G, 1T) or text, and a|b|c matches any of them. Keys an object doesn't have are ignored.
+    """
 
-    def __init__(self, kv: str):
+    def __init__(self, kv: str, aliases: Optional[Dict[str, str]] = None) -> None:
         self._kv = kv
+        self._aliases = aliases or {}
+        self.terms: List[FilterTerm] = []
+        try:
+            self.terms = self._compile()
+        except FilterError as e:
+            logger.error(f'invalid filter "{kv}": {str(e)}')
 
-        self.filters = {}
-        self._build_filter()
+    @property
+    def valid(self) -> bool:
+        return bool(self.terms)
 
     @property
-    def valid(self):
-        return not self.filters == {}
-
-    def _build_filter(self):
-        for kv_pair in self._kv.split(','):
-            assert "=" in kv_pair
-            k, v = kv_pair.split('=')
-            assert k
-            assert v
-            if v.upper() in ['TRUE', 'FALSE']:
-                v = v.upper() in ['TRUE', 'FALSE']
-            self.filters[k] = v
-
-    def ok(self, obj: Any):
-        for k, v in self.filters.items():
-            key = k
-            subkey = None
-            if '/' in k:
-                key, subkey = k.split('/')
-            if hasattr(obj, key):
-                if subkey:
-                    a = getattr(obj, key)
-                    if not isinstance(a, dict):
-                        logger.debug(f'filter skipping {k}: not a dict')
-                        continue
-                    val = a.get(subkey, None)
-                else:
-                    val = getattr(obj, key, None)
-                if val != v:
-                    logger.debug(f'filter result - no match on {k}: {val} != {v}')
-                    return False
-            else:
-                logger.debug(f'filter key ({k}) not found in the object. Key ignored.')
+    def fields(self) -> List[str]:
+        """The keys the filter reads, so objects that load their fields on demand can load them
+        up front"""
+        return sorted({term.key for term in self.terms})
+
+    def _compile(self) -> List[FilterTerm]:
+        terms = []
+        for expr in self._kv.split(','):
+            if not expr.strip():
+                continue
+            match = _TERM_RE.match(expr)
+            if not match:
+                raise FilterError(f'unable to parse "{expr}"')
+            key, op, text = match.groups()
+            terms.append(FilterTerm(self._aliases.get(key, key), op, text))
+        return terms
+
+    def ok(self, obj: Any) -> bool:
+        for term in self.terms:
+            if not term.ok(obj):
+                return False
         return True
+
+    def select(self, objects: Sequence[Any], index: Optional[FilterIndex] = None) -> List[Any]:
+        """Return the matching objects in their original order, using the index if given"""
+        if index is None:
+            return [obj for obj in objects if self.ok(obj)]
+
+        candidates: Optional[Set[int]] = None
+        unindexed = []
+        for term in self.terms:
+            positions = index.positions(term)
+            if positions is None:
+                unindexed.append(term)
+            else:
+                candidates = positions if candidates is None else candidates & positions
+        objects = index.objects
+        if candidates is None or len(candidates) == len(objects):
+            selected = objects
+        else:
+            selected = [objects[pos] for pos in sorted(candidates)]
+        if unindexed:
+            return [obj for obj in selected if all(term.ok(obj) for term in unindexed)]
+        return list(selected)
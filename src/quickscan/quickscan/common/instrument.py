@@ -0,0 +1,95 @@
+import time
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Phase timers, per-device timers and counters for a scan.
+
+    Disabled by default. While disabled every call returns straight away, so instrumented code
+    pays one attribute check. Hot paths should test `enabled` themselves before calling in.
+
+    Phases are named stages of the scan (sysfs, lvs, wipefs...), timed each time they run.
+    Device timers break a stage down by device, and counters track work done (files read,
+    subprocesses spawned...). Counters are tallied where the work happens, never estimated:
+    os_calls counts the os.open, os.read, os.close and os.scandir calls made reading sysfs, not
+    the syscalls the kernel sees behind them. Updates are thread safe.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+
+    def reset(self) -> None:
+        with self._lock:
+            self._phases: Dict[str, Dict[str, Any]] = {}
+            self._devices: Dict[str, Dict[str, float]] = {}
+            self._counters: Dict[str, int] = {}
+
+    def add_time(self, phase: str, seconds: float, device: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._phases.setdefault(phase, {'seconds': 0.0, 'calls': 0})
+            stats['seconds'] += seconds
+            stats['calls'] += 1
+            if device:
+                timers = self._devices.setdefault(device, {})
+                timers[phase] = timers.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str, device: Optional[str] = None) -> Iterator[None]:
+        """Time the enclosed block as (one run of) a phase, and optionally against a device"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start, device)
+
+    def count(self, name: str, increment: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + increment
+
+    def report(self) -> Dict[str, Any]:
+        """Return the timings gathered so far (milliseconds), ready for a JSON report"""
+        with self._lock:
+            return {
+                'phases': {
+                    name: {'ms': round(stats['seconds'] * 1000, 3), 'calls': stats['calls']}
+                    for name, stats in sorted(self._phases.items())
+                },
+                'devices': {
+                    device: {name: round(seconds * 1000, 3)
+                             for name, seconds in sorted(timers.items())}
+                    for device, timers in sorted(self._devices.items())
+                },
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+    def as_text(self) -> str:
+        """Summarise the phases and counters for the text report"""
+        report = self.report()
+        lines = [f'{"Phase":<24} {"ms":>10} {"calls":>6}']
+        for name, stats in report['phases'].items():
+            lines.append(f'{name:<24} {stats["ms"]:>10.3f} {stats["calls"]:>6}')
+        for name, value in report['counters'].items():
+            lines.append(f'{name:<24} {value:>10}')
+        return '\n'.join(lines)
+
+
+# shared by the whole process, so the low level helpers (sysfs reads, commands) can report in
+instrumentation = Instrumentation()
@@ -0,0 +1,105 @@
+import time
+import queue
+import logging
+import threading
+
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .defaults import probe_timeout, max_workers
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult(NamedTuple):
+    # None when the probe didn't complete within the deadline
+    locked: Optional[bool]
+    # seconds the probe took (the deadline, for a probe that timed out)
+    latency: float
+
+
+class LockProber:
+    """Run a lock probe (e.g. an O_EXCL open) against many devices at once, each with a deadline.
+
+    An open of a device that is stuck in error handling can block in the kernel for minutes, and
+    a blocked thread can't be interrupted. So probes run on daemon threads: a probe that misses
+    its deadline is reported as timed out, its thread is abandoned (a new one takes its place),
+    and whatever it eventually returns is discarded.
+    """
+
+    def __init__(self,
+                 probe: Callable[[str], bool],
+                 timeout: float = probe_timeout,
+                 max_workers: int = max_workers) -> None:
+        self._probe = probe
+        self.timeout = timeout
+        self._max_workers = max(1, max_workers)
+        self._cond = threading.Condition()
+
+    def _worker(self,
+                work: 'queue.Queue[str]',
+                running: Dict[str, float],
+                results: Dict[str, ProbeResult]) -> None:
+        while True:
+            try:
+                path = work.get_nowait()
+            except queue.Empty:
+                return
+            start = time.monotonic()
+            with self._cond:
+                running[path] = start
+                self._cond.notify()
+            try:
+                locked = self._probe(path)
+            except Exception as e:
+                logger.error(f'lock probe of {path} failed: {str(e)}')
+                locked = True
+            latency = time.monotonic() - start
+            with self._cond:
+                running.pop(path, None)
+                if path in results:
+                    # timed out already, and another thread has taken over this one's work
+                    logger.warning(f'lock probe of {path} completed after {latency:.3f}s, '
+                                   'past its deadline')
+                    return
+                results[path] = ProbeResult(locked, latency)
+                self._cond.notify()
+
+    def _start_worker(self,
+                      work: 'queue.Queue[str]',
+                      running: Dict[str, float],
+                      results: Dict[str, ProbeResult]) -> None:
+        thread = threading.Thread(target=self._worker, args=(work, running, results),
+                                  name='lock-probe', daemon=True)
+        thread.start()
+
+    def probe(self, paths: List[str]) -> Dict[str, ProbeResult]:
+        """Probe the paths concurrently, returning a result for every one of them"""
+        results: Dict[str, ProbeResult] = {}
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return results
+
+        work: 'queue.Queue[str]' = queue.Queue()
+        for path in paths:
+            work.put(path)
+        # probes in progress, and when they started
+        running: Dict[str, float] = {}
+        for _i in range(min(self._max_workers, len(paths))):
+            self._start_worker(work, running, results)
+
+        with self._cond:
+            while len(results) < len(paths):
+                now = time.monotonic()
+                next_deadline = None
+                for path, start in list(running.items()):
+                    deadline = start + self.timeout
+                    if deadline <= now:
+                        logger.error(f'lock probe of {path} timed out after {self.timeout}s')
+                        del running[path]
+                        results[path] = ProbeResult(None, self.timeout)
+                        self._start_worker(work, running, results)
+                    elif next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                if len(results) < len(paths):
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+        return results
@@ -0,0 +1,183 @@
+import os
+import re
+import logging
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# LVs have a dm uuid of LVM-<vg uuid><lv uuid>; their hidden layers (-real, -cow, -tpool..)
+# carry a suffix on top of it
+_lv_uuid_length = len('LVM-') + 64
+
+_number = re.compile(r'-?\d+(\.\d+)?$')
+# one token per match, with the whitespace and comments before it
+_token = re.compile(r'''
+    (?:\s+|\#[^\n]*)*
+    (?:(?P<string>"(?:[^"\\]|\\.)*")
+      |(?P<word>[A-Za-z0-9_+.\-]+)     # names, and unquoted (numeric) values
+      |(?P<punct>[={}\[\],])
+      |(?P<error>.))?
+''', re.VERBOSE | re.DOTALL)
+_escape = re.compile(r'\\(.)')
+
+
+class LVMMetadataError(Exception):
+    pass
+
+
+def _tokens(text: str) -> Tuple[List[str], List[str]]:
+    """Split metadata text into token kinds ('"' for strings, 'w' for words, or the punctuation
+    character itself) and values, ending in an '' end of text token"""
+    kinds = []
+    values = []
+    for string, word, punct, error in _token.findall(text):
+        if string:
+            kinds.append('"')
+            values.append(_escape.sub(r'\1', string[1:-1]) if '\\' in string else string[1:-1])
+        elif word:
+            kinds.append('w')
+            values.append(word)
+        elif punct:
+            kinds.append(punct)
+            values.append(punct)
+        elif error:
+            raise LVMMetadataError(f'unexpected {error!r} after {len(kinds)} tokens')
+    kinds.append('')
+    values.append('end of text')
+    return kinds, values
+
+
+def parse_metadata(text: str) -> Dict[str, Any]:
+    """Parse LVM metadata text (as held in a PV's metadata area or a backup file).
+
+    Sections (name { ... }) become dicts, and values are strings, numbers or lists of them.
+    """
+    kinds, values = _tokens(text)
+    pos = 0
+
+    def scalar() -> Any:
+        nonlocal pos
+        kind, token = kinds[pos], values[pos]
+        pos += 1
+        if kind == '"':
+            return token
+        number = _number.match(token) if kind == 'w' else None
+        if not number:
+            raise LVMMetadataError(f'expected a value, found {token!r}')
+        return float(token) if number.group(1) else int(token)
+
+    def value() -> Any:
+        nonlocal pos
+        if kinds[pos] != '[':
+            return scalar()
+        pos += 1
+        items = []
+        while kinds[pos] != ']':
+            items.append(scalar())
+            if kinds[pos] == ',':
+                pos += 1
+        pos += 1
+        return items
+
+    def section(closing: bool) -> Dict[str, Any]:
+        nonlocal pos
+        entries: Dict[str, Any] = {}
+        while True:
+            kind, name = kinds[pos], values[pos]
+            if kind == '}' and closing:
+                pos += 1
+                return entries
+            if not kind and not closing:
+                return entries
+            if kind != 'w':
+                raise LVMMetadataError(f'expected a name, found {name!r}')
+            pos += 1
+            if kinds[pos] == '{':
+                pos += 1
+                entries[name] = section(True)
+            elif kinds[pos] == '=':
+                pos += 1
+                entries[name] = value()
+            else:
+                raise LVMMetadataError(f'expected "=" or "{{" after {name}, found {values[pos]!r}')
+
+    return section(False)
+
+
+def split_dm_name(dm_name: str) -> Optional[Tuple[str, str]]:
+    """Return the VG and LV names held in an LV's device-mapper name (vg-lv, '-' doubled)"""
+    components = dm_name.replace('--', '\0').split('-')
+    if len(components) != 2 or not all(components):
+        return None
+    vg_name, lv_name = (component.replace('\0', '-') for component in components)
+    return vg_name, lv_name
+
+
+def is_lv_uuid(dm_uuid: str) -> bool:
+    """Whether a device-mapper uuid belongs to an LV (and not to one of its hidden layers)"""
+    return dm_uuid.startswith('LVM-') and len(dm_uuid) == _lv_uuid_length
+
+
+def vg_lvs(metadata: Dict[str, Any], vg_name: str) -> Optional[List[Dict[str, Any]]]:
+    """Return the LVs of a VG, in the layout of an lvs -o vg_name,lv_name,lv_tags report"""
+    vg = metadata.get(vg_name)
+    if not isinstance(vg, dict):
+        return None
+    return [{'vg_name': vg_name, 'lv_name': lv_name, 'lv_tags': ','.join(lv.get('tags', []))}
+            for lv_name, lv in vg.get('logical_volumes', {}).items()]
+
+
+class LVMBackups:
+    """LV names and tags read from the VG metadata backups LVM keeps (/etc/lvm/backup/<vg>).
+
+    LVM rewrites a VG's backup every time the VG's metadata changes, so the backups hold the
+    same names and tags lvs would report, without forking lvs or taking LVM's global lock. Each
+    parsed backup is kept along with the size and mtime of its file, so a rescan only parses the
+    backups of VGs that changed.
+    """
+
+    def __init__(self, backup_dir: str) -> None:
+        self.backup_dir = backup_dir
+        self._parsed: Dict[str, Tuple[Tuple[int, int], Optional[List[Dict[str, Any]]]]] = {}
+
+    def _vg_lvs(self, vg_name: str) -> Optional[List[Dict[str, Any]]]:
+        path = os.path.join(self.backup_dir, vg_name)
+        try:
+            with open(path, 'r') as f:
+                st = os.fstat(f.fileno())
+                stamp = (st.st_size, st.st_mtime_ns)
+                parsed = self._parsed.get(vg_name)
+                if parsed and parsed[0] == stamp:
+                    return parsed[1]
+                lvs = vg_lvs(parse_metadata(f.read()), vg_name)
+        except (OSError, UnicodeDecodeError, LVMMetadataError) as e:
+            logger.info(f'unable to use the LVM backup of {vg_name}: {str(e)}')
+            self._parsed.pop(vg_name, None)
+            return None
+        if lvs is None:
+            logger.info(f'LVM backup file {path} does not describe {vg_name}')
+        self._parsed[vg_name] = (stamp, lvs)
+        return lvs
+
+    def read(self, lvs: Iterable[Dict[str, str]]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return the name and tags of every LV in the VGs of the given LVs, keyed by vg-lv.
+
+        Returns None when the backups can't answer for every given LV (backups disabled, a VG
+        created on another host, a file that doesn't parse) - the caller should ask lvs instead.
+        """
+        lvs = list(lvs)
+        lv_metadata: Dict[str, Dict[str, Any]] = {}
+        for vg_name in sorted({lv['vg_name'] for lv in lvs}):
+            backed_up = self._vg_lvs(vg_name)
+            if backed_up is None:
+                return None
+            for lv in backed_up:
+                lv_metadata[f'{vg_name}-{lv["lv_name"]}'] = lv
+
+        for lv in lvs:
+            if f'{lv["vg_name"]}-{lv["lv_name"]}' not in lv_metadata:
+                logger.info(f'LV {lv["vg_name"]}/{lv["lv_name"]} missing from its VG backup, '
+                            'which must be stale')
+                return None
+        return lv_metadata
@@ -0,0 +1,74 @@
+import json
+import logging
+
+from typing import Any, Dict, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class JSONReportWriter:
+    """Write report records to a file object as a JSON array, one record at a time.
+
+    Each record is serialised and written as soon as it is passed in, so memory use doesn't grow
+    with the number of devices and a reader sees the first record before the scan completes.
+    With sections, the array is written as the "devices" member of an object, and the sections
+    passed to close() (e.g. timings) follow it.
+    """
+
+    def __init__(self, f: TextIO, indent: int = 2, sections: bool = False) -> None:
+        self._f = f
+        self._indent = indent
+        self._sections = sections
+        self.count = 0
+        self._f.write('{"devices": [' if sections else '[')
+
+    def _dumps(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, indent=self._indent, sort_keys=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(f'{"," if self.count else ""}\n{self._dumps(record)}')
+        self._f.flush()
+        self.count += 1
+
+    def close(self, sections: Optional[Dict[str, Any]] = None) -> None:
+        self._f.write('\n]' if self.count else ']')
+        if self._sections:
+            for name, section in (sections or {}).items():
+                self._f.write(f',\n{json.dumps(name)}: {self._dumps(section)}')
+            self._f.write('}')
+        self._f.write('\n')
+        self._f.flush()
+
+
+class NDJSONReportWriter(JSONReportWriter):
+    """Write report records as newline delimited JSON, one record per line.
+
+    Sections passed to close() are written as a final line each: {"<name>": {...}}.
+    """
+
+    def __init__(self, f: TextIO, sections: bool = False) -> None:
+        self._f = f
+        self._sections = sections
+        self.count = 0
+
+    def _dumps(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, sort_keys=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(f'{self._dumps(record)}\n')
+        self._f.flush()
+        self.count += 1
+
+    def close(self, sections: Optional[Dict[str, Any]] = None) -> None:
+        for name, section in (sections or {}).items():
+            self._f.write(f'{self._dumps({name: section})}\n')
+        self._f.flush()
+
+
+def report_writer(mode: str, f: TextIO, sections: bool = False) -> JSONReportWriter:
+    """Return the streaming writer for a report format (json or ndjson)"""
+    if mode == 'ndjson':
+        return NDJSONReportWriter(f, sections=sections)
+    if mode == 'json':
+        return JSONReportWriter(f, sections=sections)
+    raise ValueError(f'no streaming writer for the {mode} format')
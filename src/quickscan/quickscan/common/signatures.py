@@ -0,0 +1,200 @@
+import os
+import struct
+import logging
+import threading
+
+from typing import List, Optional
+
+from .instrument import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# the first 68KiB hold every superblock probed for (the last is btrfs, at 64KiB)
+head_size = 68 * 1024
+# the last 128KiB hold the backup GPT header and the mdraid 0.90 and 1.0 superblocks
+tail_size = 128 * 1024
+# Nothing outside these two windows is read. A device whose windows are blank is reported blank
+# without running wipefs, so a signature that only has data elsewhere - a VMFS volume header at
+# 1MiB, say - is not seen. Every format above also writes to the windows; use wipefs (--use-wipefs)
+# where disks may carry something that doesn't.
+
+# compared against to tell blank regions, without copying them
+_zeros = memoryview(bytes(max(head_size, tail_size)))
+_preadv = hasattr(os, 'preadv')
+
+_md_magic = 0xa92b4efc
+_swap_magic = (b'SWAPSPACE2', b'SWAP-SPACE')
+# boot sectors that carry an 0x55aa signature, but aren't an MBR
+_boot_sector_markers = ((3, b'NTFS    '), (3, b'EXFAT   '), (0x36, b'FAT'), (0x52, b'FAT32'))
+
+# ext features that only ext4 (incompat: extents, 64bit, flex_bg) and ext3 (compat: has_journal)
+# file systems have
+_ext4_incompat = 0x40 | 0x80 | 0x200
+_ext3_compat = 0x4
+
+
+def _le16(buf: bytes, offset: int) -> int:
+    return struct.unpack_from('<H', buf, offset)[0]
+
+
+def _le32(buf: bytes, offset: int) -> int:
+    return struct.unpack_from('<I', buf, offset)[0]
+
+
+def _at(buf: bytes, offset: int, magic: bytes) -> bool:
+    return buf[offset:offset + len(magic)] == magic
+
+
+def _ext_type(head: bytes) -> Optional[str]:
+    sb = 1024
+    if len(head) < sb + 0x68 or _le16(head, sb + 0x38) != 0xef53:
+        return None
+    if _le32(head, sb + 0x60) & _ext4_incompat:
+        return 'ext4'
+    if _le32(head, sb + 0x5c) & _ext3_compat:
+        return 'ext3'
+    return 'ext2'
+
+
+def _md_superblock(buf: bytes, offset: int, major_version: int) -> bool:
+    return (0 <= offset and offset + 8 <= len(buf) and _le32(buf, offset) == _md_magic
+            and _le32(buf, offset + 4) == major_version)
+
+
+def _mbr_types(head: bytes) -> List[str]:
+    if not _at(head, 510, b'\x55\xaa'):
+        return []
+    entries = [head[446 + i * 16:446 + (i + 1) * 16] for i in range(4)]
+    if any(entry[4] == 0xee for entry in entries):
+        return ['PMBR']
+    if (all(entry[0] in (0, 0x80) for entry in entries) and any(entry[4] for entry in entries)
+            and not any(_at(head, offset, marker) for offset, marker in _boot_sector_markers)):
+        return ['dos']
+    return []
+
+
+def match_signatures(head: bytes, tail: bytes, size: int) -> List[str]:
+    """Return the signature types (named as wipefs names them) found in the head and tail of a
+    device of the given size"""
+    found = []
+    if _at(head, 0, b'bluestore block device'):
+        found.append('ceph_bluestore')
+    if _at(head, 0, b'LUKS\xba\xbe'):
+        found.append('crypto_LUKS')
+    if _at(head, 0, b'XFSB'):
+        found.append('xfs')
+    ext = _ext_type(head)
+    if ext:
+        found.append(ext)
+    if _at(head, 0x10040, b'_BHRfS_M'):
+        found.append('btrfs')
+    if any(head[page - 10:page] in _swap_magic for page in (4096, 8192, 16384, 65536)):
+        found.append('swap')
+    if any(_at(head, 512 * sector, b'LABELONE') and _at(head, 512 * sector + 24, b'LVM2 001')
+           for sector in range(4)):
+        found.append('LVM2_member')
+
+    # mdraid 1.1 and 1.2 superblocks sit at 0 and 4KiB, 1.0 at least 8KiB from the end
+    # (8KiB aligned) and 0.90 in the last 64KiB aligned 64KiB block
+    sectors = size // 512
+    tail_start = size - len(tail)
+    if (_md_superblock(head, 0, 1) or _md_superblock(head, 4096, 1)
+            or _md_superblock(tail, (((sectors - 16) & ~7) * 512) - tail_start, 1)
+            or _md_superblock(tail, (((sectors & ~127) - 128) * 512) - tail_start, 0)):
+        found.append('linux_raid_member')
+
+    # the primary GPT header is in LBA 1 and the backup in the last LBA, for 512 or 4K sectors
+    if any(_at(head, sector_size, b'EFI PART') for sector_size in (512, 4096)) or \
+            any(_at(tail, len(tail) - sector_size, b'EFI PART') for sector_size in (512, 4096)):
+        found.append('gpt')
+    found.extend(_mbr_types(head))
+
+    return found
+
+
+def _read_into(fd: int, view: memoryview, offset: int) -> int:
+    """Fill view from offset in the file, returning the bytes read (fewer at end of file)"""
+    done = 0
+    while done < len(view):
+        if _preadv:
+            count = os.preadv(fd, [view[done:]], offset + done)
+        else:
+            data = os.pread(fd, len(view) - done, offset + done)
+            count = len(data)
+            view[done:done + count] = data
+        if not count:
+            break
+        done += count
+    return done
+
+
+class SignatureProber:
+    """Probe devices for signatures, reading into a pool of reusable buffers.
+
+    Each probe takes one buffer from the pool for both the head and the tail of the device,
+    reads into it with preadv and matches the signatures on views of it, so no bytes objects
+    are created for the data read. The pool grows to the number of probes run at once (one per
+    worker thread) and is kept for later scans.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buffers: List[bytearray] = []
+        self.allocations = 0
+
+    def _acquire(self) -> bytearray:
+        with self._lock:
+            if self._buffers:
+                return self._buffers.pop()
+            self.allocations += 1
+        instrumentation.count('buffer_allocations')
+        return bytearray(head_size + tail_size)
+
+    def _release(self, buffer: bytearray) -> None:
+        with self._lock:
+            self._buffers.append(buffer)
+
+    def probe(self, path: str) -> Optional[List[str]]:
+        """Read the head and tail of a device and match them against the known signatures.
+
+        Returns the signature types found (an empty list when both windows are blank), or None
+        when the device holds something unrecognised there or can't be read.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        except OSError as e:
+            logger.warning(f'unable to open {path} to probe its signatures: {str(e)}')
+            return None
+        buffer = self._acquire()
+        try:
+            view = memoryview(buffer)
+            size = os.lseek(fd, 0, os.SEEK_END)
+            head_len = _read_into(fd, view[:min(head_size, size)], 0)
+            tail_offset = max(size - tail_size, 0)
+            tail_len = _read_into(fd, view[head_size:head_size + size - tail_offset],
+                                  tail_offset)
+            instrumentation.count('bytes_read', head_len + tail_len)
+            found = match_signatures(view[:head_len], view[head_size:head_size + tail_len], size)
+            if found:
+                return found
+            # nothing known, but data all the same?
+            if buffer.startswith(_zeros[:head_len]) and \
+                    buffer.startswith(_zeros[:tail_len], head_size):
+                return []
+            return None
+        except OSError as e:
+            logger.warning(f'unable to read {path} to probe its signatures: {str(e)}')
+            return None
+        finally:
+            os.close(fd)
+            view.release()
+            self._release(buffer)
+
+
+# for callers probing the odd device, outside of a scan
+_prober = SignatureProber()
+
+
+def probe_signatures(path: str) -> Optional[List[str]]:
+    """Probe a device for signatures (see SignatureProber.probe)"""
+    return _prober.probe(path)
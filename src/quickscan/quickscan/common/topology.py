@@ -0,0 +1,158 @@
+import os
+import copy
+import logging
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from .sysfs import BlockIndex, read_attribute
+from .instrument import instrumentation
+from .lvm import is_lv_uuid, split_dm_name
+from .utils import scan_links
+
+logger = logging.getLogger(__name__)
+
+
+class Topology:
+    """How the block devices of a host relate to each other, indexed for O(1) lookups.
+
+    Brings together the LVM PVs, LVs and multipath maps (from the /dev/disk/by-id and /dev/mapper
+    links, and the device-mapper name and uuid of each dm device) and the holders, partitions and
+    scsi addresses of every device (from sysfs). Devices can be looked up by kernel name (sda,
+    dm-3) or by major:minor (8:0, 253:3).
+    """
+
+    def __init__(self, block_dir: str, dev_dir: str) -> None:
+        self._block_dir = block_dir
+        self._dev_dir = dev_dir
+        with instrumentation.phase('holder_scan'):
+            self._index = BlockIndex(block_dir)
+        self.devno: Dict[str, str] = {}
+        self.by_devno: Dict[str, str] = {}
+        self._index_devno(list(self._index.holders))
+        self._index_holders()
+        self._dm_lvs: Dict[str, Dict[str, str]] = {}
+        self._index_dm(list(self._index.holders))
+        self._load_links()
+
+    def _index_devno(self, names: List[str]) -> None:
+        for name in names:
+            old = self.devno.pop(name, None)
+            if old:
+                self.by_devno.pop(old, None)
+            if name not in self._index.holders:
+                continue
+            devno = read_attribute(os.path.join(self._block_dir, name, 'dev'))
+            if devno:
+                self.devno[name] = devno
+                self.by_devno[devno] = name
+
+    def _index_holders(self) -> None:
+        self._held_by: Dict[str, List[str]] = {}
+        for name, holders in sorted(self._index.holders.items()):
+            for holder in holders:
+                self._held_by.setdefault(holder, []).append(name)
+
+    def _index_dm(self, names: List[str]) -> None:
+        # an LV's dm uuid says it is one, and its dm name holds its VG and LV names, so LVs are
+        # known even where udev hasn't created (or has lost) their by-id links
+        with instrumentation.phase('dm_scan'):
+            for name in names:
+                self._dm_lvs.pop(name, None)
+                if not name.startswith('dm-') or name not in self._index.holders:
+                    continue
+                dm_dir = os.path.join(self._block_dir, name, 'dm')
+                if not is_lv_uuid(read_attribute(os.path.join(dm_dir, 'uuid'))):
+                    continue
+                names_in_dm = split_dm_name(read_attribute(os.path.join(dm_dir, 'name')))
+                if names_in_dm:
+                    self._dm_lvs[name] = {'vg_name': names_in_dm[0], 'lv_name': names_in_dm[1]}
+
+    def _load_links(self) -> None:
+        with instrumentation.phase('link_resolution'):
+            self._read_links()
+
+    def _read_links(self) -> None:
+        # one pass over each directory, sharing the resolution of links to the same device
+        resolved: Dict[str, str] = {}
+        by_id = scan_links(os.path.join(self._dev_dir, 'disk/by-id'),
+                           ('lvm-pv-uuid-', 'dm-name-'), resolved)
+        self.pv_links = by_id['lvm-pv-uuid-']
+        self.lv_links = by_id['dm-name-']
+        self.mpath_links = scan_links(os.path.join(self._dev_dir, 'mapper'),
+                                      ('mpath',), resolved)['mpath']
+
+        self.pv_devices: Set[str] = {target for _link, target in self.pv_links}
+        self.mpath_devices: Dict[str, str] = {target: link for link, target in self.mpath_links}
+        self.lv_devices: Dict[str, Dict[str, str]] = self._build_lv_devices(self.lv_links)
+        self.lv_devices.update(self._dm_lvs)
+        self._links_by_target: Dict[str, List[str]] = {}
+        for link, target in self.pv_links + self.lv_links + self.mpath_links:
+            self._links_by_target.setdefault(target, []).append(os.path.basename(link))
+
+    @staticmethod
+    def _build_lv_devices(lv_links: List[Tuple[str, str]]) -> Dict[str, Dict[str, str]]:
+        lv_devices = {}
+        for link_name, target in lv_links:
+            names = split_dm_name(os.path.basename(link_name)[len('dm-name-'):])
+            if not names:
+                logger.debug(f'skipping linkname {link_name}. Not an LV link')
+            else:
+                lv_devices[target] = {'vg_name': names[0], 'lv_name': names[1]}
+        return lv_devices
+
+    def updated(self, names: List[str]) -> 'Topology':
+        """Return a copy with the links read again, and the given devices re-indexed along with
+        any that came or went.
+
+        This topology is left as it is, so it can still be read while the copy is built.
+        """
+        topology = copy.copy(self)
+        topology._index = self._index.copy()
+        topology.devno = dict(self.devno)
+        topology.by_devno = dict(self.by_devno)
+        topology._dm_lvs = dict(self._dm_lvs)
+        topology._update(names)
+        return topology
+
+    def _update(self, names: List[str]) -> None:
+        present = set(os.listdir(self._block_dir))
+        indexed = set(self._index.holders)
+        stale = set(names) | (present - indexed) | (indexed - present)
+        with instrumentation.phase('holder_scan'):
+            self._index.update(sorted(stale))
+        self._index_devno(sorted(stale))
+        self._index_holders()
+        self._index_dm(sorted(stale))
+        self._load_links()
+
+    def name(self, dev: str) -> str:
+        """Return the kernel name of a device given by kernel name or major:minor"""
+        return self.by_devno.get(dev, dev) if ':' in dev else dev
+
+    def holders(self, dev: str) -> List[str]:
+        return self._index.holders.get(self.name(dev), [])
+
+    def partitions(self, dev: str) -> List[str]:
+        return self._index.partitions.get(self.name(dev), [])
+
+    def scsi_addr(self, dev: str) -> str:
+        return self._index.bsg.get(self.name(dev), '')
+
+    def is_pv(self, dev: str) -> bool:
+        return self.name(dev) in self.pv_devices
+
+    def mpath_device(self, dev: str) -> Optional[str]:
+        """Return the /dev/mapper path of a multipath map"""
+        return self.mpath_devices.get(self.name(dev))
+
+    def lv(self, dev: str) -> Optional[Dict[str, str]]:
+        """Return the VG and LV name of a device-mapper LV"""
+        return self.lv_devices.get(self.name(dev))
+
+    def links(self, dev: str) -> List[str]:
+        """Return the names of the by-id/mapper links that point at a device"""
+        return self._links_by_target.get(self.name(dev), [])
+
+    def held_by(self, dev: str) -> List[str]:
+        """Return the devices a holder (e.g. an LV or multipath map) sits on"""
+        return self._held_by.get(self.name(dev), [])
@@ -0,0 +1,105 @@
+import os
+import socket
+import struct
+import logging
+
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NETLINK_KOBJECT_UEVENT = 15
+# multicast groups: raw kernel events, and events re-broadcast by udev once it has processed
+# them (device nodes and /dev/disk links are in place by then)
+KERNEL_GROUP = 1
+UDEV_GROUP = 2
+
+_UDEV_PREFIX = b'libudev\x00'
+_UDEV_MAGIC = 0xfeedcafe
+_RECV_SIZE = 65536
+
+
+def parse_uevent(data: bytes) -> Optional[Dict[str, str]]:
+    """Decode a netlink uevent message, in either the kernel or the libudev format"""
+    if data.startswith(_UDEV_PREFIX):
+        # struct udev_monitor_netlink_header: prefix, magic (big endian), header_size,
+        # properties_off, properties_len, ...
+        if len(data) < 24 or struct.unpack_from('>I', data, 8)[0] != _UDEV_MAGIC:
+            logger.debug('ignoring udev message with an unknown header')
+            return None
+        properties_off, properties_len = struct.unpack_from('=II', data, 16)
+        payload = data[properties_off:properties_off + properties_len]
+    else:
+        # kernel format: "action@devpath\0KEY=VALUE\0..."
+        header, _sep, payload = data.partition(b'\x00')
+        if b'@' not in header:
+            return None
+
+    event = {}
+    for field in payload.split(b'\x00'):
+        key, sep, value = field.decode('utf-8', 'replace').partition('=')
+        if sep:
+            event[key] = value
+    return event if 'ACTION' in event else None
+
+
+def read_event_file(path: str) -> Iterator[Dict[str, str]]:
+    """Replay events saved in the 'udevadm monitor --property' layout.
+
+    Events are separated by blank lines, and hold one KEY=VALUE property per line. Other lines
+    (like the monitor's own headings) are ignored.
+    """
+    event: Dict[str, str] = {}
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                if 'ACTION' in event:
+                    yield event
+                event = {}
+                continue
+            key, sep, value = line.partition('=')
+            if sep and ' ' not in key:
+                event[key] = value
+    if 'ACTION' in event:
+        yield event
+
+
+def open_uevent_socket(group: int = UDEV_GROUP) -> socket.socket:
+    """Open a non-blocking netlink socket subscribed to uevents"""
+    sock = socket.socket(socket.AF_NETLINK,
+                         socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC,
+                         NETLINK_KOBJECT_UEVENT)
+    try:
+        # adding a shelf of disks generates a burst of events
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        sock.bind((0, group))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def receive_events(sock: socket.socket) -> List[Dict[str, str]]:
+    """Drain the pending events from a non-blocking uevent socket"""
+    events = []
+    while True:
+        try:
+            data = sock.recv(_RECV_SIZE)
+        except BlockingIOError:
+            break
+        except OSError as e:
+            # ENOBUFS: the kernel dropped events, the caller should rescan
+            logger.error(f'uevent socket error: {str(e)}')
+            raise
+        event = parse_uevent(data)
+        if event:
+            events.append(event)
+    return events
+
+
+def block_device_name(event: Dict[str, str]) -> Optional[str]:
+    """Return the kernel name of the block device an event is about"""
+    if event.get('SUBSYSTEM') != 'block':
+        return None
+    devpath = event.get('DEVPATH', '')
+    return os.path.basename(devpath) or os.path.basename(event.get('DEVNAME', '')) or None
@@ -0,0 +1,75 @@
+from bisect import bisect_left, bisect_right
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# A copy of the UnitScale engine in pydiskinfo's human_readable_units (MIT licensed, copyright
+# (c) 2022 Lars Henrik Ericson), so quickscan doesn't depend on where pydiskinfo is installed.
+# Keep the two in step - test/test_pydiskinfo_units.py checks that they agree.
+
+
+def _percent_format(decimal_places: int, suffix: str) -> Callable[[float], str]:
+    # % formatting is quicker than str.format
+    return ('%.' + str(decimal_places) + 'f' + suffix.replace('%', '%%')).__mod__
+
+
+class UnitScale:
+    """A series of units, each base times the one before it, for formatting values with the
+    largest unit they exceed.
+
+    The thresholds between the units are computed once, and a unit is chosen by bisecting them,
+    or from the bit length of an int when base is 1024. Format strings are made once for each
+    number of decimal places. inclusive chooses a unit once a value reaches it, rather than
+    exceeds it. The base unit is shown with base_decimal_places.
+    """
+
+    def __init__(self,
+                 units: Tuple[str, ...],
+                 base: int,
+                 inclusive: bool = False,
+                 separator: str = '',
+                 base_decimal_places: int = 0) -> None:
+        self.units = units
+        self.base = base
+        self._inclusive = inclusive
+        self._separator = separator
+        self._base_decimal_places = base_decimal_places
+        self._top = len(units) - 1
+        self._divisors = tuple(pow(base, power) for power in range(len(units)))
+        self._thresholds = list(self._divisors[1:])
+        self._bisect = bisect_right if inclusive else bisect_left
+        self._bit_length = base == 1024
+        self._formats: Dict[int, Tuple[Callable[[float], str], ...]] = {}
+
+    def formats(self, decimal_places: int) -> Tuple[Callable[[float], str], ...]:
+        """Return a function formatting a float for each unit"""
+        formats = self._formats.get(decimal_places)
+        if formats is None:
+            formats = self._formats[decimal_places] = tuple(
+                _percent_format(self._base_decimal_places if index == 0 else decimal_places,
+                                self._separator + unit)
+                for index, unit in enumerate(self.units))
+        return formats
+
+    def index(self, value: float) -> int:
+        """Return the index of the unit to show value with"""
+        if self._bit_length and type(value) is int and value > 1:
+            # 1024 ** n takes 10 * n + 1 bits
+            index = ((value if self._inclusive else value - 1).bit_length() - 1) // 10
+            return index if index < self._top else self._top
+        # there are only as many thresholds as units above the first
+        return self._bisect(self._thresholds, value)
+
+    def format(self, value: float, decimal_places: int = 2) -> str:
+        index = self.index(value)
+        return self.formats(decimal_places)[index](value / self._divisors[index])
+
+    def format_many(self, values: Iterable[float], decimal_places: int = 2) -> List[str]:
+        """Format a sequence of values in one call"""
+        formats = self.formats(decimal_places)
+        if not isinstance(values, (list, tuple)):
+            values = list(values)
+        divisors = self._divisors
+        # bisecting in C beats the bit length in Python, over a whole list
+        indexes = map(partial(self._bisect, self._thresholds), values)
+        return [formats[each_index](value / divisors[each_index])
+                for value, each_index in zip(values, indexes)]
@@ -1,15 +1,20 @@
 import os
 import time
 import json
-import subprocess
-from glob import glob
-from pathlib import Path
 
 from .defaults import excluded_block_devices
-from typing import List, Dict, Any, Tuple
+from .instrument import instrumentation
+from .units import UnitScale
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+if TYPE_CHECKING:
+    import subprocess
 import logging
 logger = logging.getLogger(__name__)
 
+# powers of 1024, with the names quickscan has always shown them by
+_SIZE_SCALE = UnitScale(('B', 'KB', 'MB', 'GB', 'TB', 'PB'), 1024, inclusive=True, separator=' ',
+                        base_decimal_places=2)
+
 
 def timeit(func):
     def wrap(*args, **kwargs):
@@ -18,20 +23,52 @@ def timeit(func):
         result = func(*args, **kwargs)
         elapsed = time.time() - start_time
         logger.debug(f'{func.__name__} complete. Runtime {elapsed:.10f} secs')
+        instrumentation.add_time(func.__name__, elapsed)
         return result
     return wrap
 
 
 @timeit
-def get_block_devs() -> List[str]:
+def get_block_devs(block_dir: str = '/sys/block') -> List[str]:
     """Determine the list of block devices by looking at /sys/block"""
-    devs = [dev for dev in os.listdir('/sys/block')
+    devs = [dev for dev in os.listdir(block_dir)
             if not dev.startswith(excluded_block_devices)]
     logger.info(f'{len(devs)} devices detected')
     return devs
 
 
-def issue_cmd(cmd: str) -> subprocess.CompletedProcess:
+# executables found on PATH, by (name, PATH)
+_programs: Dict[Tuple[str, str], Optional[str]] = {}
+
+
+def find_program(name: str) -> Optional[str]:
+    """Return the path of an executable on PATH, or None.
+
+    Works as shutil.which (without importing shutil), and remembers the answer for the life of
+    the process. A remembered path is checked again before being returned.
+    """
+    search_path = os.environ.get('PATH', os.defpath)
+    key = (name, search_path)
+    found = _programs.get(key)
+    if found and os.access(found, os.X_OK):
+        return found
+    if key in _programs and found is None:
+        return None
+
+    found = None
+    for directory in search_path.split(os.pathsep):
+        candidate = os.path.join(directory or os.curdir, name)
+        if os.access(candidate, os.X_OK) and not os.path.isdir(candidate):
+            found = candidate
+            break
+    _programs[key] = found
+    return found
+
+
+def issue_cmd(cmd: str) -> 'subprocess.CompletedProcess':
+    # subprocess is only needed when a command runs, so it isn't imported up front
+    import subprocess
+    instrumentation.count('subprocesses')
     return subprocess.run(cmd.split(' '), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 
@@ -62,8 +99,53 @@ def get_lvm_metadata(lvm_cmd: str, lvm_type: str) -> List[Dict[str, Any]]:
     return []
 
 
-def get_link_data(glob_pattern) -> List[Tuple[str, str]]:
-    return [(link, os.path.basename(str(Path(link).resolve()))) for link in glob(glob_pattern)]
+def resolve_link(path: str, cache: Dict[str, str]) -> str:
+    """Return the name of the file a (chain of) symlinks ends at, or the path's own name when
+    it isn't a link.
+
+    Links are followed with readlink, and every path met on the way is cached along with what it
+    resolved to, so the many links that point at the same device cost one readlink each.
+    """
+    seen = []
+    name = None
+    for _i in range(40):  # the kernel's limit on nested links (ELOOP)
+        name = cache.get(path)
+        if name is not None:
+            break
+        seen.append(path)
+        try:
+            target = os.readlink(path)
+        except OSError:
+            # not a link (or gone): this is where the chain ends
+            name = os.path.basename(path)
+            break
+        path = os.path.normpath(os.path.join(os.path.dirname(path), target))
+    else:
+        logger.warning(f'too many levels of symbolic links at {seen[0]}')
+        name = os.path.basename(path)
+    for path in seen:
+        cache[path] = name
+    return name
+
+
+def scan_links(directory: str,
+               prefixes: Tuple[str, ...],
+               cache: Dict[str, str]) -> Dict[str, List[Tuple[str, str]]]:
+    """Return the links in a directory with names starting with each of the prefixes, as
+    (link path, name of the device it resolves to) pairs - one directory read for all prefixes"""
+    links: Dict[str, List[Tuple[str, str]]] = {prefix: [] for prefix in prefixes}
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted((entry.name, entry.path) for entry in it
+                             if entry.name.startswith(prefixes))
+    except OSError as e:
+        logger.debug(f'unable to scan {directory}: {str(e)}')
+        return links
+    for name, path in entries:
+        prefix = next(prefix for prefix in prefixes if name.startswith(prefix))
+        links[prefix].append((path, resolve_link(path, cache)))
+    instrumentation.count('links_resolved', len(entries))
+    return links
 
 
 def read_file(file_name) -> str:
@@ -83,15 +165,7 @@ def human_readable_size(size):
     Take a size in bytes, and transform it into a human readable size with up
     to two decimals of precision.
     """
-    suffixes = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
-    for suffix in suffixes:
-        if size >= 1024:
-            size = size / 1024
-        else:
-            break
-    return "{size:.2f} {suffix}".format(
-        size=size,
-        suffix=suffix)
+    return _SIZE_SCALE.format(size)
 
 
 @timeit
@@ -0,0 +1,307 @@
+import os
+import json
+import signal
+import asyncio
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set
+
+from quickscan.common.filter import ObjectFilter
+from quickscan.common.uevent import (
+    open_uevent_socket,
+    receive_events,
+    read_event_file,
+    block_device_name)
+from quickscan.common.utils import get_block_devs
+from quickscan.quickscan.devices import Devices
+
+logger = logging.getLogger(__name__)
+
+# responses (and compiled filters) kept for repeated requests, per inventory generation
+_max_cached_responses = 256
+
+
+class RequestError(ValueError):
+    pass
+
+
+class InventoryDaemon:
+    """Keep a Devices inventory current from block uevents, and serve it over a UNIX socket.
+
+    The inventory is built once. After that, each add/change/remove uevent only rebuilds (and
+    re-analyses) the devices it affects. Updates run one batch at a time on a worker thread, and
+    events that arrive meanwhile are coalesced into the next batch. Every revalidate_interval
+    seconds the devices are also checked against their fingerprints, to catch what the uevents
+    missed.
+
+    Clients connect to the socket, send a JSON request line and get one JSON document back:
+
+      {"command": "report"}          the inventory (the default, also for an empty line)
+      {"command": "report", "filter": "available=true,size>=1T", "fields": ["path", "size"]}
+                                     the matching devices, limited to some of their fields
+      {"command": "filter", "filter": "available=true"}
+                                     just the paths of the matching devices
+      {"command": "revalidate"}      check the fingerprints now, returning the devices that changed
+
+    Responses carry the generation of the inventory, bumped by every change. They are kept until
+    the next change, so repeated requests are answered without being worked out again.
+    """
+
+    def __init__(self,
+                 devices: Devices,
+                 socket_path: str,
+                 event_file: Optional[str] = None,
+                 netlink: bool = True,
+                 revalidate_interval: Optional[float] = None) -> None:
+        self.devices = devices
+        self.socket_path = socket_path
+        self.generation = 0
+        self._event_file = event_file
+        self._netlink = netlink
+        self._revalidate_interval = revalidate_interval
+        self._responses: Dict[str, bytes] = {}
+        self._responses_generation = 0
+        self._filters: Dict[str, ObjectFilter] = {}
+        self._pending: Set[str] = set()
+        self._updating = False
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    def affected_devices(self, event: Dict[str, str]) -> List[str]:
+        """Return the device nodes whose inventory entry an event can change"""
+        name = block_device_name(event)
+        if not name:
+            return []
+
+        if event.get('DEVTYPE') == 'partition':
+            # partitions only matter to the availability of their parent disk
+            return [os.path.basename(os.path.dirname(event.get('DEVPATH', '')))]
+
+        if name.startswith('dm-'):
+            # an LV or multipath map changes the devices it sits on: the slaves of a new/changed
+            # map, or the devices that listed a removed one as a holder
+            nodes = set(self.devices.topology.held_by(name))
+            slaves_dir = os.path.join(self.devices._block_dir, name, 'slaves')
+            if os.path.isdir(slaves_dir):
+                nodes.update(os.listdir(slaves_dir))
+            return sorted(nodes)
+
+        return [name]
+
+    def _affected_by(self, events: List[Dict[str, str]]) -> List[str]:
+        nodes: Set[str] = set()
+        for event in events:
+            logger.debug(f'uevent {event.get("ACTION")} {event.get("DEVPATH")}')
+            nodes.update(self.affected_devices(event))
+        return sorted(nodes)
+
+    def apply_events(self, events: List[Dict[str, str]]) -> None:
+        """Apply a batch of events synchronously"""
+        nodes = self._affected_by(events)
+        if nodes:
+            self.devices.update_devices(nodes)
+            self.generation += 1
+
+    def _all_devices(self) -> List[str]:
+        return sorted(set(get_block_devs(self.devices._block_dir))
+                      | set(self.devices._devices_by_node))
+
+    def report(self,
+               dev_filter: Optional[ObjectFilter] = None,
+               fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        return {
+            'generation': self.generation,
+            'devices': [dev.as_dict(fields) for dev in self.devices.select(dev_filter)],
+        }
+
+    def _filter(self, request: Dict[str, Any]) -> Optional[ObjectFilter]:
+        kv = request.get('filter')
+        if not kv:
+            return None
+        if not isinstance(kv, str):
+            raise RequestError('filter must be a string')
+        dev_filter = self._filters.get(kv)
+        if dev_filter is None:
+            dev_filter = ObjectFilter(kv, aliases=Devices.filter_aliases)
+            if not dev_filter.valid:
+                raise RequestError(f'invalid filter: {kv}')
+            if len(self._filters) >= _max_cached_responses:
+                self._filters.clear()
+            self._filters[kv] = dev_filter
+        return dev_filter
+
+    def _fields(self, request: Dict[str, Any]) -> Optional[List[str]]:
+        fields = request.get('fields')
+        if fields is None:
+            return None
+        if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+            raise RequestError('fields must be a list of field names')
+        fields = Devices.resolve_fields(fields)
+        unknown = [field for field in fields if field not in Devices.report_fields]
+        if unknown:
+            raise RequestError(f'unknown fields: {",".join(unknown)}')
+        return fields
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        command = request.get('command', 'report')
+        if command == 'report':
+            return self.report(self._filter(request), self._fields(request))
+        if command == 'filter':
+            return {'generation': self.generation,
+                    'paths': [dev.path for dev in self.devices.select(self._filter(request))]}
+        raise RequestError(f'unknown command: {command}')
+
+    async def _respond(self, line: bytes) -> bytes:
+        try:
+            request = json.loads(line) if line.strip() else {}
+            if not isinstance(request, dict):
+                raise RequestError('a request must be a JSON object')
+            if request.get('command') == 'revalidate':
+                changed = await self.revalidate()
+                return self._encode({'generation': self.generation, 'changed': changed})
+
+            if self._responses_generation != self.generation:
+                self._responses.clear()
+                self._responses_generation = self.generation
+            key = json.dumps(request, sort_keys=True)
+            response = self._responses.get(key)
+            if response is None:
+                response = self._encode(self._answer(request))
+                if len(self._responses) >= _max_cached_responses:
+                    self._responses.clear()
+                self._responses[key] = response
+            return response
+        except ValueError as e:
+            # RequestError, and JSON that doesn't parse
+            return self._encode({'error': f'invalid request: {str(e)}'})
+
+    @staticmethod
+    def _encode(response: Dict[str, Any]) -> bytes:
+        return json.dumps(response).encode('utf-8') + b'\n'
+
+    def _queue(self, nodes: List[str]) -> None:
+        self._pending.update(nodes)
+        if self._pending and not self._updating:
+            self._updating = True
+            self._idle.clear()
+            self._loop.create_task(self._process_pending())
+
+    async def _process_pending(self) -> None:
+        try:
+            while self._pending:
+                batch = sorted(self._pending)
+                self._pending.clear()
+                logger.info(f'updating {len(batch)} devices: {batch}')
+                try:
+                    await self._loop.run_in_executor(self._executor,
+                                                     self.devices.update_devices, batch)
+                except Exception:
+                    logger.exception('device update failed')
+                self.generation += 1
+        finally:
+            self._updating = False
+            self._idle.set()
+
+    def _on_uevent(self, sock) -> None:
+        try:
+            events = receive_events(sock)
+        except OSError:
+            logger.warning('uevents lost, rescanning all devices')
+            self._queue(self._all_devices())
+            return
+        self._queue(self._affected_by(events))
+
+    async def revalidate(self) -> List[str]:
+        """Rebuild the devices whose fingerprint changed, in turn with the uevent updates"""
+        changed = await self._loop.run_in_executor(self._executor, self.devices.revalidate)
+        if changed:
+            self.generation += 1
+        return changed
+
+    async def _revalidate_periodically(self) -> None:
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), self._revalidate_interval)
+            except asyncio.TimeoutError:
+                try:
+                    await self.revalidate()
+                except Exception:
+                    logger.exception('device revalidation failed')
+
+    async def _handle_client(self, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+        except (ConnectionError, ValueError):
+            # gone, or a request line over the stream limit
+            writer.close()
+            return
+
+        response = await self._respond(line)
+        writer.write(response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def wait_idle(self) -> None:
+        """Wait until all queued device updates have been applied"""
+        await self._idle.wait()
+
+    def stop(self) -> None:
+        """Ask a running daemon to shut down. Safe to call from any thread."""
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def serve(self) -> None:
+        self._loop = asyncio.get_event_loop()
+        self._stop = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f'serving the device inventory on {self.socket_path}')
+
+        sock = None
+        if self._netlink:
+            sock = open_uevent_socket()
+            self._loop.add_reader(sock.fileno(), self._on_uevent, sock)
+        if self._event_file:
+            self._queue(self._affected_by(list(read_event_file(self._event_file))))
+        revalidation = None
+        if self._revalidate_interval:
+            revalidation = self._loop.create_task(self._revalidate_periodically())
+
+        try:
+            await self._stop.wait()
+        finally:
+            if revalidation:
+                await revalidation
+            if sock:
+                self._loop.remove_reader(sock.fileno())
+                sock.close()
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self._executor.shutdown(wait=True)
+            logger.info('daemon stopped')
+
+    def run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+        try:
+            loop.run_until_complete(self.serve())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -1,35 +1,52 @@
+import io
 import os
 import json
 import string
-import shutil
+import time
 import logging
+import threading
 
-from glob import glob
-from typing import Dict, Any, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterable, List, Tuple, Optional, TextIO
 from quickscan.common.utils import (
+    find_program,
     get_block_devs,
     get_lvm_metadata,
-    read_file,
     timeit,
     human_readable_size,
-    get_link_data,
     is_device_locked,
-    parse_tags,
-    issue_cmd)
-from quickscan.common.filter import ObjectFilter
-from quickscan.common.concurrent import concurrent_cmds, async_run
+    parse_tags)
+from quickscan.common.filter import ObjectFilter, FilterIndex
+from quickscan.common.lockprobe import LockProber, ProbeResult
+from quickscan.common.lvm import LVMBackups
+from quickscan.common.signatures import SignatureProber
+from quickscan.common.instrument import instrumentation
+from quickscan.common.sysfs import read_device_attributes, read_attribute
+from quickscan.common.topology import Topology
+from quickscan.common.cache import ScanCache, lvm_metadata_generation
 from quickscan.common.enums import ReportFormat
+from quickscan.common.report import report_writer
+from quickscan.common import defaults
+from quickscan.quickscan.sysapi import SysApi
+if TYPE_CHECKING:
+    from subprocess import CompletedProcess
 
 logger = logging.getLogger(__name__)
 
 # Differences to ceph-volume
 # - don't follow partitions - the presence of partitions makes the device ineligible, anyway
 # - don't try and get an exclusive lock if the device is already rejected
-# - if the device looks empty - inspect the signature with wipefs, to be sure (detects mdraid,
-#   btrfs, gpt etc)
+# - if the device looks empty - inspect the signature, to be sure (detects mdraid, btrfs, gpt etc)
+#   by reading the superblock locations directly, and with wipefs when that finds data it
+#   doesn't recognise
 
 
 class BaseDevice:
+    # thousands of devices can be held at once, so instances don't carry a __dict__
+    __slots__ = ('_parent', '_dev_node', '_block_dir', '_holders', '_lsm_data', 'dev_path',
+                 'alt_path', 'mpath_device', 'mpath_node', 'dev_nodes', 'enclosure_id',
+                 'enclosure_slot', 'sys_api', '_lvs', '_device_id', '_sysfs_read', '_topology')
+
     _device_attributes = [
         'removable',
         'size',
@@ -46,7 +63,50 @@ class BaseDevice:
         'queue/scheduler',
         'queue/discard_granularity',
     ]
-    _block_dir = '/sys/block'
+    # everything read from sysfs for a device, including attributes only used in post processing
+    _sysfs_attributes = _device_attributes + ['queue/logical_block_size']
+    _all_attributes = frozenset(_sysfs_attributes)
+    # the sysfs attributes each sys_api field is built from, read together on first use
+    _field_attributes = {
+        'size': ['size', 'queue/logical_block_size'],
+        'sectors': ['size', 'queue/logical_block_size'],
+        'sectorsize': ['size', 'queue/logical_block_size'],
+        'human_readable_size': ['size', 'queue/logical_block_size'],
+        'removable': ['removable'],
+        'ro': ['ro'],
+        'serial': ['serial', 'device/serial', 'device/vpd_pg80'],
+        'model': ['device/model'],
+        'vendor': ['device/vendor'],
+        'wwid': ['device/wwid'],
+        'rev': ['device/rev'],
+        'nr_requests': ['queue/nr_requests'],
+        'rotational': ['queue/rotational'],
+        'scheduler': ['queue/scheduler'],
+        'discard_granularity': ['queue/discard_granularity'],
+    }
+    # the sys_api fields other report fields are derived from
+    _derived_fields = {'device_id': ['sys_api/vendor', 'sys_api/model', 'sys_api/serial']}
+    # attributes restored from a scan cache record, instead of being rebuilt
+    _cached_attributes = ['sys_api', '_lvs', 'mpath_device', 'mpath_node']
+    # the fields of a device's JSON record
+    _report_fields = [
+        'alt_path',
+        'dev_nodes',
+        'dev_path',
+        'device_id',
+        'enclosure_id',
+        'enclosure_slot',
+        'lsm_data',
+        'lvs',
+        'mpath_device',
+        'mpath_node',
+        'path',
+        'scsi_addr',
+        'sys_api',
+    ]
+    # the fields the text report shows
+    _text_fields = ['path', 'dev_nodes', 'sys_api/human_readable_size', 'sys_api/rotational',
+                    'sys_api/model']
     _min_osd_size_bytes = 10737418240
     _report_template = '{dev:<25} {size:>10}  {rot!s:<7}  {model:<25} {dev_nodes:<16}'
     _report_headings = _report_template.format(
@@ -57,43 +117,127 @@ class BaseDevice:
         dev_nodes='Device Nodes'
     )
 
-    def __init__(self, parent, dev_node: str) -> None:
+    def __init__(self,
+                 parent,
+                 dev_node: str,
+                 cached: Optional[Dict[str, Any]] = None,
+                 topology: Optional[Topology] = None) -> None:
         self._parent = parent
+        # the topology the device was built against, which an update builds before the parent
+        # switches to it
+        self._topology = topology if topology is not None else parent.topology
         self._dev_node = dev_node
-        self.dev_path = f'/dev/{dev_node}'
+        self._block_dir = parent._block_dir
+        self.dev_path = os.path.join(parent._dev_dir, dev_node)
         self.alt_path = ''
         self.mpath_device = ''
         self.mpath_node = ''
         self.dev_nodes = ''
         self.enclosure_id = ''
         self.enclosure_slot = ''
-        self.sys_api: Dict[str, Any] = {}
-        self.lsm_data: Dict[str, Any] = {}
-
-        self._holders = glob(os.path.join(self._block_dir, self._dev_node, 'holders/*'))
-        self.lvs = self._build_lvs()  # must run after _holders is created
-
-        self._build()
+        self.sys_api = SysApi(loader=self._load_sysfs)
+        self._lsm_data: Optional[Dict[str, Any]] = None
+        # built on first use, unless the parent asks for them up front
+        self._lvs: Optional[List[Dict[str, Any]]] = None
+        self._device_id: Optional[str] = None
+        self._sysfs_read = frozenset()
+
+        self._holders = self._topology.holders(dev_node)
+        if cached:
+            self._restore(cached)
+        else:
+            self._build()
+        # read the fields the parent's callers need now, on the worker threads, rather than one
+        # at a time on first use
+        self._read_sysfs(parent._sysfs_prefetch)
+        if parent._prefetch_lvs and self._lvs is None:
+            self._lvs = self._build_lvs()  # must run after _holders is created
 
     def _build(self) -> None:
-        self._process_sysfs()
         self._detect_mpath()
 
+    def _read_sysfs(self, attributes: Iterable[str]) -> None:
+        """Read and process the given sysfs attributes, skipping those already read"""
+        unread = [attrib for attrib in attributes if attrib not in self._sysfs_read]
+        if not unread:
+            return
+        with instrumentation.phase('sysfs', self._dev_node):
+            sysfs = read_device_attributes(os.path.join(self._block_dir, self._dev_node), unread)
+        self._process_sysfs(sysfs)
+        self._mark_read(unread)
+
+    def _mark_read(self, attributes: Iterable[str]) -> None:
+        read = self._sysfs_read.union(self._all_attributes.intersection(attributes))
+        # fully read devices share the one set
+        self._sysfs_read = self._all_attributes if len(read) == len(self._all_attributes) else read
+
+    def _load_sysfs(self, field: Optional[str]) -> None:
+        # the sys_api loader: reads the attributes behind a field, or every attribute for None
+        self._read_sysfs(self._field_attributes.get(field, [])
+                         if field else self._sysfs_attributes)
+
+    def _restore(self, cached: Dict[str, Any]) -> None:
+        for attr in self._cached_attributes:
+            if attr in cached:
+                setattr(self, attr, cached[attr])
+        self.sys_api = SysApi(self.sys_api, loader=self._load_sysfs)
+        self._sysfs_read = frozenset(attrib for field in self.sys_api.to_dict(load=False)
+                                     for attrib in self._field_attributes.get(field, []))
+
+    def cache_data(self) -> Dict[str, Any]:
+        """Return the state of the device that a scan cache can restore it from.
+
+        Only what has been read so far is saved, the rest is read on first use once restored.
+        """
+        data = {attr: getattr(self, attr) for attr in self._cached_attributes}
+        data['sys_api'] = self.sys_api.to_dict(load=False)
+        return data
+
+    @classmethod
+    def sysfs_attributes_for(cls, fields: Optional[Iterable[str]]) -> List[str]:
+        """Return the sysfs attributes the given report fields are built from (None: all)"""
+        if fields is None:
+            return cls._sysfs_attributes
+        needed = set()
+        for field in fields:
+            if field == 'sys_api':
+                return cls._sysfs_attributes
+            for sys_field in cls._derived_fields.get(field, [field]):
+                if sys_field.startswith('sys_api/'):
+                    needed.update(cls._field_attributes.get(sys_field[8:], []))
+        return [attrib for attrib in cls._sysfs_attributes if attrib in needed]
+
+    @property
+    def lsm_data(self) -> Dict[str, Any]:
+        # most devices have none, so the dict is only created when data is set
+        return self._lsm_data if self._lsm_data is not None else {}
+
+    @lsm_data.setter
+    def lsm_data(self, data: Dict[str, Any]) -> None:
+        self._lsm_data = data
+
     def _detect_mpath(self) -> None:
-        for holder_path in self._holders:
-            dev = os.path.basename(holder_path)
-            if dev in self._parent._mpath_device_map:
-                self.mpath_device = self._parent._mpath_device_map.get(dev)
+        for dev in self._holders:
+            mpath_device = self._topology.mpath_device(dev)
+            if mpath_device:
+                self.mpath_device = mpath_device
                 self.mpath_node = dev
 
+    @property
+    def lvs(self) -> List[Dict[str, Any]]:
+        # the LV tags can mean running lvs, so they're only gathered when asked for
+        if self._lvs is None:
+            self._lvs = self._build_lvs()
+        return self._lvs
+
     def _build_lvs(self) -> List[Dict[str, Any]]:
         lvs = []
-        for holder_path in self._holders:
-            holder_dev = os.path.basename(holder_path)
-            lv_info = self._parent._lv_device_map.get(holder_dev, {})
+        for holder_dev in self._holders:
+            lv_info = self._topology.lv(holder_dev)
             if lv_info:
+                lv_info = dict(lv_info)
                 key = f'{lv_info["vg_name"]}-{lv_info["lv_name"]}'
-                metadata = self._parent._lv_metadata.get(key, {})
+                metadata = self._parent._lv_metadata_for(self._topology).get(key, {})
                 tags_str = metadata.get('lv_tags', '')
                 ceph_lv = False
                 if tags_str:
@@ -115,15 +259,16 @@ class BaseDevice:
 
     @property
     def scsi_addr(self) -> str:
-        scsi_addr_path = glob(f'/sys/block/{self._dev_node}/device/bsg/*')
-        return '' if not scsi_addr_path else os.path.basename(scsi_addr_path[0])
+        return self._topology.scsi_addr(self._dev_node)
 
     @property
     def device_id(self) -> str:
-        vendor = self.sys_api['vendor'].strip() or ''
-        model = self.sys_api['model'].strip() or ''
-        serial = self.sys_api['serial'].strip() or ''
-        return ('_'.join([vendor, model, serial])).replace(' ', '_')
+        if self._device_id is None:
+            vendor = self.sys_api['vendor'].strip() or ''
+            model = self.sys_api['model'].strip() or ''
+            serial = self.sys_api['serial'].strip() or ''
+            self._device_id = ('_'.join([vendor, model, serial])).replace(' ', '_')
+        return self._device_id
 
     @property
     def _dev_nodes_str(self):
@@ -131,20 +276,19 @@ class BaseDevice:
                           os.path.basename(self.alt_path)])).rstrip(',')
 
     @timeit
-    def _process_sysfs(self) -> None:
+    def _process_sysfs(self, sysfs: Dict[str, str]) -> None:
         logger.info(f'processing {self._dev_node}')
         for attrib in self._device_attributes:
-            fname = os.path.join(self._block_dir, self._dev_node, attrib)
-            content = read_file(fname)
+            if attrib not in sysfs:
+                continue
+            content = sysfs[attrib]
             key = os.path.basename(attrib)
 
             # post processing
             if key == 'size':
-                logical_size = read_file(os.path.join(self._block_dir,
-                                                      self._dev_node,
-                                                      'queue/logical_block_size'))
-                self.sys_api['sectors'] = int(content)
-                self.sys_api['sectorsize'] = int(logical_size)
+                logical_size = sysfs['queue/logical_block_size']
+                self.sys_api['sectors'] = content
+                self.sys_api['sectorsize'] = logical_size
                 try:
                     content = int(logical_size) * int(content)
                 except ValueError:
@@ -165,25 +309,45 @@ class BaseDevice:
 
             self.sys_api[key] = content
 
+    def as_dict(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return the device's JSON record, optionally limited to some of its fields.
+
+        A sys_api/<name> field adds just that property to the record's sys_api, and fields the
+        device doesn't have are left out.
+        """
+        if fields is None:
+            data = {field: getattr(self, field) for field in self._report_fields}
+            data['sys_api'] = self.sys_api.to_dict()
+            return data
+
+        data = {}
+        for field in fields:
+            if field.startswith('sys_api/'):
+                value = self.sys_api.get(field[8:])
+                if value is not None:
+                    data.setdefault('sys_api', {})[field[8:]] = value
+            elif field == 'sys_api':
+                data['sys_api'] = {**data.get('sys_api', {}), **self.sys_api.to_dict()}
+            elif field in self._report_fields:
+                data[field] = getattr(self, field)
+        return data
+
     def as_json(self) -> str:
-        data = {
-            k: getattr(self, k) for k in dir(self)
-            if not k.startswith('_')
-            and isinstance(getattr(self, k), (float, int, str, list, dict, tuple))
-        }
-        return json.dumps(data, indent=2, sort_keys=True)
+        return json.dumps(self.as_dict(), indent=2, sort_keys=True)
 
     def as_text(self) -> str:
         return self._report_template.format(
                 dev=self.path,
                 size=self.sys_api['human_readable_size'],
-                rot='HDD' if self.sys_api['rotational'] == '1' else 'Flash',
+                rot='HDD' if self.sys_api['rotational'] == 1 else 'Flash',
                 model=self.sys_api['model'],
                 dev_nodes=self._dev_nodes_str
             )
 
 
 class Device(BaseDevice):
+    __slots__ = ('reject_reasons', '_signatures', 'lock_probe_ms')
+
     _report_template = '{dev:<25} {size:>10}  {rot!s:<7}  {available!s:<9}  {model:<25} {dev_nodes:<16} {reject}'  # noqa: E501
     _report_headings = _report_template.format(
         dev='Device Path',
@@ -195,9 +359,17 @@ class Device(BaseDevice):
         reject='Reject Reasons'
     )
 
-    def __init__(self, *args):
-        super().__init__(*args)
+    _report_fields = sorted(BaseDevice._report_fields
+                            + ['available', 'reject_reasons', 'lock_probe_ms'])
+    _text_fields = BaseDevice._text_fields + ['available', 'reject_reasons']
+
+    def __init__(self, *args, **kwargs):
         self.reject_reasons = []
+        # signature types found on the device, None until the device has been inspected
+        self._signatures: Optional[List[str]] = None
+        # how long the O_EXCL lock probe took, None when the device wasn't probed
+        self.lock_probe_ms: Optional[float] = None
+        super().__init__(*args, **kwargs)
 
     @property
     def available(self):
@@ -209,10 +381,10 @@ class Device(BaseDevice):
         #    and be referenced in a later check function
         # 2. keep this analysis quick - anything that needs >20ms should be handled in the
         #    parent class analyse phase
+        # 3. the lock check follows, run by the parent for all devices at once
         self._check_size()
         self._check_partitions()
         self._check_LVM()
-        self._check_locked()
 
     def _check_size(self) -> None:
         if self.sys_api['size'] < self._min_osd_size_bytes:
@@ -220,30 +392,36 @@ class Device(BaseDevice):
                 f'Device too small (< {human_readable_size(self._min_osd_size_bytes)})')
 
     def _check_partitions(self) -> None:
-        dirs = glob(os.path.join(self._block_dir, self._dev_node, f'{self._dev_node}*'))
-        if dirs:
+        if self._topology.partitions(self._dev_node):
             self.reject_reasons.append('Has partitions')
 
     def _check_LVM(self) -> None:
-        dev_nodes = f'{self._dev_node} {self.mpath_node}'.split(' ')
-        if any(node in self._parent._pv_devices for node in dev_nodes):
+        topology = self._topology
+        if topology.is_pv(self._dev_node) or (self.mpath_node and topology.is_pv(self.mpath_node)):
             self.reject_reasons.append('LVM device')
 
-    def _check_locked(self) -> None:
+    def _needs_lock_check(self) -> bool:
         if self.reject_reasons:
             logger.info(f'skipping "lock" check, since {self.dev_path} has already been rejected')
-        elif self.mpath_device:
+            return False
+        if self.mpath_device:
             logger.info('skipping "lock" check for mpath enabled device')
-        else:
-            # device could be free, let's confirm by trying to get an EXCL lock
-            if is_device_locked(self.dev_path):
-                self.reject_reasons.append('Locked')
+            return False
+        # device could be free, let's confirm by trying to get an EXCL lock
+        return True
+
+    def _check_locked(self, probe: ProbeResult) -> None:
+        self.lock_probe_ms = round(probe.latency * 1000, 3)
+        if probe.locked is None:
+            self.reject_reasons.append('probe timed out')
+        elif probe.locked:
+            self.reject_reasons.append('Locked')
 
     def as_text(self) -> str:
         return self._report_template.format(
                 dev=self.path,
                 size=self.sys_api['human_readable_size'],
-                rot='HDD' if self.sys_api['rotational'] == '1' else 'Flash',
+                rot='HDD' if self.sys_api['rotational'] == 1 else 'Flash',
                 available=self.available,
                 model=self.sys_api['model'],
                 dev_nodes=self._dev_nodes_str,
@@ -257,82 +435,235 @@ class Devices:
         'lvs',
         'wipefs',
     ]
-
-    def __init__(self, skip_analysis: bool = True, disk_group_size: int = 10) -> None:
+    # whether lsm can be imported, once checked
+    _lsm_available: Optional[bool] = None
+    # short filter keys for the sysfs properties (size>=1T rather than sys_api/size>=1T)
+    filter_aliases = {field: f'sys_api/{field}' for field in SysApi._ordered_fields}
+    # every field a report can ask for, and those the text report shows
+    report_fields = Device._report_fields + [f'sys_api/{field}' for field in SysApi._ordered_fields]
+    text_fields = Device._text_fields
+
+    def __init__(self,
+                 skip_analysis: bool = True,
+                 disk_group_size: int = 10,
+                 max_concurrency: int = defaults.max_concurrent_cmds,
+                 cmd_timeout: Optional[float] = defaults.cmd_timeout,
+                 root: str = '/',
+                 use_cache: bool = False,
+                 cache_ttl: float = defaults.cache_ttl,
+                 on_device: Optional[Callable[[BaseDevice], None]] = None,
+                 max_workers: int = defaults.max_workers,
+                 probe_timeout: float = defaults.probe_timeout,
+                 native_lvm: bool = True,
+                 native_signatures: bool = True,
+                 fields: Optional[Iterable[str]] = None,
+                 track_changes: bool = False) -> None:
+        start = time.perf_counter()
+        self._root = root
+        self._block_dir = os.path.join(root, 'sys/block')
+        self._dev_dir = os.path.join(root, 'dev')
         self._skip_analysis = skip_analysis
         self._disk_group_size = disk_group_size
-        self._candidate_devices = get_block_devs()
-        self._lv_metadata: Dict[str, Dict[str, Any]] = self._build_lv_metadata()
-        self._pv_devices: List[str] = [
-            tgt for _linkname, tgt in get_link_data('/dev/disk/by-id/lvm-pv-uuid-*')
-        ]
-        self._mpath_device_map: Dict[str, str] = {
-            target: link for link, target in get_link_data('/dev/mapper/mpath*')
-        }
-        self._lv_device_map = self._build_lv_device_map()
-        self._device_data: List[Device] = self._build_devices()
-
-        try:
-            # requires python3-libstoragemgmt
-            import lsm  # noqa: F401
-        except ImportError:
-            self.lsm_available = False
-            logger.info('libstoragemgmt integration is NOT available')
-        else:
-            self.lsm_available = True
-            logger.info('libstoragemgmt integration is available')
+        self._max_concurrency = max_concurrency
+        self._cmd_timeout = cmd_timeout
+        self._max_workers = max_workers
+        self._probe_timeout = probe_timeout
+        # read LV tags from the LVM metadata backups, running lvs only when they fall short
+        self._native_lvm = native_lvm
+        self._lvm_backups = LVMBackups(os.path.join(root, defaults.lvm_backup_dir))
+        # read the signatures off the devices, running wipefs only for what isn't recognised
+        self._native_signatures = native_signatures
+        self._signature_prober = SignatureProber()
+        # the report fields the caller will use (None: all of them). Only those, and what the
+        # scan itself needs, are read up front - anything else is read when first asked for
+        self.fields = self.resolve_fields(fields) if fields is not None else None
+        required = None
+        if self.fields is not None:
+            required = self.fields + ['device_id'] + ([] if skip_analysis else ['sys_api/size'])
+        self._sysfs_prefetch = BaseDevice.sysfs_attributes_for(required)
+        self._prefetch_lvs = self.fields is None or 'lvs' in self.fields
+        # called with each device as soon as its result is final, to stream reports
+        self._on_device = on_device
+        self._candidate_devices = get_block_devs(self._block_dir)
+        # relationships between devices, shared by every device and open to callers
+        self.topology = Topology(self._block_dir, self._dev_dir)
+        self._reset_lvm_state()
+
+        self._cache: Optional[ScanCache] = None
+        self._fingerprints: Dict[str, Optional[List[Any]]] = {}
+        # fingerprint every device as it's scanned, so revalidate() can tell what changed since
+        self._track_changes = track_changes or use_cache
+        if use_cache:
+            self._cache = ScanCache(os.path.join(root, defaults.cache_file), cache_ttl)
+        # every device node, including the alternate paths to a multipath device
+        self._devices_by_node: Dict[str, BaseDevice] = self._build_devices()
+        self._device_data: List[BaseDevice] = self._dedup(self._devices_by_node)
+        self._filter_index: Optional[FilterIndex] = None
 
-        if not self._skip_analysis:
+        if self._skip_analysis:
+            for dev in self._device_data:
+                self._device_done(dev)
+        else:
+            self._map(Device.analyse, self._device_data)
+            self._check_locks(self._device_data)
             self.analyse()
 
+        if self._cache:
+            self._save_cache()
+        instrumentation.add_time('scan', time.perf_counter() - start)
+
     @classmethod
-    def can_run(cls) -> Tuple[bool, List[str]]:
+    def can_run(cls, root: str = '/') -> Tuple[bool, List[str]]:
         reasons = []
 
-        if os.getuid() != 0:
+        # a synthetic tree (root other than /) doesn't need privileges to scan
+        if os.getuid() != 0 and os.path.realpath(root) == '/':
             reasons.append('must be root or run with sudo privileges')
-        if not os.path.exists('/dev/disk'):
+        if not os.path.exists(os.path.join(root, 'dev/disk')):
             reasons.append('/dev/disk not present - udev required')
         for pgm in cls._dependencies:
-            if not shutil.which(pgm):
+            if not find_program(pgm):
                 reasons.append(f'{pgm} not installed')
 
         return len(reasons) == 0, reasons
 
-    def _build_lv_metadata(self) -> Dict[str, Dict[str, Any]]:
+    @property
+    def lsm_available(self) -> bool:
+        # libstoragemgmt is slow to import, so it's only looked for when asked about, and once
+        if Devices._lsm_available is None:
+            try:
+                # requires python3-libstoragemgmt
+                import lsm  # noqa: F401
+            except ImportError:
+                Devices._lsm_available = False
+                logger.info('libstoragemgmt integration is NOT available')
+            else:
+                Devices._lsm_available = True
+                logger.info('libstoragemgmt integration is available')
+        return Devices._lsm_available
+
+    @classmethod
+    def resolve_fields(cls, fields: Iterable[str]) -> List[str]:
+        """Expand the short names (size, model...) in a list of report fields, dropping repeats"""
+        resolved: List[str] = []
+        for field in fields:
+            field = cls.filter_aliases.get(field, field)
+            if field not in resolved:
+                resolved.append(field)
+        return resolved
+
+    @property
+    def _lv_metadata(self) -> Dict[str, Dict[str, Any]]:
+        return self._lv_metadata_for(self.topology)
+
+    def _lv_metadata_for(self, topology: Topology) -> Dict[str, Dict[str, Any]]:
+        # only run lvs when a device with LV holders actually needs the metadata, and only once
+        # when several devices are built at the same time. Kept with the topology it was read
+        # for, as devices being rebuilt read it before their topology replaces self.topology
+        with self._lv_metadata_lock:
+            if self._lv_metadata_data is None or self._lv_metadata_topology is not topology:
+                self._lv_metadata_data = self._build_lv_metadata(topology)
+                self._lv_metadata_topology = topology
+        return self._lv_metadata_data
+
+    def _build_lv_metadata(self,
+                           topology: Optional[Topology] = None) -> Dict[str, Dict[str, Any]]:
+        if topology is None:
+            topology = self.topology
+        if self._native_lvm:
+            with instrumentation.phase('lvm_backup'):
+                native = self._lvm_backups.read(topology.lv_devices.values())
+            if native is not None:
+                logger.info(f'LVM metadata for {len(native)} LVs read from the backup files')
+                return native
+            logger.info('LVM metadata backups are incomplete, falling back to lvs')
+
         lv_metadata = {}
-        raw_lv_metadata = get_lvm_metadata('lvs -a -o vgname,lvname,tags --reportformat=json', 'lv')
+        with instrumentation.phase('lvs'):
+            raw_lv_metadata = get_lvm_metadata('lvs -a -o vgname,lvname,tags --reportformat=json',
+                                               'lv')
         for lv in raw_lv_metadata:
             key = f'{lv["vg_name"]}-{lv["lv_name"]}'
             lv_metadata[key] = lv
         return lv_metadata
 
-    def _build_lv_device_map(self) -> Dict[str, Dict[str, str]]:
-        map = {}
-        for link_name, target in get_link_data('/dev/disk/by-id/dm-name-*'):
-            link = os.path.basename(link_name.replace('--', '*'))
-            components = link.split('-')
-            if len(components) != 4:
-                logger.debug(f'skipping linkname {link_name}. Not an LV link')
-            else:
-                map[target] = {
-                    'vg_name': components[2].replace('*', '-'),
-                    'lv_name': components[3].replace('*', '-')
-                }
-        return map
-
-    def analyse(self) -> None:
+    def _reset_lvm_state(self) -> None:
+        # derived from LVM metadata, so rebuilt on demand after a change
+        self._lv_metadata_data: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lv_metadata_topology: Optional[Topology] = None
+        self._lv_metadata_lock = threading.Lock()
+        self._lvm_generation: Optional[List[List[Any]]] = None
+
+    def analyse(self, devices: Optional[List[Device]] = None) -> None:
+        """Run the checks that look across devices, or need an external command"""
+        if devices is None:
+            devices = self._device_data
+        # signatures are never cached - like the lock checks, they're read again on every scan
+        unprobed = {dev.path: dev for dev in devices if dev.available}
+        # everything else is final now, so it can be reported while the probes run
+        for dev in devices:
+            if dev.path not in unprobed:
+                self._finish_analysis(dev)
+        self._check_signatures(unprobed)
 
-        self._check_signatures()
-        self._check_multipath()
+    @timeit
+    def _check_locks(self, devices: List[Device]) -> None:
+        """Probe every device that could be free for an exclusive lock, all at once"""
+        candidates = [dev for dev in devices if dev._needs_lock_check()]
+        prober = LockProber(is_device_locked, timeout=self._probe_timeout,
+                            max_workers=self._max_workers)
+        results = prober.probe([dev.dev_path for dev in candidates])
+        for dev in candidates:
+            result = results[dev.dev_path]
+            instrumentation.add_time('lock_probe', result.latency, dev._dev_node)
+            dev._check_locked(result)
+        instrumentation.count('lock_probes', len(candidates))
+
+    def _finish_analysis(self, dev: Device) -> None:
+        if dev.available and dev._signatures:
+            logger.info(f'disk signature detected - rejecting {dev.path}')
+            dev.reject_reasons.append(f'{",".join(dev._signatures)} detected')
+        self._check_multipath(dev)
+        self._device_done(dev)
+
+    def _device_done(self, dev: BaseDevice) -> None:
+        if self._on_device:
+            self._on_device(dev)
 
     @timeit
-    def _check_signatures(self) -> None:
-        dev_paths = sorted([dev.path for dev in self._device_data if dev.available])
-        if not dev_paths:
-            logger.info('all disks are in use, no further analysis needed')
-            return
+    def _check_signatures(self, devices: Dict[str, Device]) -> None:
+        if not devices:
+            logger.info('no disks need a signature check')
+        else:
+            if self._native_signatures:
+                devices = self._probe_signatures(devices)
+            if devices:
+                self._run_wipefs(sorted(devices), devices)
+        logger.info('finished')
 
+    def _probe_signatures(self, devices: Dict[str, Device]) -> Dict[str, Device]:
+        """Read the signatures of the devices directly, returning those that need wipefs"""
+        def probe(path: str) -> Optional[List[str]]:
+            with instrumentation.phase('signature_probe', devices[path]._dev_node):
+                return self._signature_prober.probe(path)
+
+        paths = sorted(devices)
+        unknown = {}
+        for path, signatures in zip(paths, self._map(probe, paths)):
+            if signatures is None:
+                unknown[path] = devices[path]
+            else:
+                devices[path]._signatures = signatures
+                self._finish_analysis(devices[path])
+        instrumentation.count('signature_probes', len(paths))
+        if unknown:
+            logger.info(f'{len(unknown)} devices hold data that needs a closer look (wipefs)')
+        return unknown
+
+    def _run_wipefs(self, dev_paths: List[str], devices: Dict[str, Device]) -> None:
+        # asyncio takes longer to import than most scans take to run, so it's only loaded when
+        # wipefs is needed
+        from quickscan.common.concurrent import concurrent_cmds, async_run
         logger.info(f'inspecting disk signatures for {len(dev_paths)} devices: {dev_paths}')
 
         # Split the disks we need to take a closer look at into groups, then pass to
@@ -342,73 +673,265 @@ class Devices:
             paths = ' '.join(dev_paths[i:i + self._disk_group_size])
             disk_groups.append(f'wipefs -J --noheadings {paths}')
 
-        logger.debug(f'starting {len(disk_groups)} concurrent signature checks')
-        data = async_run(concurrent_cmds(issue_cmd, disk_groups))
+        logger.debug(f'starting {len(disk_groups)} signature checks, '
+                     f'{self._max_concurrency} at a time')
+        with instrumentation.phase('wipefs'):
+            async_run(concurrent_cmds(disk_groups,
+                                      max_concurrency=self._max_concurrency,
+                                      timeout=self._cmd_timeout,
+                                      on_complete=lambda completion: self._process_wipefs(
+                                          completion, devices)))
         logger.debug('finished concurrent command execution')
-        logger.debug(data)
-        logger.info('processing disk signature output')
-        for completion in data:
-            if completion.returncode != 0:
-                logger.error(f'wipefs command failed for {" ".join(completion.args)}')
-                continue
+
+    def _process_wipefs(self, completion: 'CompletedProcess', devices: Dict[str, Device]) -> None:
+        logger.debug(completion)
+        group_devices = [devices[path] for path in completion.args[3:]]
+        if completion.returncode != 0:
+            # failed or timed out - nothing is known about what the devices hold, so they can't
+            # be reported as free
+            logger.error(f'wipefs command failed for {" ".join(completion.args)}')
+            for dev in group_devices:
+                dev.reject_reasons.append('signature check failed')
+        else:
+            # wipefs names a device by the basename of the path it was given
+            group = {}
+            for dev in group_devices:
+                dev._signatures = []
+                group[os.path.basename(dev.path)] = dev
 
             if completion.stdout:
                 js = json.loads(completion.stdout.decode('utf-8'))
-                signatures = {}
                 for sig in js.get('signatures'):
-                    dev_name = sig['device']
-                    if dev_name in signatures:
-                        signatures[dev_name].add(sig['type'])
-                    else:
-                        signatures[dev_name] = {sig['type']}
-
-                for dev in self._device_data:
-                    if not dev.mpath_device:
-                        check_name = dev._dev_node
-                    else:
-                        check_name = os.path.basename(dev.mpath_device)
-
-                    if check_name in signatures:
-                        logger.info(f'disk signature detected - rejecting {check_name}')
-                        dev.reject_reasons.append(f'{",".join(signatures[check_name])} detected')
+                    dev = group.get(sig['device'])
+                    if dev and sig['type'] not in dev._signatures:
+                        dev._signatures.append(sig['type'])
 
-        logger.info('finished')
+        for dev in group_devices:
+            self._finish_analysis(dev)
 
-    @timeit
-    def _check_multipath(self) -> None:
-        for dev in self._device_data:
-            if dev.alt_path and not dev.mpath_node:
-                dev.reject_reasons.append('multipath configuration missing')
+    def _check_multipath(self, dev: Device) -> None:
+        if dev.alt_path and not dev.mpath_node:
+            dev.reject_reasons.append('multipath configuration missing')
 
     @timeit
-    def _build_devices(self) -> List[Device]:
+    def _build_devices(self) -> Dict[str, BaseDevice]:
+        dev_class = BaseDevice if self._skip_analysis else Device
+        cached = {}
+        if self._track_changes:
+            for dev_node in self._candidate_devices:
+                self._fingerprints[dev_node] = self._fingerprint(dev_node)
+        if self._cache:
+            for dev_node in self._candidate_devices:
+                record = self._cache.lookup(dev_node, self._fingerprints[dev_node])
+                if record:
+                    cached[dev_node] = record
+
+        def build(dev_node: str) -> BaseDevice:
+            if dev_node in cached:
+                return dev_class(self, dev_node, cached=cached[dev_node])
+            return dev_class(self, dev_node)
+
+        devices = self._map(build, self._candidate_devices)
+        return dict(zip(self._candidate_devices, devices))
+
+    def _map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Apply func to each item on the worker threads, returning the results in item order"""
+        items = list(items)
+        if self._max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def _dedup(self,
+               devices_by_node: Dict[str, BaseDevice],
+               candidate_devices: Optional[List[str]] = None) -> List[BaseDevice]:
+        """Report a device seen through several paths (multipath) only once"""
         dev_list = []
         dev_map = {}
-        for dev_node in self._candidate_devices:
-            if self._skip_analysis:
-                dev = BaseDevice(self, dev_node)
-            else:
-                dev = Device(self, dev_node)
+        alt_paths = {}
+        if candidate_devices is None:
+            candidate_devices = self._candidate_devices
+        for dev_node in candidate_devices:
+            dev = devices_by_node.get(dev_node)
+            if dev is None:
+                continue
 
             if dev.device_id in dev_map:
                 existing_device = dev_map[dev.device_id]
-                existing_device.alt_path = f'/dev/{dev_node}'
+                alt_paths[existing_device._dev_node] = os.path.join(self._dev_dir, dev_node)
                 logger.info(f'skipping {dev_node} as a duplicate of {existing_device.dev_path}')
             else:
-                if not self._skip_analysis:
-                    dev.analyse()
                 dev_map[dev.device_id] = dev
                 dev_list.append(dev)
 
+        for dev in dev_list:
+            dev.alt_path = alt_paths.get(dev._dev_node, '')
         return dev_list
 
-    def as_json(self, dev_filter: Optional[ObjectFilter] = None) -> str:
-        s = ''
-        for dev in self._device_data:
-            if dev_filter and not dev_filter.ok(dev):
+    @timeit
+    def update_devices(self, dev_nodes: List[str], topology: Optional[Topology] = None) -> None:
+        """Bring the inventory up to date after the given devices were added, changed or removed.
+
+        Only the affected devices, and the other paths to the same multipath device, are rebuilt
+        and analysed. The new topology and devices are built aside (topology, when given, is one
+        already read for the purpose), and replace the old ones once complete, so the inventory
+        can be read throughout.
+        """
+        changed = {dev_node for dev_node in dev_nodes
+                   if not dev_node.startswith(defaults.excluded_block_devices)}
+        if topology is None:
+            topology = self.topology.updated(sorted(changed))
+        self._reset_lvm_state()
+        devices_by_node = dict(self._devices_by_node)
+        for dev_node in sorted(changed):
+            if os.path.isdir(os.path.join(self._block_dir, dev_node)):
+                logger.info(f'rebuilding {dev_node}')
+                devices_by_node[dev_node] = self._new_device(dev_node, topology)
+            else:
+                logger.info(f'{dev_node} has been removed')
+                devices_by_node.pop(dev_node, None)
+                self._fingerprints.pop(dev_node, None)
+        if not changed:
+            self.topology = topology
+            return
+
+        affected_ids = {devices[dev_node].device_id
+                        for devices in (self._devices_by_node, devices_by_node)
+                        for dev_node in changed if dev_node in devices}
+        for dev_node, dev in devices_by_node.items():
+            if dev_node not in changed and dev.device_id in affected_ids:
+                devices_by_node[dev_node] = self._new_device(dev_node, topology)
+
+        candidate_devices = (
+            [dev_node for dev_node in self._candidate_devices if dev_node in devices_by_node]
+            + sorted(dev_node for dev_node in devices_by_node
+                     if dev_node not in self._candidate_devices))
+        device_data = self._dedup(devices_by_node, candidate_devices)
+
+        if not self._skip_analysis:
+            affected = [dev for dev in device_data if dev.device_id in affected_ids]
+            self._map(Device.analyse, affected)
+            self._check_locks(affected)
+            self.analyse(affected)
+
+        # each a single assignment - readers see the old state or the new, never a mix
+        self.topology = topology
+        self._candidate_devices = candidate_devices
+        self._devices_by_node = devices_by_node
+        self._device_data = device_data
+        self._filter_index = None
+        # the devices that weren't rebuilt move on to the new topology, which agrees with the old
+        # about them, rather than keeping the old one alive
+        for dev in device_data:
+            dev._topology = topology
+
+    @timeit
+    def revalidate(self) -> List[str]:
+        """Check every device against its fingerprint, and rebuild those that changed.
+
+        Catches what uevents miss: the topology is read again, and only the devices whose
+        fingerprint differs from the one taken when they were built (or that appeared or went
+        away) are rebuilt and re-analysed, through update_devices. Returns their nodes.
+        """
+        self._track_changes = True
+        topology = Topology(self._block_dir, self._dev_dir)
+        self._lvm_generation = None
+        present = get_block_devs(self._block_dir)
+        changed = set(self._devices_by_node).symmetric_difference(present)
+        for dev_node in present:
+            if dev_node in changed:
                 continue
-            s += f'{dev.as_json()},\n'
-        return f'[{s}]' if s else '[]'
+            fingerprint = self._fingerprint(dev_node, topology)
+            if dev_node not in self._fingerprints:
+                # built without change tracking - from now on it is
+                self._fingerprints[dev_node] = fingerprint
+            elif fingerprint is None or fingerprint != self._fingerprints[dev_node]:
+                changed.add(dev_node)
+        logger.info(f'revalidated {len(present)} devices, {len(changed)} changed')
+        if changed:
+            self.update_devices(sorted(changed), topology)
+        return sorted(changed)
+
+    def _new_device(self, dev_node: str, topology: Topology) -> BaseDevice:
+        if self._track_changes:
+            self._fingerprints[dev_node] = self._fingerprint(dev_node, topology)
+        if self._skip_analysis:
+            return BaseDevice(self, dev_node, topology=topology)
+        return Device(self, dev_node, topology=topology)
+
+    def _fingerprint(self,
+                     dev_node: str,
+                     topology: Optional[Topology] = None) -> Optional[List[Any]]:
+        """Summarise everything the cached results of a device depend on.
+
+        Returns None when the device can't be fingerprinted reliably, so it is always rescanned.
+        """
+        if topology is None:
+            topology = self.topology
+        dev_dir = os.path.join(self._block_dir, dev_node)
+        if dev_node not in topology.devno:
+            return None
+
+        holders = topology.holders(dev_node)
+        partitions = topology.partitions(dev_node)
+        links = sorted(link for node in [dev_node] + holders
+                       for link in topology.links(node))
+
+        lvm_generation = None
+        if any(topology.lv(holder) for holder in holders):
+            if self._lvm_generation is None:
+                self._lvm_generation = lvm_metadata_generation(
+                    os.path.join(self._root, defaults.lvm_backup_dir))
+            if self._lvm_generation is None:
+                # LV tags could change without us noticing
+                return None
+            lvm_generation = self._lvm_generation
+
+        return [
+            read_attribute(os.path.join(dev_dir, 'size')),
+            topology.devno[dev_node],
+            holders,
+            partitions,
+            links,
+            lvm_generation,
+        ]
+
+    def _save_cache(self) -> None:
+        for dev_node, dev in self._devices_by_node.items():
+            self._cache.store(dev_node, self._fingerprints.get(dev_node), dev.cache_data())
+        self._cache.save()
+
+    def select(self, dev_filter: Optional[ObjectFilter] = None) -> List[BaseDevice]:
+        """Return the devices matching a filter, in scan order"""
+        # read once, as update_devices can swap in new devices (on another thread) meanwhile
+        device_data = self._device_data
+        if not dev_filter:
+            return list(device_data)
+        filter_index = self._filter_index
+        if filter_index is None or filter_index.objects is not device_data:
+            # built once, then reused by every query until the inventory changes
+            filter_index = self._filter_index = FilterIndex(device_data)
+        return dev_filter.select(device_data, filter_index)
+
+    def write_report(self,
+                     f: TextIO,
+                     mode: str = 'json',
+                     dev_filter: Optional[ObjectFilter] = None,
+                     timings: bool = False) -> int:
+        """Stream the device records to a file object as JSON or NDJSON, returning the count.
+
+        With timings, the instrumentation gathered during the scan is added as a timings section.
+        """
+        writer = report_writer(mode, f, sections=timings)
+        for dev in self.select(dev_filter):
+            writer.write(dev.as_dict(self.fields))
+        writer.close({'timings': instrumentation.report()} if timings else None)
+        return writer.count
+
+    def as_json(self, dev_filter: Optional[ObjectFilter] = None) -> str:
+        f = io.StringIO()
+        self.write_report(f, 'json', dev_filter)
+        return f.getvalue().rstrip('\n')
 
     def as_text(self, dev_filter: Optional[ObjectFilter] = None) -> str:
         if self._skip_analysis:
@@ -418,9 +941,7 @@ class Devices:
 
         output = [headings]
 
-        for dev in sorted(self._device_data, key=lambda dev: dev.path):
-            if dev_filter and not dev_filter.ok(dev):
-                continue
+        for dev in sorted(self.select(dev_filter), key=lambda dev: dev.path):
             output.append(dev.as_text())
 
         if len(output) == 1:
@@ -433,6 +954,8 @@ class Devices:
         return '\n'.join(output)
 
     def report(self, mode: ReportFormat = 'text', dev_filter: Optional[ObjectFilter] = None) -> str:
-        if mode == 'json':
-            return self.as_json(dev_filter)
+        if mode in ('json', 'ndjson'):
+            f = io.StringIO()
+            self.write_report(f, mode, dev_filter)
+            return f.getvalue().rstrip('\n')
         return self.as_text(dev_filter)
@@ -0,0 +1,111 @@
+import sys
+
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class SysApi(MutableMapping):
+    """The sysfs properties of a device, held in slots instead of a per-device dict.
+
+    Sizes, counts and flags are held as ints (None when sysfs has no usable value), and the
+    values that repeat across a host (vendor, model, scheduler...) are interned, so a large host
+    costs a fraction of the memory. It behaves as the dict it replaces (sys_api['size'], get(),
+    items(), 'serial' in sys_api...) and to_dict() gives a plain, JSON ready, copy.
+
+    With a loader, fields are filled in on demand: reading a field that isn't set calls
+    loader(field) to read it (loader(None) reads them all), so a device only pays for the sysfs
+    reads its callers actually need.
+    """
+
+    _int_fields = ('size', 'sectors', 'sectorsize', 'rotational', 'nr_requests')
+    _str_fields = ('removable', 'ro', 'serial', 'model', 'vendor', 'wwid', 'rev', 'scheduler',
+                   'discard_granularity', 'human_readable_size')
+    # fields with few distinct values on a host, worth sharing between devices
+    _interned_fields = frozenset(['removable', 'ro', 'model', 'vendor', 'rev', 'scheduler',
+                                  'discard_granularity', 'human_readable_size'])
+    _fields = frozenset(_int_fields + _str_fields)
+    _int_field_set = frozenset(_int_fields)
+    _ordered_fields = _int_fields + _str_fields
+    __slots__ = _int_fields + _str_fields + ('_extra', '_loader')
+
+    def __init__(self,
+                 data: Optional[Dict[str, Any]] = None,
+                 loader: Optional[Callable[[Optional[str]], None]] = None) -> None:
+        self._extra: Optional[Dict[str, Any]] = None
+        self._loader = loader
+        if data:
+            self.update(data)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                if self._loader is None:
+                    raise KeyError(key) from None
+            self._loader(key)
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._int_field_set:
+            setattr(self, key, _to_int(value))
+        elif key in self._fields:
+            if key in self._interned_fields and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._fields:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
+
+    def to_dict(self, load: bool = True) -> Dict[str, Any]:
+        """Return the properties as a plain dict (faster than dict(sys_api)).
+
+        Unless load is False, the fields that haven't been read yet are loaded first.
+        """
+        if load and self._loader is not None:
+            self._loader(None)
+        data = {}
+        for key in self._ordered_fields:
+            try:
+                data[key] = getattr(self, key)
+            except AttributeError:
+                pass
+        if self._extra:
+            data.update(self._extra)
+        return data
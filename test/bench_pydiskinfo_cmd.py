@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: pydiskinfo_cmd output on a synthetic linux system with thousands of volumes.
+
+Times the first line of output and the whole listing, the way pydiskinfo_cmd writes it now (the
+system parsed a disk at a time, as it is rendered) and the way it did before (the system parsed
+whole first), in each output format. Also times rendering the partitions alone, with the
+properties compiled once and with the if/elif chain they went through before.
+
+usage: python3 bench_pydiskinfo_cmd.py [disks] [partitions per disk]   (default: 250 16)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from human_readable_units import human_readable_units
+from pydiskinfo_cmd import render, str_partition, str_physical_disk, str_system
+from pydiskinfo_system import LinuxSystem
+from synthetic_host import make_linux_system
+
+DP, PP, LP = 'Pipts', 'LDdtse', 'PpVtfF'
+
+
+def legacy_str_partition(partition, properties):
+    strings = []
+    sanitized_properties = [property for property in properties if property in set(properties)]
+    for each_property in sanitized_properties:
+        if each_property == 'b':
+            strings.append(f'Blocksize: {partition["Blocksize"]}')
+        elif each_property == 'B':
+            strings.append(f'is {"" if partition["Bootable"] else "not "}bootable')
+        elif each_property == 'o':
+            strings.append(
+                f'is {"" if partition["Boot Partition"] else "not "}the active boot partition')
+        elif each_property == 'x':
+            strings.append(f'Description: {partition["Description"]}')
+        elif each_property == 'p':
+            strings.append(f'Path: {partition["Path"]}')
+        elif each_property == 'd':
+            strings.append(f'Device I.D.: {partition["Device I.D."]}')
+        elif each_property == 'i':
+            strings.append(f'Disk Number: {partition["Disk Number"]}')
+        elif each_property == 'N':
+            strings.append(f'Partition Number: {partition["Partition Number"]}')
+        elif each_property == 'c':
+            strings.append(f'Blocks: {partition["Number of Blocks"]}')
+        elif each_property == 'r':
+            strings.append(
+                f'is {"" if partition["Primary Partition"] else "not "}a primary partition')
+        elif each_property == 's':
+            strings.append(f'Size: {human_readable_units(partition["Size"])}')
+        elif each_property == 'S':
+            strings.append(f'Size: {partition["Size"]}')
+        elif each_property == 'e':
+            strings.append(f'Offset: {partition["Starting Offset"]}')
+        elif each_property == 't':
+            strings.append(f'Type: {partition["Type"]}')
+    return 'Partition: ' + ', '.join(strings)
+
+
+def legacy_listing(root):
+    """The system parsed whole, then listed"""
+    system = LinuxSystem(root=root)
+    yield str_system(system)
+    for each_disk in system['Physical Disks']:
+        yield f'  {str_physical_disk(each_disk, DP)}'
+        for each_partition in each_disk['Partitions']:
+            yield f'    {legacy_str_partition(each_partition, PP)}'
+            for each_logical_disk in each_partition['Logical Disks']:
+                yield f'      {each_logical_disk["Path"]}'
+
+
+def time_listing(blocks):
+    """Time to the first element after the system line, and to the end"""
+    start = time.perf_counter()
+    next(blocks)
+    next(blocks)
+    first = time.perf_counter() - start
+    for _each_block in blocks:
+        pass
+    return first, time.perf_counter() - start
+
+
+def best(runs, listing):
+    results = [time_listing(listing()) for _i in range(runs)]
+    return min(first for first, _total in results), min(total for _first, total in results)
+
+
+def main(disks, partitions):
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_linux_system(root, disks, partitions)
+        print(f'{disks} disks, {len(summary["partitions"])} partitions, '
+              f'{len(summary["mounted"]) + 1} logical disks')
+        print(f'{"":<24} {"first (ms)":>11} {"total (ms)":>11}')
+        for name, listing in (
+                ('parsed first (before)', lambda: legacy_listing(root)),
+                ('streamed text', lambda: render(LinuxSystem(root=root, parse=False), 'disks',
+                                                 DP, PP, LP, 'text')),
+                ('streamed json', lambda: render(LinuxSystem(root=root, parse=False), 'disks',
+                                                 DP, PP, LP, 'json')),
+                ('streamed ndjson', lambda: render(LinuxSystem(root=root, parse=False), 'disks',
+                                                   DP, PP, LP, 'ndjson'))):
+            first, total = best(3, listing)
+            print(f'{name:<24} {first * 1000:>11.2f} {total * 1000:>11.1f}')
+
+        system = LinuxSystem(root=root)
+        print(f'\n{"partitions rendered":<24} {"ms":>11}')
+        for name, str_function in (('if/elif chain', legacy_str_partition),
+                                   ('compiled', str_partition)):
+            start = time.perf_counter()
+            for each_partition in system['Partitions']:
+                str_function(each_partition, 'bBoxpdiNcrsSet')
+            print(f'{name:<24} {(time.perf_counter() - start) * 1000:>11.1f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 16)
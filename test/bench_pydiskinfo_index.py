@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: assembling a pydiskinfo WindowsSystem, on a stand-in for WMI (so it runs
+anywhere).
+
+Builds the system from a fabricated WMI with 10k partitions, each holding a logical disk, some
+of which span two partitions. The objects are linked through the System indexes
+(partitions_by_id, logical_disks_by_id), and for comparison the way they were before: each new
+partition and logical disk searched for in the system's lists, and each partition's logical
+disks searched again.
+
+usage: python3 bench_pydiskinfo_index.py [disks] [partitions per disk]   (default: 1000 10)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_system import System, WindowsSystem
+from pydiskinfo_logical_disk import WindowsLogicalDisk
+from pydiskinfo_partition import WindowsPartition
+from pydiskinfo_physical_disk import WindowsPhysicalDisk
+from pydiskinfo_wmi import LiveWMIProvider, RecordedWMIProvider, record_dataset
+from fake_wmi import make_wmi
+
+
+def best_of(runs, func, *args):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+
+class LinearWindowsSystem(System):
+    """WindowsSystem linking its objects by searching lists"""
+
+    def __init__(self, wmi):
+        self._wmi = wmi
+        super().__init__("Windows System")
+
+    def _parse_system(self):
+        cursor = self._wmi.WMI()
+        for each_disk in cursor.Win32_DiskDrive():
+            disk = WindowsPhysicalDisk(each_disk, self)
+            self['Physical Disks'].append(disk)
+            for each_partition in each_disk.associators('Win32_DiskDriveToDiskPartition'):
+                partition = WindowsPartition(each_partition, disk)
+                new_partition = True
+                for each_existing_partition in self['Partitions']:
+                    if each_existing_partition['Device I.D.'] == partition['Device I.D.']:
+                        partition = each_existing_partition
+                        new_partition = False
+                        break
+                disk.add_partition(partition)
+                if new_partition:
+                    self['Partitions'].append(partition)
+                for each_logical_disk in each_partition.associators(
+                        'Win32_LogicalDiskToPartition'):
+                    logical_disk = WindowsLogicalDisk(each_logical_disk, self)
+                    new_logical_disk = True
+                    for each_existing in self['Logical Disks']:
+                        if each_existing['Device I.D.'] == logical_disk['Device I.D.']:
+                            logical_disk = each_existing
+                            new_logical_disk = False
+                            break
+                    if new_logical_disk:
+                        self['Logical Disks'].append(logical_disk)
+                    logical_disk.add_partition(partition)
+                    new_logical_disk = True
+                    for each_existing in partition['Logical Disks']:
+                        if each_existing['Device I.D.'] == logical_disk['Device I.D.']:
+                            new_logical_disk = False
+                    if new_logical_disk:
+                        partition['Logical Disks'].append(logical_disk)
+
+
+def main(disks, partitions):
+    wmi = make_wmi(disks, partitions)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dataset = os.path.join(tmpdir, 'wmi.json')
+        record_dataset(LiveWMIProvider(wmi), dataset)
+        provider = RecordedWMIProvider(dataset)
+    indexed, system = best_of(5, lambda: WindowsSystem(provider=provider))
+    linear, linear_system = best_of(1, LinearWindowsSystem, wmi)
+    assert len(system['Logical Disks']) == len(linear_system['Logical Disks'])
+    print(f'{disks} disks, {len(system["Partitions"])} partitions, '
+          f'{len(system["Logical Disks"])} logical disks')
+    print(f'{"":<12} {"ms":>9}')
+    print(f'{"indexed":<12} {indexed * 1000:>9.1f}')
+    print(f'{"linear":<12} {linear * 1000:>9.1f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: pydiskinfo's linux backend on a synthetic sysfs and mountinfo.
+
+Times LinuxSystem over a fabricated system with thousands of partitions, each one mounted,
+and breaks the time down into the sysfs pass, the mountinfo parse and building the objects
+(statvfs of each mount included). For comparison, the same system is built the obvious way:
+every attribute checked for with os.path.exists before it's read, and each mount matched to
+its partition by searching the partition list, as the windows backend does.
+
+usage: python3 bench_pydiskinfo_linux.py [disks] [partitions per disk]   (default: 250 16)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_linux import read_block_devices, read_mounts
+from pydiskinfo_logical_disk import LinuxLogicalDisk
+from pydiskinfo_partition import LinuxPartition
+from pydiskinfo_physical_disk import LinuxPhysicalDisk
+from pydiskinfo_system import LinuxSystem, System
+from synthetic_host import make_linux_system
+
+
+def best_of(runs, func, *args):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path) as f:
+        return f.read().strip()
+
+
+class NaiveLinuxSystem(System):
+    """LinuxSystem the obvious way"""
+
+    def __init__(self, root):
+        self._root = root
+        super().__init__("Linux System")
+
+    def _parse_system(self):
+        sys_block = os.path.join(self._root, 'sys', 'block')
+        for disk_number, name in enumerate(sorted(os.listdir(sys_block),
+                                                  key=lambda name: (len(name), name))):
+            disk_dir = os.path.join(sys_block, name)
+            if not os.path.exists(os.path.join(disk_dir, 'device')):
+                continue
+            record = {'name': name, 'size': int(_read(os.path.join(disk_dir, 'size'))) * 512,
+                      'logical_block_size': _read(os.path.join(disk_dir, 'queue',
+                                                               'logical_block_size')),
+                      'model': _read(os.path.join(disk_dir, 'device', 'model')),
+                      'vendor': _read(os.path.join(disk_dir, 'device', 'vendor'))}
+            disk = LinuxPhysicalDisk(record, disk_number, self)
+            self['Physical Disks'].append(disk)
+            for child in sorted(os.listdir(disk_dir)):
+                child_dir = os.path.join(disk_dir, child)
+                if not os.path.exists(os.path.join(child_dir, 'partition')):
+                    continue
+                dev = _read(os.path.join(child_dir, 'dev'))
+                udev = {}
+                for line in _read(os.path.join(self._root, 'run', 'udev', 'data',
+                                               f'b{dev}')).splitlines():
+                    if line.startswith('E:'):
+                        key, _, value = line[2:].partition('=')
+                        udev[key] = value
+                partition = LinuxPartition({
+                    'name': child, 'devno': dev,
+                    'number': _read(os.path.join(child_dir, 'partition')),
+                    'start': int(_read(os.path.join(child_dir, 'start'))) * 512,
+                    'size': int(_read(os.path.join(child_dir, 'size'))) * 512,
+                    'udev': udev}, disk)
+                partition.devno = dev
+                partition.udev = udev
+                disk.add_partition(partition)
+                self['Partitions'].append(partition)
+        for mount in read_mounts(self._root):
+            for partition in self['Partitions']:
+                if partition.devno == mount['devno']:
+                    logical_disk = LinuxLogicalDisk(mount, self, self._root)
+                    logical_disk.set_disk(partition['Physical Disk'], partition.udev)
+                    new_logical_disk = True
+                    for each_existing in self['Logical Disks']:
+                        if each_existing['Device I.D.'] == logical_disk['Device I.D.']:
+                            new_logical_disk = False
+                            break
+                    if new_logical_disk:
+                        self['Logical Disks'].append(logical_disk)
+                    logical_disk.add_partition(partition)
+                    partition.add_logical_disk(logical_disk)
+
+
+def main(disks, partitions):
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_linux_system(root, disks, partitions)
+        print(f'{disks} disks, {len(summary["partitions"])} partitions, '
+              f'{len(summary["mounted"]) + 1} mounts on them')
+        sysfs, _disks = best_of(5, read_block_devices, root)
+        mountinfo, _mounts = best_of(5, read_mounts, root)
+        total, system = best_of(5, lambda: LinuxSystem(root=root))
+        naive, naive_system = best_of(3, NaiveLinuxSystem, root)
+        assert len(system['Logical Disks']) == len(naive_system['Logical Disks'])
+        print(f'{"":<28} {"ms":>9}')
+        print(f'{"sysfs pass":<28} {sysfs * 1000:>9.1f}')
+        print(f'{"mountinfo parse":<28} {mountinfo * 1000:>9.1f}')
+        print(f'{"objects, statvfs, linking":<28} {(total - sysfs - mountinfo) * 1000:>9.1f}')
+        print(f'{"LinuxSystem":<28} {total * 1000:>9.1f}')
+        print(f'{"naive":<28} {naive * 1000:>9.1f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 16)
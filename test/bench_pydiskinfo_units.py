@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: formatting sizes with units, as pydiskinfo and quickscan reports do.
+
+Formats a million random sizes (bytes to petabytes) with human_readable_units one call at a
+time, with human_readable_units_batch in one call, and with the loops both used before: a dict
+lookup and a division per candidate unit, and a new format string each time (pydiskinfo), and
+division by 1024 until the size fits (quickscan). With numpy installed, the batch is also
+timed on an array.
+
+usage: python3 bench_pydiskinfo_units.py [sizes]   (default: 1000000)
+"""
+import sys
+import os
+import time
+import random
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from human_readable_units import UNITS, human_readable_units, human_readable_units_batch
+from quickscan.common.utils import human_readable_size
+
+
+def legacy_human_readable_units(value, unit='auto', value_type='B', decimal_places=2):
+    if value_type == 'I':
+        candidates = ('PiB', 'TiB', 'GiB', 'MiB', 'KiB', 'B')
+    else:
+        candidates = ('PB', 'TB', 'GB', 'MB', 'KB', 'B')
+    for each_unit in candidates:
+        return_value = value/UNITS[each_unit]
+        return_unit = each_unit
+        if return_value > 1:
+            break
+    if return_unit == 'B':
+        decimal_places = 0
+    format_string = "{:." + str(decimal_places) + "f}{}"
+    return format_string.format(return_value, return_unit)
+
+
+def legacy_human_readable_size(size):
+    suffixes = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
+    for suffix in suffixes:
+        if size >= 1024:
+            size = size / 1024
+        else:
+            break
+    return "{size:.2f} {suffix}".format(size=size, suffix=suffix)
+
+
+def best_of(runs, func, *args):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+
+def main(count):
+    random.seed(42)
+    # spread evenly over the units, the way disk, partition and free space sizes are
+    sizes = [random.randrange(1 << bits, 1 << (bits + 1)) for bits in
+             (random.randrange(0, 52) for _i in range(count))]
+    print(f'{count} sizes')
+    print(f'{"":<36} {"ms":>9} {"ns/size":>9}')
+    rows = [
+        ('pydiskinfo loop (before)',
+         lambda: [legacy_human_readable_units(size) for size in sizes]),
+        ('human_readable_units per size', lambda: [human_readable_units(size) for size in sizes]),
+        ('human_readable_units_batch', lambda: human_readable_units_batch(sizes)),
+        ('binary, loop (before)',
+         lambda: [legacy_human_readable_units(size, value_type='I') for size in sizes]),
+        ('binary, batch', lambda: human_readable_units_batch(sizes, value_type='I')),
+        ('quickscan loop (before)', lambda: [legacy_human_readable_size(size) for size in sizes]),
+        ('quickscan human_readable_size', lambda: [human_readable_size(size) for size in sizes]),
+    ]
+    try:
+        import numpy
+        array = numpy.array(sizes, dtype=numpy.int64)
+        rows.append(('human_readable_units_batch (numpy)',
+                     lambda: human_readable_units_batch(array)))
+    except ImportError:
+        pass
+    expected = [legacy_human_readable_units(size) for size in sizes[:1000]]
+    for name, func in rows:
+        elapsed, result = best_of(3, func)
+        if name.startswith('human_readable_units'):
+            assert result[:1000] == expected
+        print(f'{name:<36} {elapsed * 1000:>9.1f} {elapsed * 1e9 / count:>9.0f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
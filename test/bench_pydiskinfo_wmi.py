@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: WMI round trips made by pydiskinfo's windows backend, on a stand-in for WMI (so it
+runs anywhere).
+
+Each query made of the stand-in sleeps for a given latency, standing in for the WMI service.
+WindowsSystem reads each class of objects and associations with one query, and joins them. For
+comparison, the system is built the way it was before: the disks listed, then the partitions of
+each disk and the logical disks of each partition asked for with associators().
+
+usage: python3 bench_pydiskinfo_wmi.py [disks] [partitions per disk] [latency ms]
+                                       (default: 100 10 1)
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_system import System, WindowsSystem
+from pydiskinfo_logical_disk import WindowsLogicalDisk
+from pydiskinfo_partition import WindowsPartition
+from pydiskinfo_physical_disk import WindowsPhysicalDisk
+from pydiskinfo_wmi import LiveWMIProvider
+from fake_wmi import make_wmi
+
+
+class AssociatorsWindowsSystem(System):
+    """WindowsSystem asking WMI for the associators of each disk and partition"""
+
+    def __init__(self, wmi):
+        self._wmi = wmi
+        super().__init__("Windows System")
+
+    def _parse_system(self):
+        cursor = self._wmi.WMI()
+        for each_disk in cursor.Win32_DiskDrive():
+            disk = WindowsPhysicalDisk(each_disk, self)
+            self.add_physical_disk(disk)
+            for each_partition in each_disk.associators('Win32_DiskDriveToDiskPartition'):
+                partition = self.add_partition(WindowsPartition(each_partition, disk))
+                disk.add_partition(partition)
+                for each_logical_disk in each_partition.associators(
+                        'Win32_LogicalDiskToPartition'):
+                    logical_disk = self.add_logical_disk(
+                        WindowsLogicalDisk(each_logical_disk, self))
+                    logical_disk.add_partition(partition)
+                    partition.add_logical_disk(logical_disk)
+
+
+def run(build, wmi):
+    cursor = wmi.WMI()
+    cursor.round_trips = 0
+    start = time.perf_counter()
+    system = build(wmi)
+    return time.perf_counter() - start, cursor.round_trips, system
+
+
+def main(disks, partitions, latency):
+    wmi = make_wmi(disks, partitions, latency=latency / 1000)
+    bulk, bulk_trips, system = run(lambda wmi: WindowsSystem(provider=LiveWMIProvider(wmi)), wmi)
+    per_object, per_object_trips, old_system = run(AssociatorsWindowsSystem, wmi)
+    assert len(system['Logical Disks']) == len(old_system['Logical Disks'])
+    print(f'{disks} disks, {len(system["Partitions"])} partitions, '
+          f'{len(system["Logical Disks"])} logical disks, {latency} ms per round trip')
+    print(f'{"":<16} {"round trips":>12} {"ms":>9}')
+    print(f'{"bulk queries":<16} {bulk_trips:>12} {bulk * 1000:>9.1f}')
+    print(f'{"associators":<16} {per_object_trips:>12} {per_object * 1000:>9.1f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+         float(sys.argv[3]) if len(sys.argv) > 3 else 1)
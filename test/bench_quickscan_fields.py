@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: scan startup when only some report fields are asked for, against all of them.
+
+Devices(fields=...) reads the sysfs attributes behind those fields (plus what the scan needs to
+dedup and analyse the devices) up front, and gathers the LV tags only when lvs is asked for.
+Each mode is timed from Devices() to its report being written, with the files read counted.
+
+usage: python3 bench_quickscan_fields.py [device count] [runs]   (default: 2000 5)
+"""
+import io
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.instrument import instrumentation
+from synthetic_host import make_host
+
+MODES = [
+    ('all fields', None),
+    ('text report', Devices.text_fields),
+    ('path,size,available', ['path', 'size', 'available']),
+]
+
+
+def best_of(func, runs):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def scan(root, fields):
+    devices = Devices(False, root=root, fields=fields)
+    if fields is Devices.text_fields:
+        devices.as_text()
+    else:
+        devices.write_report(io.StringIO(), 'ndjson')
+
+
+def files_read(root, fields):
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        scan(root, fields)
+        return instrumentation.report()['counters'].get('files_read', 0)
+    finally:
+        instrumentation.enable(False)
+
+
+def main(count, runs):
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count, lvm_every=4)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        print(f'{count} devices, best of {runs} runs')
+        print(f'{"fields":<22} {"scan+report (ms)":>17} {"files read":>11}')
+        for name, fields in MODES:
+            elapsed = best_of(lambda: scan(root, fields), runs)
+            print(f'{name:<22} {elapsed * 1000:>17.1f} {files_read(root, fields):>11}')
+        os.environ['PATH'] = path
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
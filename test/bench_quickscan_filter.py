@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: filtering an inventory object by object vs through the per-field indexes.
+
+usage: python3 bench_quickscan_filter.py [device count]   (default: 5000)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.filter import ObjectFilter
+from synthetic_host import make_host
+
+QUERIES = [
+    'available=true',
+    'size>=1T',
+    'rotational=0,available=false',
+    'model~=QEMU.*,vendor=QEMU|ATA',
+    'mpath_node=dm-0',
+]
+REPEAT = 100
+
+
+def per_query(func):
+    start = time.perf_counter()
+    for _i in range(REPEAT):
+        func()
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main(count):
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        devices = Devices(False, root=root)
+        os.environ['PATH'] = path
+
+        start = time.perf_counter()
+        devices.select(ObjectFilter('available=true'))
+        first = time.perf_counter() - start
+        print(f'{len(devices._device_data)} devices, first query (builds its index): '
+              f'{first * 1000:.2f} ms')
+        print(f'{"query":<32} {"matches":>8} {"scan (ms)":>10} {"indexed (ms)":>13}')
+        for query in QUERIES:
+            dev_filter = ObjectFilter(query, aliases=Devices.filter_aliases)
+            # warm the indexes of the keys this query uses
+            matches = len(devices.select(dev_filter))
+            scan = per_query(lambda: [dev for dev in devices._device_data if dev_filter.ok(dev)])
+            indexed = per_query(lambda: devices.select(dev_filter))
+            print(f'{query:<32} {matches:>8} {scan * 1000:>10.3f} {indexed * 1000:>13.3f}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: per-device sysfs globs vs the shared BlockIndex.
+
+usage: python3 bench_quickscan_index.py [device count]
+"""
+import sys
+import os
+import time
+import tempfile
+from glob import glob
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common.sysfs import BlockIndex
+from synthetic_host import make_host
+
+
+def legacy_globs(block_dir, names):
+    # holders in __init__, partitions in _check_partitions and scsi_addr twice in as_json
+    for name in names:
+        glob(os.path.join(block_dir, name, 'holders/*'))
+        glob(os.path.join(block_dir, name, f'{name}*'))
+        for _i in range(2):
+            glob(os.path.join(block_dir, name, 'device/bsg/*'))
+
+
+def indexed(block_dir, names):
+    index = BlockIndex(block_dir, names)
+    for name in names:
+        index.holders.get(name)
+        index.partitions.get(name)
+        for _i in range(2):
+            index.bsg.get(name)
+
+
+def bench(label, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<20} {elapsed * 1000:10.2f} ms')
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as root:
+        names = make_host(root, count)['disks']
+        block_dir = os.path.join(root, 'sys', 'block')
+        print(f'{count} devices')
+        bench('per-device globs', legacy_globs, block_dir, names)
+        bench('block index', indexed, block_dir, names)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: what the phase timers and counters cost a scan, disabled and enabled.
+
+usage: python3 bench_quickscan_instrument.py [device count] [runs]   (default: 500 5)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.instrument import instrumentation
+from synthetic_host import make_host
+
+
+def best_scan(root, runs):
+    best = None
+    for _i in range(runs):
+        instrumentation.reset()
+        start = time.perf_counter()
+        Devices(False, root=root)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(count, runs):
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        disabled = best_scan(root, runs)
+        instrumentation.enable()
+        enabled = best_scan(root, runs)
+        counters = instrumentation.report()['counters']
+        instrumentation.enable(False)
+        os.environ['PATH'] = path
+
+    print(f'{count} devices, best of {runs} scans')
+    print(f'{"disabled":>10} {disabled * 1000:>10.1f} ms')
+    print(f'{"enabled":>10} {enabled * 1000:>10.1f} ms  ({(enabled / disabled - 1) * 100:+.1f}%)')
+    print(f'counters: {counters}')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
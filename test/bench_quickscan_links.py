@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: resolving the /dev/disk/by-id and /dev/mapper links, three globs with
+Path.resolve() per link against one scandir pass per directory with readlink and a shared cache.
+
+The fixture has a by-id link per alias of every path to every LUN (wwn-, scsi-, ...), as on a
+multipath node, along with the lvm-pv-uuid-/dm-name- links and /dev/mapper maps quickscan uses.
+
+usage: python3 bench_quickscan_links.py [by-id link count] [runs]   (default: 20000 5)
+"""
+import sys
+import os
+import time
+import tempfile
+from glob import glob
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common.utils import scan_links
+from synthetic_host import dev_name
+
+# aliases of each path to a LUN, besides the LVM links
+ALIASES = ('wwn-0x5000c5{:08x}', 'scsi-35000c5{:08x}', 'scsi-SSEAGATE_ST4000NM0025_{:08x}',
+           'scsi-0SEAGATE_ST4000NM0025_{:08x}', 'scsi-1SEAGATE_ST4000NM0025_{:08x}',
+           'dm-uuid-mpath-35000c5{:08x}', 'wwn-0x5000c5{:08x}-part1', 'scsi-35000c5{:08x}-part1')
+
+
+def make_links(root, count):
+    by_id = os.path.join(root, 'disk', 'by-id')
+    mapper = os.path.join(root, 'mapper')
+    os.makedirs(by_id)
+    os.makedirs(mapper)
+    links = 0
+    i = 0
+    while links < count:
+        # two paths to each LUN, behind one multipath map that is an LVM PV holding one LV
+        for path in (2 * i, 2 * i + 1):
+            name = dev_name(path)
+            open(os.path.join(root, name), 'w').close()
+            for alias in ALIASES:
+                os.symlink(f'../../{name}', os.path.join(by_id, alias.format(path)))
+                links += 1
+        for dm in (f'dm-{2 * i}', f'dm-{2 * i + 1}'):
+            open(os.path.join(root, dm), 'w').close()
+        os.symlink(f'../dm-{2 * i}', os.path.join(mapper, f'mpath{i}'))
+        os.symlink(f'../../dm-{2 * i}', os.path.join(by_id, f'lvm-pv-uuid-{i:06d}'))
+        os.symlink(f'../../dm-{2 * i + 1}', os.path.join(by_id, f'dm-name-ceph{i}-osd{i}'))
+        links += 2
+        i += 1
+    return links
+
+
+def globbed(dev_dir):
+    def get_link_data(pattern):
+        return [(link, os.path.basename(str(Path(link).resolve()))) for link in glob(pattern)]
+    return (get_link_data(os.path.join(dev_dir, 'disk/by-id/lvm-pv-uuid-*')),
+            get_link_data(os.path.join(dev_dir, 'disk/by-id/dm-name-*')),
+            get_link_data(os.path.join(dev_dir, 'mapper/mpath*')))
+
+
+def scanned(dev_dir):
+    resolved = {}
+    by_id = scan_links(os.path.join(dev_dir, 'disk/by-id'), ('lvm-pv-uuid-', 'dm-name-'), resolved)
+    return (by_id['lvm-pv-uuid-'], by_id['dm-name-'],
+            scan_links(os.path.join(dev_dir, 'mapper'), ('mpath',), resolved)['mpath'])
+
+
+def best_of(func, dev_dir, runs):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        result = func(dev_dir)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, [sorted(links) for links in result]
+
+
+def main(count, runs):
+    with tempfile.TemporaryDirectory() as dev_dir:
+        links = make_links(dev_dir, count)
+        old, old_links = best_of(globbed, dev_dir, runs)
+        new, new_links = best_of(scanned, dev_dir, runs)
+    assert old_links == new_links
+    print(f'{links} by-id links, {sum(map(len, new_links))} of them used, best of {runs}')
+    print(f'{"glob + resolve":>16} {old * 1000:>8.1f} ms')
+    print(f'{"scandir":>16} {new * 1000:>8.1f} ms  ({old / new:.1f}x)')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
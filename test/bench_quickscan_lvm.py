@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: reading LV names and tags from the LVM metadata backups, against running lvs.
+
+The host has one VG (and LV) per PV. The stand-in lvs is a python script replaying a report,
+so it only shows the cost of forking a process; a real lvs also scans devices and takes LVM's
+global lock, and is slower still. Backups are timed both when first parsed and on a rescan,
+where unchanged backups are not parsed again.
+
+usage: python3 bench_quickscan_lvm.py [device count] [runs]   (default: 1000 5)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.lvm import LVMBackups
+from synthetic_host import make_host
+
+
+def best_of(func, runs):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(count, runs):
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count, lvm_every=2)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        devices = Devices(True, root=root)
+        lvs = list(devices.topology.lv_devices.values())
+        print(f'{count} devices, {len(devices.topology.lv_devices)} VGs, best of {runs}')
+        results = {}
+        results['backups'] = best_of(
+            lambda: LVMBackups(devices._lvm_backups.backup_dir).read(lvs), runs)
+        results['rescan'] = best_of(lambda: devices._lvm_backups.read(lvs), runs)
+        devices._native_lvm = False
+        results['lvs'] = best_of(devices._build_lv_metadata, runs)
+        os.environ['PATH'] = path
+
+    for name, elapsed in results.items():
+        print(f'{name:>8} {elapsed * 1000:>8.1f} ms')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: memory and JSON cost of dict based device records vs the slotted records.
+
+usage: python3 bench_quickscan_records.py [device count]   (default: 10000)
+"""
+import gc
+import sys
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.quickscan.devices import BaseDevice
+from quickscan.common.utils import human_readable_size
+from synthetic_host import make_host
+
+
+def sysfs_data(i):
+    return {
+        'removable': '0',
+        'size': '104857600',
+        'ro': '0',
+        'serial': 'unknown',
+        'device/model': 'QEMU HARDDISK',
+        'device/serial': 'unknown',
+        'device/vendor': 'QEMU',
+        'device/wwid': f'naa.5000c500{i:08x}',
+        'device/vpd_pg80': f'SERIAL{i:010d}',
+        'device/rev': '2.5+',
+        'queue/nr_requests': '256',
+        'queue/rotational': '1',
+        'queue/scheduler': 'mq-deadline',
+        'queue/discard_granularity': '0',
+        'queue/logical_block_size': '512',
+    }
+
+
+class LegacyDevice:
+    """The previous layout: an instance __dict__, and a dict of sysfs strings"""
+
+    def __init__(self, parent, dev_node, sysfs):
+        self._parent = parent
+        self._dev_node = dev_node
+        self._block_dir = parent._block_dir
+        self.dev_path = os.path.join(parent._dev_dir, dev_node)
+        self.alt_path = ''
+        self.mpath_device = ''
+        self.mpath_node = ''
+        self.dev_nodes = ''
+        self.enclosure_id = ''
+        self.enclosure_slot = ''
+        self.lsm_data = {}
+        self._holders = []
+        self.lvs = []
+        self.sys_api = {}
+        for attrib in BaseDevice._device_attributes:
+            content = sysfs[attrib]
+            key = os.path.basename(attrib)
+            if key == 'size':
+                self.sys_api['sectors'] = int(content)
+                self.sys_api['sectorsize'] = int(sysfs['queue/logical_block_size'])
+                content = int(content) * 512
+                self.sys_api['human_readable_size'] = human_readable_size(content)
+            elif key == 'vpd_pg80':
+                key = 'serial'
+            if key == 'serial' and content == 'unknown':
+                continue
+            self.sys_api[key] = content
+
+    path = BaseDevice.path
+    scsi_addr = BaseDevice.scsi_addr
+
+    @property
+    def device_id(self):
+        vendor = self.sys_api['vendor'].strip() or ''
+        model = self.sys_api['model'].strip() or ''
+        serial = self.sys_api['serial'].strip() or ''
+        return ('_'.join([vendor, model, serial])).replace(' ', '_')
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in BaseDevice._report_fields}
+
+
+def build(cls, parent, count):
+    # sysfs reads return new strings, as the copies below do
+    inputs = [{k: ''.join(v) for k, v in sysfs_data(i).items()} for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    records = [cls(parent, f'sd{i}', inputs[i]) for i in range(count)]
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, current
+
+
+def serialise(records):
+    start = time.perf_counter()
+    for record in records:
+        json.dumps(record.as_dict())
+    return time.perf_counter() - start
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as root:
+        make_host(root, 2)
+        parent = Devices(True, root=root)
+        print(f'{"records":<10} {"devices":>8} {"retained (KiB)":>15} {"per device (B)":>15} '
+              f'{"json (ms)":>10}')
+        for label, cls in (('dict', LegacyDevice), ('slots', BaseDevice)):
+            records, retained = build(cls, parent, count)
+            print(f'{label:<10} {count:>8} {retained / 1024:>15.1f} {retained / count:>15.0f} '
+                  f'{serialise(records) * 1000:>10.1f}')
+            del records
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark a full quickscan scan of synthetic hosts of increasing size.
+
+usage: python3 bench_quickscan_scan.py [device count ...]   (default: 10 100 1000 5000)
+"""
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from synthetic_host import make_host
+
+
+def scan(root, skip_analysis):
+    start = time.perf_counter()
+    devices = Devices(skip_analysis, root=root)
+    return time.perf_counter() - start, devices
+
+
+def peak_memory(root, skip_analysis):
+    tracemalloc.start()
+    Devices(skip_analysis, root=root)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(counts):
+    path = os.environ['PATH']
+    print(f'{"devices":>8} {"mode":<10} {"scan (ms)":>10} {"peak mem (KiB)":>15} {"reported":>9}')
+    for count in counts:
+        with tempfile.TemporaryDirectory() as root:
+            summary = make_host(root, count)
+            os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+            for mode, skip_analysis in (('inventory', True), ('analysis', False)):
+                elapsed, devices = scan(root, skip_analysis)
+                peak = peak_memory(root, skip_analysis)
+                print(f'{count:>8} {mode:<10} {elapsed * 1000:>10.1f} {peak / 1024:>15.1f} '
+                      f'{len(devices._device_data):>9}')
+            os.environ['PATH'] = path
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 5000])
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Load test: queries against a serve mode daemon, against running quickscan.py each time.
+
+A daemon serves the inventory of a synthetic host, and a pool of local clients sends it a mix
+of report and filter requests (one connection per request) and times each answer. A second
+round asks for a revalidation every 100 queries, so the fingerprint checks run alongside the
+queries. For comparison, the same filtered report is produced by a cold quickscan.py run.
+
+usage: python3 bench_quickscan_serve.py [device count] [queries] [clients]   (default: 500 1000 8)
+"""
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.quickscan.daemon import InventoryDaemon
+from synthetic_host import make_host
+
+QUICKSCAN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'quickscan',
+                         'quickscan.py')
+REQUESTS = [
+    {'command': 'report'},
+    {'command': 'report', 'filter': 'available=true', 'fields': ['path', 'size', 'available']},
+    {'command': 'filter', 'filter': 'available=true'},
+    {'command': 'filter', 'filter': 'size>=40G,rotational=1'},
+    {'command': 'report', 'filter': 'mpath_device~=.+'},
+]
+
+
+def query(socket_path, request):
+    start = time.perf_counter()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(request + b'\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 20)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    response = json.loads(b''.join(chunks))
+    assert 'error' not in response, response
+    return time.perf_counter() - start
+
+
+def percentile(latencies, q):
+    return latencies[int(q * (len(latencies) - 1))]
+
+
+def load(socket_path, count, clients, revalidate_every=0):
+    requests = [json.dumps(REQUESTS[i % len(REQUESTS)]).encode() for i in range(count)]
+    if revalidate_every:
+        for i in range(0, count, revalidate_every):
+            requests[i] = b'{"command": "revalidate"}'
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = sorted(executor.map(lambda request: query(socket_path, request), requests))
+    elapsed = time.perf_counter() - start
+    return (percentile(latencies, 0.5), percentile(latencies, 0.99), latencies[-1],
+            count / elapsed)
+
+
+def cold_run(root):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, QUICKSCAN, '--root', root, '--no-cache', '--filter',
+                    'available=true', '--fields', 'path,size,available'],
+                   cwd=root, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main(count, queries, clients):
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        socket_path = os.path.join(root, 'run', 'bench.sock')
+        daemon = InventoryDaemon(Devices(False, root=root, track_changes=True), socket_path,
+                                 netlink=False)
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_until_complete, args=(daemon.serve(),))
+        thread.start()
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+            print(f'{count} devices, {queries} queries from {clients} clients')
+            print(f'{"":<24} {"p50 (ms)":>9} {"p99 (ms)":>9} {"max (ms)":>9} {"queries/s":>10}')
+            for name, revalidate_every in (('warm daemon', 0), ('revalidating', 100)):
+                p50, p99, worst, rate = load(socket_path, queries, clients, revalidate_every)
+                print(f'{name:<24} {p50 * 1000:>9.2f} {p99 * 1000:>9.2f} {worst * 1000:>9.2f} '
+                      f'{rate:>10.0f}')
+            best = min(cold_run(root) for _i in range(3))
+            print(f'{"quickscan.py (cold)":<24} {best * 1000:>9.2f}')
+        finally:
+            daemon.stop()
+            thread.join(30)
+            loop.close()
+            os.environ['PATH'] = path
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 8)
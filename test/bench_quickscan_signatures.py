@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: reading device signatures directly, against running wipefs on groups of 10.
+
+The devices are sparse image files, most of them blank as a new disk would be, the others
+carrying a GPT, LVM, bluestore or ext4 signature. wipefs is the one installed on the host.
+
+usage: python3 bench_quickscan_signatures.py [device count] [runs]   (default: 1000 3)
+"""
+import sys
+import os
+import time
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common import defaults
+from quickscan.common.concurrent import async_run, concurrent_cmds
+from quickscan.common.instrument import instrumentation
+from quickscan.common.signatures import SignatureProber
+from synthetic_host import gpt_regions, write_image
+
+SIZE = 1024 ** 4
+
+
+def ext4_superblock():
+    sb = bytearray(0x68)
+    struct.pack_into('<H', sb, 0x38, 0xef53)
+    struct.pack_into('<II', sb, 0x5c, 0x4, 0x42)
+    return bytes(sb)
+
+
+REGIONS = [{}, {}, {}, gpt_regions(), {512: b'LABELONE' + bytes(16) + b'LVM2 001'},
+           {0: b'bluestore block device\n'}, {1024: ext4_superblock()}]
+
+
+def native(paths):
+    prober = SignatureProber()
+    with ThreadPoolExecutor(max_workers=defaults.max_workers) as executor:
+        return list(executor.map(prober.probe, paths))
+
+
+def wipefs(paths):
+    groups = [f'wipefs -J --noheadings {" ".join(paths[i:i + 10])}'
+              for i in range(0, len(paths), 10)]
+    return async_run(concurrent_cmds(groups, max_concurrency=defaults.max_concurrent_cmds))
+
+
+def best_of(func, paths, runs):
+    best = None
+    for _i in range(runs):
+        start = time.perf_counter()
+        func(paths)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(count, runs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(count):
+            paths.append(os.path.join(tmpdir, f'disk{i:05d}'))
+            write_image(paths[-1], SIZE, REGIONS[i % len(REGIONS)])
+        print(f'{count} devices, best of {runs}')
+        instrumentation.enable()
+        elapsed = best_of(native, paths, runs)
+        counters = instrumentation.report()['counters']
+        instrumentation.enable(False)
+        print(f'{"native":>8} {elapsed * 1000:>8.1f} ms  '
+              f'({counters["bytes_read"] // runs // count} bytes read and '
+              f'{counters["buffer_allocations"] / runs / count:.3f} buffers allocated per device)')
+        if shutil.which('wipefs'):
+            print(f'{"wipefs":>8} {best_of(wipefs, paths, runs) * 1000:>8.1f} ms')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
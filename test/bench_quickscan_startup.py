@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Startup benchmark: the import time of quickscan.py, measured with python -X importtime.
+
+Runs quickscan.py --help, an inventory scan and a full scan of a small synthetic host, and
+reports for each the best total import time (the sum of the top level imports) and wall time,
+the slowest top level imports, and any of the deferred modules (asyncio, lsm, cProfile...)
+that were imported anyway. The package is byte compiled first, so compiling isn't counted.
+
+Exits with status 1 when a scan's import time is over the budget, so it can gate changes.
+
+usage: python3 bench_quickscan_startup.py [budget ms] [runs]   (default: 45 10)
+"""
+import sys
+import os
+import re
+import time
+import compileall
+import subprocess
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from synthetic_host import make_host
+
+QUICKSCAN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src',
+                             'quickscan')
+DEFERRED = ['asyncio', 'lsm', 'cProfile', 'pstats', 'quickscan.quickscan.daemon',
+            'quickscan.common.concurrent']
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$', re.MULTILINE)
+
+
+def import_times(args, cwd):
+    """Run quickscan.py once, returning its wall time and {top level module: cumulative us},
+    and the set of every module imported"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(QUICKSCAN_DIR, 'quickscan.py')] + args,
+        cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+    top_level = {}
+    modules = set()
+    for _self, cumulative, indent, module in _IMPORT_LINE.findall(completed.stderr):
+        modules.add(module)
+        if len(indent) == 1:
+            top_level[module] = top_level.get(module, 0) + int(cumulative)
+    return elapsed, top_level, modules
+
+
+def bench(name, args, cwd, runs, budget):
+    best = None
+    for _i in range(runs):
+        elapsed, top_level, modules = import_times(args, cwd)
+        total = sum(top_level.values()) / 1000
+        if best is None or total < best[0]:
+            best = (total, elapsed, top_level, modules)
+    total, elapsed, top_level, modules = best
+    slowest = sorted(top_level.items(), key=lambda item: -item[1])[:4]
+    over = budget is not None and total > budget
+    print(f'{name:<12} {total:>11.1f} {elapsed * 1000:>10.1f}  '
+          f'{"OVER BUDGET" if over else ("ok" if budget is not None else "-"):<11}  '
+          f'{", ".join(f"{module} {us / 1000:.1f}" for module, us in slowest)}')
+    deferred = sorted(modules.intersection(DEFERRED))
+    if deferred:
+        print(f'{"":<12} imported anyway: {", ".join(deferred)}')
+    return not over
+
+
+def main(budget, runs):
+    compileall.compile_dir(QUICKSCAN_DIR, quiet=1)
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, 20, signature_every=100)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        scan_args = ['--root', root, '--no-cache']
+        print(f'best of {runs} runs, budget {budget:.1f} ms of imports per scan')
+        print(f'{"command":<12} {"imports ms":>11} {"wall ms":>10}  {"budget":<11}  '
+              f'slowest top level imports (ms)')
+        bench('--help', ['--help'], root, runs, None)
+        ok = bench('inventory', scan_args + ['--skip-analysis'], root, runs, budget)
+        ok = bench('analysis', scan_args, root, runs, budget) and ok
+        os.environ['PATH'] = path
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(float(sys.argv[1]) if len(sys.argv) > 1 else 45,
+                       int(sys.argv[2]) if len(sys.argv) > 2 else 10) else 1)
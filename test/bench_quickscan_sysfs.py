@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Micro-benchmark: per-attribute sysfs reads vs read_device_attributes, which lists each
+directory once and opens each attribute once, as the device worker threads read them.
+
+usage: python3 bench_quickscan_sysfs.py [device count]
+"""
+import sys
+import os
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common.sysfs import read_device_attributes
+from quickscan.common.utils import read_file
+from quickscan.quickscan.devices import BaseDevice
+from synthetic_host import make_block_dir
+
+
+def legacy_read(block_dir, names):
+    # the original _process_sysfs access pattern
+    for name in names:
+        for attrib in BaseDevice._device_attributes:
+            read_file(os.path.join(block_dir, name, attrib))
+            if attrib == 'size':
+                read_file(os.path.join(block_dir, name, 'queue/logical_block_size'))
+
+
+def batched_read(block_dir, names, max_workers=0):
+    def read(name):
+        return read_device_attributes(os.path.join(block_dir, name), BaseDevice._sysfs_attributes)
+
+    if max_workers > 0:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(read, names))
+    return [read(name) for name in names]
+
+
+def bench(label, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {elapsed * 1000:10.2f} ms')
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as block_dir:
+        names = make_block_dir(block_dir, count)
+        print(f'{count} devices')
+        bench('per-attribute reads', legacy_read, block_dir, names)
+        bench('batched reads', batched_read, block_dir, names)
+        bench('batched reads (8 threads)', batched_read, block_dir, names, 8)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
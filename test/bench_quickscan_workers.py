@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Benchmark: scan time against the number of worker threads, when sysfs is slow to read.
+
+Every sysfs attribute read and lock probe is delayed, standing in for a host whose sysfs
+attributes are served slowly (busy HBAs, devices in error recovery).
+
+usage: python3 bench_quickscan_workers.py [device count] [delay ms]   (default: 200 0.2)
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common import sysfs
+from quickscan.quickscan import devices as devices_module
+from synthetic_host import make_host
+
+
+def slowed(func, delay):
+    def wrap(*args, **kwargs):
+        time.sleep(delay)
+        return func(*args, **kwargs)
+    return wrap
+
+
+def main(count, delay):
+    sysfs.read_attribute = slowed(sysfs.read_attribute, delay)
+    devices_module.is_device_locked = slowed(devices_module.is_device_locked, delay * 10)
+
+    path = os.environ['PATH']
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, count)
+        os.environ['PATH'] = f'{summary["bin_dir"]}{os.pathsep}{path}'
+        print(f'{count} devices, {delay * 1000:.1f} ms per sysfs read')
+        print(f'{"workers":>8} {"scan (ms)":>10} {"speedup":>8}')
+        baseline = None
+        for workers in (1, 2, 4, 8, 16):
+            start = time.perf_counter()
+            Devices(False, root=root, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f'{workers:>8} {elapsed * 1000:>10.1f} {baseline / elapsed:>7.1f}x')
+        os.environ['PATH'] = path
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0002)
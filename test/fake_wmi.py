@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""A stand-in for the wmi module, serving a fabricated windows system, for pydiskinfo tests and
+benchmarks that run anywhere."""
+import time
+import types
+
+
+class x_access_denied(Exception):
+    pass
+
+
+class x_wmi_authentication(Exception):
+    pass
+
+
+class WMIProperty:
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+class WMIObject:
+    """A WMI instance: its properties as attributes, and its associations by class"""
+
+    def __init__(self, cursor: 'WMI', wmi_class: str, **properties) -> None:
+        self.__dict__.update(properties)
+        # as the wmi module has it, the property names
+        self.properties = dict.fromkeys(properties)
+        self._cursor = cursor
+        self._class = wmi_class
+        self._associations = {}
+
+    def wmi_property(self, name: str) -> WMIProperty:
+        return WMIProperty(getattr(self, name))
+
+    def path(self) -> str:
+        key = self.DeviceID.replace('\\', '\\\\').replace('"', '\\"')
+        return f'\\\\FAKE\\root\\cimv2:{self._class}.DeviceID="{key}"'
+
+    def associators(self, wmi_association_class: str = '') -> list:
+        self._cursor.round_trip()
+        return self._associations.get(wmi_association_class, [])
+
+
+class WMI:
+    """A connection, counting the queries made through it, each of which takes latency
+    seconds"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.round_trips = 0
+        self.latency = latency
+        self.instances = {}
+
+    def round_trip(self) -> None:
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add(self, wmi_class: str, **properties) -> WMIObject:
+        instance = WMIObject(self, wmi_class, **properties)
+        self.instances.setdefault(wmi_class, []).append(instance)
+        return instance
+
+    def associate(self, association: str, antecedent: WMIObject, dependent: WMIObject) -> None:
+        antecedent._associations.setdefault(association, []).append(dependent)
+        dependent._associations.setdefault(association, []).append(antecedent)
+        self.add(association, Antecedent=antecedent.path(), Dependent=dependent.path())
+
+    def __getattr__(self, wmi_class: str):
+        if not wmi_class.startswith('Win32_'):
+            raise AttributeError(wmi_class)
+
+        def query() -> list:
+            self.round_trip()
+            return self.instances.get(wmi_class, [])
+        return query
+
+
+def make_wmi(disks: int, partitions: int = 10, span_every: int = 50,
+             latency: float = 0.0) -> types.SimpleNamespace:
+    """Fabricate a windows system of disks disks with partitions partitions each, every one
+    holding a logical disk, except that every span_every'th partition's logical disk also spans
+    the partition after it, as a volume on dynamic disks does. There is a CD drive too, without
+    a partition. Returns a module standing in for wmi, whose WMI() returns the same connection
+    every time."""
+    cursor = WMI(latency)
+    logical_disk = None
+    for disk_index in range(disks):
+        disk = cursor.add('Win32_DiskDrive', Size=str(partitions * 2 ** 30 + 2 ** 20),
+                          Index=disk_index, DeviceID=f'\\\\.\\PHYSICALDRIVE{disk_index}',
+                          MediaType='Fixed hard disk media', SerialNumber=f'S{disk_index:08d}',
+                          Model='Fake Disk', TotalSectors=str(partitions * 2 ** 21),
+                          TotalHeads='255', TotalCylinders='1305', BytesPerSector='512',
+                          FirmWare='1.0', InterfaceType='SCSI', MediaLoaded=True, Status='OK')
+        for index in range(partitions):
+            partition = cursor.add('Win32_DiskPartition', BlockSize='512', Bootable=False,
+                                   BootPartition=False, Description='GPT: Basic Data',
+                                   DeviceID=f'Disk #{disk_index}, Partition #{index}',
+                                   DiskIndex=str(disk_index), Index=str(index),
+                                   NumberOfBlocks=str(2 ** 21), PrimaryPartition=True,
+                                   Size=str(2 ** 30),
+                                   StartingOffset=str(2 ** 20 + index * 2 ** 30),
+                                   Type='GPT: Basic Data')
+            cursor.associate('Win32_DiskDriveToDiskPartition', disk, partition)
+            number = disk_index * partitions + index
+            # the previous partition's volume spans this one too
+            if logical_disk is None or (number - 1) % span_every:
+                logical_disk = cursor.add('Win32_LogicalDisk', Description='Local Fixed Disk',
+                                          DeviceID=f'V{number}:', DriveType=3,
+                                          FileSystem='NTFS', FreeSpace=str(2 ** 29),
+                                          MaximumComponentLength=255, Size=str(2 ** 30),
+                                          VolumeName=f'Data {number}',
+                                          VolumeSerialNumber=f'{number:08X}')
+            cursor.associate('Win32_LogicalDiskToPartition', partition, logical_disk)
+    cursor.add('Win32_LogicalDisk', Description='CD-ROM Disc', DeviceID='Z:', DriveType=5,
+               FileSystem=None, FreeSpace=None, MaximumComponentLength=None, Size=None,
+               VolumeName=None, VolumeSerialNumber=None)
+    return types.SimpleNamespace(WMI=lambda: cursor, x_access_denied=x_access_denied,
+                                 x_wmi_authentication=x_wmi_authentication)
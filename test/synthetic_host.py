@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""Fabricate a synthetic host for quickscan and pydiskinfo tests and benchmarks."""
+import os
+import sys
+import json
+import string
+import tempfile
+
+
+def dev_name(index: int) -> str:
+    """sda..sdz, sdaa..sdzz, ... the same way the kernel names scsi disks"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = string.ascii_lowercase[rem] + letters
+    return f'sd{letters}'
+
+
+def _write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content + '\n')
+
+
+def make_disk(block_dir: str, i: int, sectors: int = 104857600) -> str:
+    """Create the i'th scsi disk below block_dir (a fake /sys/block). Returns its name."""
+    name = dev_name(i)
+    dev_dir = os.path.join(block_dir, name)
+    attribs = {
+        'removable': '0',
+        'ro': '0',
+        'size': str(sectors),
+        'dev': f'8:{i * 16}',
+        'device/model': 'QEMU HARDDISK',
+        'device/vendor': 'QEMU',
+        'device/rev': '2.5+',
+        'device/wwid': f'naa.5000c500{i:08x}',
+        'device/vpd_pg80': f'\x00\x80\x00\x10SERIAL{i:010d}',
+        'queue/nr_requests': '256',
+        'queue/rotational': '1',
+        'queue/scheduler': '[mq-deadline] kyber bfq none',
+        'queue/discard_granularity': '0',
+        'queue/logical_block_size': '512',
+    }
+    for attrib, content in attribs.items():
+        _write(os.path.join(dev_dir, attrib), content)
+    os.makedirs(os.path.join(dev_dir, 'holders'))
+    os.makedirs(os.path.join(dev_dir, 'device', 'bsg', f'0:0:{i}:0'))
+    return name
+
+
+def make_block_dir(block_dir: str, count: int, sectors: int = 104857600) -> list:
+    """Create count scsi disks below block_dir (a fake /sys/block). Returns the device names."""
+    return [make_disk(block_dir, i, sectors) for i in range(count)]
+
+
+# stand-in lvs: replays the LV report written next to it by make_host
+FAKE_LVS = """#!{python}
+import os
+import sys
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lvs.json')) as f:
+    sys.stdout.write(f.read())
+"""
+
+# stand-in wipefs: reports the signatures listed in wipefs.json for the devices asked about
+FAKE_WIPEFS = """#!{python}
+import os
+import sys
+import json
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wipefs.json')) as f:
+    known = json.load(f)
+sigs = []
+for path in sys.argv[1:]:
+    name = os.path.basename(path)
+    for sig_type in known.get(name, []):
+        sigs.append({{'device': name, 'offset': '0x0', 'type': sig_type, 'uuid': None,
+                      'label': None, 'usage': 'partition table'}})
+if sigs:
+    print(json.dumps({{'signatures': sigs}}))
+"""
+
+
+# a VG backup as LVM writes it, with one LV on one PV
+LVM_BACKUP = '''# Generated by LVM2 version 2.03.11(2) (2021-01-08): Tue Mar  1 10:00:00 2022
+
+contents = "Text Format Volume Group"
+version = 1
+
+description = "Created *after* executing 'lvcreate -l 100%FREE -n {lv} {vg}'"
+
+creation_host = "synthetic"	# Linux synthetic 5.10.0 #1 SMP x86_64
+creation_time = 1646128800	# Tue Mar  1 10:00:00 2022
+
+{vg} {{
+	id = "{i:06d}-vg"
+	seqno = 2
+	format = "lvm2"			# informational
+	status = ["RESIZEABLE", "READ", "WRITE"]
+	flags = []
+	extent_size = 8192		# 4 Megabytes
+	max_lv = 0
+	max_pv = 0
+	metadata_copies = 0
+
+	physical_volumes {{
+
+		pv0 {{
+			id = "{i:06d}-pv"
+			device = "/dev/{pv}"	# Hint only
+
+			status = ["ALLOCATABLE"]
+			flags = []
+			dev_size = 104857600	# 50 Gigabytes
+			pe_start = 2048
+			pe_count = 12799	# 49.9961 Gigabytes
+		}}
+	}}
+
+	logical_volumes {{
+
+		{lv} {{
+			id = "{i:06d}-lv"
+			status = ["READ", "WRITE", "VISIBLE"]
+			flags = []
+			tags = ["ceph.osd_id={i}", "ceph.type=block"]
+			creation_time = 1646128800	# 2022-03-01 10:00:00 +0000
+			creation_host = "synthetic"
+			segment_count = 1
+
+			segment1 {{
+				start_extent = 0
+				extent_count = 12799	# 49.9961 Gigabytes
+
+				type = "striped"
+				stripe_count = 1	# linear
+
+				stripes = [
+					"pv0", 0
+				]
+			}}
+		}}
+	}}
+
+}}
+'''
+
+
+def write_image(path: str, size: int, regions: dict) -> None:
+    """Write a sparse image of size bytes, with the given {offset: bytes} regions filled in
+    (a negative offset counts back from the end)"""
+    with open(path, 'wb') as f:
+        f.truncate(size)
+        for offset, data in regions.items():
+            f.seek(offset if offset >= 0 else size + offset)
+            f.write(data)
+
+
+def gpt_regions() -> dict:
+    """A protective MBR, and the primary and backup GPT headers (512 byte sectors)"""
+    pmbr = bytearray(512)
+    pmbr[446 + 4] = 0xee
+    pmbr[510:512] = b'\x55\xaa'
+    return {0: bytes(pmbr), 512: b'EFI PART', -512: b'EFI PART'}
+
+
+def vfat_regions() -> dict:
+    """A FAT32 boot sector: data, but no signature quickscan reads itself"""
+    boot = bytearray(512)
+    boot[0:3] = b'\xeb\x58\x90'
+    boot[3:11] = b'mkfs.fat'
+    boot[0x52:0x5a] = b'FAT32   '
+    boot[510:512] = b'\x55\xaa'
+    return {0: bytes(boot)}
+
+
+def _symlink(target: str, link: str) -> None:
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    os.symlink(target, link)
+
+
+def _script(path: str, content: str) -> None:
+    with open(path, 'w') as f:
+        f.write(content.format(python=sys.executable))
+    os.chmod(path, 0o755)
+
+
+def make_host(root: str,
+              count: int,
+              mpath_every: int = 10,
+              lvm_every: int = 7,
+              partition_every: int = 11,
+              signature_every: int = 13) -> dict:
+    """Fabricate a host below root with count scsi disks.
+
+    Creates sys/block (disks, dm devices and holders), dev/ nodes, dev/disk/by-id links for LVM
+    PVs and LVs, dev/mapper multipath maps, LVM metadata backups, and bin/ holding stand-in lvs
+    and wipefs executables (put it first on PATH). Every mpath_every'th disk is paired with the
+    next one as two paths to the same multipath LUN, every lvm_every'th disk is an LVM PV, every
+    partition_every'th disk has a partition and every signature_every'th disk carries a GPT
+    (or, for every other one, a FAT file system) signature.
+    Returns a summary of what was created.
+    """
+    block_dir = os.path.join(root, 'sys', 'block')
+    dev_dir = os.path.join(root, 'dev')
+    by_id = os.path.join(dev_dir, 'disk', 'by-id')
+    bin_dir = os.path.join(root, 'bin')
+    for path in (dev_dir, by_id, os.path.join(dev_dir, 'mapper'), bin_dir):
+        os.makedirs(path, exist_ok=True)
+
+    names = make_block_dir(block_dir, count)
+    lvs = []
+    signatures = {}
+    summary = {'disks': names, 'mpath': [], 'pv': [], 'partitioned': [], 'signature': [],
+               'signatures': signatures, 'bin_dir': bin_dir}
+    dm_index = 0
+
+    def add_dm(holder_of, dm_name, dm_uuid):
+        nonlocal dm_index
+        dm = f'dm-{dm_index}'
+        dm_index += 1
+        os.makedirs(os.path.join(block_dir, dm, 'dm'))
+        _write(os.path.join(block_dir, dm, 'dm', 'name'), dm_name)
+        _write(os.path.join(block_dir, dm, 'dm', 'uuid'), dm_uuid)
+        _write(os.path.join(block_dir, dm, 'dev'), f'253:{dm_index - 1}')
+        open(os.path.join(dev_dir, dm), 'w').close()
+        for name in holder_of:
+            _symlink(f'../../{dm}', os.path.join(block_dir, name, 'holders', dm))
+            _symlink(f'../../{name}', os.path.join(block_dir, dm, 'slaves', name))
+        return dm
+
+    skip = set()
+    for i, name in enumerate(names):
+        open(os.path.join(dev_dir, name), 'w').close()
+        if name in skip:
+            continue
+        if mpath_every and i % mpath_every == 0 and i + 1 < count:
+            # second path to the same LUN: same serial
+            partner = names[i + 1]
+            vpd = os.path.join(block_dir, name, 'device', 'vpd_pg80')
+            with open(vpd) as src_f, open(os.path.join(block_dir, partner, 'device', 'vpd_pg80'),
+                                          'w') as dst_f:
+                dst_f.write(src_f.read())
+            mpath = f'mpath{dev_name(len(summary["mpath"]))[2:]}'
+            dm = add_dm([name, partner], mpath, f'mpath-3{i:015x}')
+            _symlink(f'../{dm}', os.path.join(dev_dir, 'mapper', mpath))
+            summary['mpath'].append((mpath, name, partner))
+            skip.add(partner)
+        elif lvm_every and i % lvm_every == 0:
+            _symlink(f'../../{name}', os.path.join(by_id, f'lvm-pv-uuid-{i:06d}-pv'))
+            vg, lv = f'ceph{i}', f'osd{i}'
+            dm = add_dm([name], f'{vg}-{lv}', f'LVM-{i:032d}{i + 1:032d}')
+            _symlink(f'../../{dm}', os.path.join(by_id, f'dm-name-{vg}-{lv}'))
+            lvs.append({'vg_name': vg, 'lv_name': lv,
+                        'lv_tags': f'ceph.osd_id={i},ceph.type=block'})
+            _write(os.path.join(root, 'etc', 'lvm', 'backup', vg),
+                   LVM_BACKUP.format(vg=vg, lv=lv, pv=name, i=i))
+            summary['pv'].append(name)
+        elif partition_every and i % partition_every == 0:
+            os.makedirs(os.path.join(block_dir, name, f'{name}1'))
+            summary['partitioned'].append(name)
+        elif signature_every and i % signature_every == 0:
+            # alternately a GPT disk, and a FAT file system that only wipefs identifies
+            if len(summary['signature']) % 2 == 0:
+                write_image(os.path.join(dev_dir, name), 64 * 1024 * 1024, gpt_regions())
+                signatures[name] = ['gpt', 'PMBR']
+            else:
+                write_image(os.path.join(dev_dir, name), 64 * 1024 * 1024, vfat_regions())
+                signatures[name] = ['vfat']
+            summary['signature'].append(name)
+
+    with open(os.path.join(bin_dir, 'lvs.json'), 'w') as f:
+        json.dump({'report': [{'lv': lvs}]}, f)
+    with open(os.path.join(bin_dir, 'wipefs.json'), 'w') as f:
+        json.dump(signatures, f)
+    _script(os.path.join(bin_dir, 'lvs'), FAKE_LVS)
+    _script(os.path.join(bin_dir, 'wipefs'), FAKE_WIPEFS)
+    return summary
+
+
+# mounts that aren't on a disk, as found on any system
+OTHER_MOUNTS = [
+    '22 1 0:21 / /proc rw,nosuid,nodev,noexec,relatime shared:12 - proc proc rw',
+    '23 1 0:22 / /sys rw,nosuid,nodev,noexec,relatime shared:2 - sysfs sysfs rw',
+    '24 1 0:5 / /dev rw,nosuid shared:8 - devtmpfs udev rw,size=8104828k,mode=755',
+    '25 24 0:23 / /run rw,nosuid,nodev,noexec,relatime shared:5 - tmpfs tmpfs rw,mode=755',
+]
+
+
+def make_linux_system(root: str, count: int, partitions: int = 4, mount_every: int = 1) -> dict:
+    """Fabricate a linux system below root for pydiskinfo, with count scsi disks of partitions
+    partitions each.
+
+    Creates sys/block with the partitions (numbered from 259:0 up, as the kernel does past 15
+    partitions), run/udev/data entries for them, and proc/self/mountinfo mounting every
+    mount_every'th partition at mnt/<name> (the directories are created, so statvfs works),
+    along with the mounts in OTHER_MOUNTS. The first mounted partition is mounted at /boot
+    too. Returns a summary of what was created.
+    """
+    block_dir = os.path.join(root, 'sys', 'block')
+    udev_dir = os.path.join(root, 'run', 'udev', 'data')
+    names = make_block_dir(block_dir, count)
+    sectors = 104857600 // (partitions + 1)
+    mounts = list(OTHER_MOUNTS)
+    summary = {'disks': names, 'partitions': [], 'mounted': []}
+    minor = 0
+    for name in names:
+        for number in range(1, partitions + 1):
+            partition = f'{name}{number}'
+            attribs = {
+                'dev': f'259:{minor}',
+                'partition': str(number),
+                'start': str(2048 + (number - 1) * sectors),
+                'size': str(sectors),
+            }
+            for attrib, content in attribs.items():
+                _write(os.path.join(block_dir, name, partition, attrib), content)
+            _write(os.path.join(udev_dir, f'b259:{minor}'), '\n'.join([
+                'S:disk/by-partuuid/{:08x}-{:04x}'.format(minor, number),
+                'E:ID_PART_ENTRY_SCHEME=gpt',
+                'E:ID_PART_ENTRY_TYPE=0fc63daf-8483-4772-8e79-3d69d8477de4',
+                f'E:ID_PART_ENTRY_NAME=data{number}',
+                'E:ID_FS_TYPE=ext4',
+                f'E:ID_FS_LABEL={partition}',
+                f'E:ID_FS_UUID={minor:08x}-0000-4000-8000-{number:012x}']))
+            if mount_every and minor % mount_every == 0:
+                mount_point = f'/mnt/{partition}'
+                os.makedirs(os.path.join(root, 'mnt', partition))
+                mounts.append(f'{100 + minor} 1 259:{minor} / {mount_point} rw,relatime '
+                              f'shared:{100 + minor} - ext4 /dev/{partition} rw')
+                if not summary['mounted']:
+                    os.makedirs(os.path.join(root, 'boot'))
+                    mounts.append(f'99 1 259:{minor} / /boot rw,relatime shared:99 - ext4 '
+                                  f'/dev/{partition} rw')
+                summary['mounted'].append(partition)
+            summary['partitions'].append(partition)
+            minor += 1
+    _write(os.path.join(root, 'proc', 'self', 'mountinfo'), '\n'.join(mounts))
+    return summary
+
+
+class SyntheticHost:
+    """A host fabricated by make_host in a temporary directory, with its stand-in executables
+    first on PATH while the context is active."""
+
+    def __init__(self, count: int = 30, **kwargs) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.root = self._tmpdir.name
+        self.block_dir = os.path.join(self.root, 'sys', 'block')
+        self.summary = make_host(self.root, count, **kwargs)
+        self._path = os.environ['PATH']
+
+    def __enter__(self) -> 'SyntheticHost':
+        os.environ['PATH'] = f'{self.summary["bin_dir"]}{os.pathsep}{self._path}'
+        return self
+
+    def __exit__(self, *args) -> None:
+        os.environ['PATH'] = self._path
+        self._tmpdir.cleanup()
+
+    def dev(self, name: str) -> str:
+        return os.path.join(self.root, 'dev', name)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_cmd import render, str_partition, str_physical_disk
+from pydiskinfo_system import LinuxSystem
+from synthetic_host import make_linux_system
+
+
+def test_str_elements():
+    with tempfile.TemporaryDirectory() as root:
+        make_linux_system(root, 1, partitions=1)
+        system = LinuxSystem(root=root)
+        disk = system['Physical Disks'][0]
+        # P isn't a property, and unknown characters are left out
+        assert (str_physical_disk(disk, 'PipSzM')
+                == 'Physical Disk: Disk Number: 0, Path: /dev/sda, Size: 53687091200, '
+                   'Media is Loaded')
+        assert (str_partition(disk['Partitions'][0], 'LdNBe')
+                == 'Partition: Device I.D.: sda1, Partition Number: 1, is not bootable, '
+                   'Offset: 1048576')
+
+
+def test_render_streams():
+    with tempfile.TemporaryDirectory() as root:
+        make_linux_system(root, 3, partitions=2)
+        system = LinuxSystem(root=root, parse=False)
+        blocks = render(system, 'disks', 'Pip', 'LdN', 'pf')
+        assert next(blocks) == 'System: Name: Linux System, Type: Linux'
+        assert system['Physical Disks'] == []
+        first = next(blocks)
+        # the rest of the system isn't parsed yet
+        assert len(system['Physical Disks']) == 1
+        assert first.split('\n') == [
+            '  Physical Disk: Disk Number: 0, Path: /dev/sda',
+            '    Partition: Device I.D.: sda1, Partition Number: 1',
+            '      Logical Disk: Path: /mnt/sda1, File System: ext4',
+            '      Logical Disk: Path: /boot, File System: ext4',
+            '    Partition: Device I.D.: sda2, Partition Number: 2',
+            '      Logical Disk: Path: /mnt/sda2, File System: ext4']
+        assert len(list(blocks)) == 2
+        assert len(system['Physical Disks']) == 3
+
+        # what has been parsed is listed again, rather than parsed again
+        lines = list(render(system, 'disks', 'Pp', 'd', ''))
+        assert len(lines) == 4
+        assert lines[3].split('\n') == ['  Physical Disk: Path: /dev/sdc',
+                                        '    Partition: Device I.D.: sdc1',
+                                        '    Partition: Device I.D.: sdc2']
+
+
+def test_render_json():
+    with tempfile.TemporaryDirectory() as root:
+        make_linux_system(root, 2, partitions=2)
+        system = LinuxSystem(root=root, parse=False)
+        document = json.loads('\n'.join(render(system, 'logical disks', 'pS', 'dD', 'PpS',
+                                               'json')))
+        assert document['Name'] == 'Linux System'
+        assert len(document['Logical Disks']) == 5
+        boot = document['Logical Disks'][1]
+        assert boot['Path'] == '/boot'
+        assert boot['Partitions'] == [{'Device I.D.': 'sda1', 'Physical Disk': {
+            'Path': '/dev/sda', 'Size': 104857600 * 512}}]
+
+        lines = list(render(system, 'disks', 'PSi', 'N', '', 'ndjson'))
+        assert len(lines) == 2
+        disk = json.loads(lines[1])
+        assert disk == {'System': 'Linux System', 'Size': 104857600 * 512, 'Disk Number': 1,
+                        'Partitions': [{'Partition Number': 1}, {'Partition Number': 2}]}
+
+
+if __name__ == "__main__":
+    test_str_elements()
+    test_render_streams()
+    test_render_json()
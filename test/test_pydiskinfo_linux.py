@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_linux import SECTOR_SIZE, parse_mountinfo, read_block_devices
+from pydiskinfo_system import LinuxSystem
+from synthetic_host import make_linux_system
+
+
+def test_parse_mountinfo():
+    mounts = parse_mountinfo(
+        '36 35 98:0 /mnt1 /mnt/my\\040disk rw,noatime master:1 - ext3 /dev/root '
+        'rw,errors=continue\n'
+        '37 35 8:1 / /data rw - xfs /dev/sda1 rw\n'
+        'not a mount\n')
+    assert [mount['mount_point'] for mount in mounts] == ['/mnt/my disk', '/data']
+    assert mounts[0]['devno'] == '98:0'
+    assert mounts[0]['root'] == '/mnt1'
+    assert mounts[0]['fs_type'] == 'ext3'
+    assert mounts[0]['source'] == '/dev/root'
+    # no optional fields before the separator
+    assert mounts[1]['fs_type'] == 'xfs'
+
+
+def test_read_block_devices():
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_linux_system(root, 28, partitions=2)
+        # not a disk: no device link
+        os.makedirs(os.path.join(root, 'sys', 'block', 'loop0'))
+        disks = read_block_devices(root)
+        assert [disk['name'] for disk in disks] == summary['disks']
+        assert disks[26]['name'] == 'sdaa'
+        disk = disks[0]
+        assert disk['size'] == 104857600 * SECTOR_SIZE
+        assert disk['logical_block_size'] == 512
+        assert disk['model'] == 'QEMU HARDDISK'
+        assert disk['interface_type'] == 'SCSI'
+        assert [partition['name'] for partition in disk['partitions']] == ['sda1', 'sda2']
+        second = disk['partitions'][1]
+        assert second['number'] == 2
+        assert second['devno'] == '259:1'
+        assert second['start'] == (2048 + 104857600 // 3) * SECTOR_SIZE
+        assert second['udev']['ID_FS_LABEL'] == 'sda2'
+
+
+def test_linux_system():
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_linux_system(root, 3, partitions=4, mount_every=2)
+        system = LinuxSystem(root=root)
+        assert system['Type'] == "Linux"
+        assert len(system['Physical Disks']) == 3
+        assert len(system['Partitions']) == 12
+        # the pseudo filesystems aren't on a disk
+        assert len(system['Logical Disks']) == len(summary['mounted']) + 1
+
+        disk = system['Physical Disks'][1]
+        assert disk['Disk Number'] == 1
+        assert disk['Path'] == "/dev/sdb"
+        assert disk['Model'] == "QEMU QEMU HARDDISK"
+        assert disk['Sectors'] == 104857600
+        assert disk['Bytes per Sector'] == 512
+        assert [partition['Partition Number'] for partition in disk['Partitions']] == [1, 2, 3, 4]
+
+        partition = disk['Partitions'][0]
+        assert system.partitions_by_id['sdb1'] is partition
+        assert system.disks_by_number[1] is disk
+        assert system.logical_disks_by_id['/mnt/sdb1'] is partition['Logical Disks'][0]
+        assert partition['Physical Disk'] is disk
+        assert partition['Disk Number'] == 1
+        assert partition['Device I.D.'] == "sdb1"
+        assert partition['Starting Offset'] == 2048 * 512
+        assert partition['Number of Blocks'] == partition['Size'] // 512
+        assert partition['Description'] == "GPT: data1"
+        assert partition['Primary Partition']
+        logical_disk, = partition['Logical Disks']
+        assert logical_disk['Path'] == "/mnt/sdb1"
+        assert logical_disk['Partitions'] == [partition]
+        assert logical_disk['File System'] == "ext4"
+        assert logical_disk['Volume Name'] == "sdb1"
+        assert logical_disk['Drive Type'] == "Local Disk"
+        assert logical_disk['Size'] > 0
+        assert logical_disk['Maximum Component Length'] > 0
+        assert disk['Partitions'][1]['Logical Disks'] == []
+
+        boot = system['Partitions'][0]
+        assert boot['Boot Partition']
+        assert sorted(ld['Path'] for ld in boot['Logical Disks']) == ["/boot", "/mnt/sda1"]
+        assert "Partition -- ID: sda1" in str(system)
+
+
+if __name__ == "__main__":
+    test_parse_mountinfo()
+    test_read_block_devices()
+    test_linux_system()
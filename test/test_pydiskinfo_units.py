@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from human_readable_units import (ReadableUnitError, UnitScale, human_readable_units,
+                                  human_readable_units_batch)
+from quickscan.common import units
+from quickscan.common.utils import human_readable_size
+
+SIZES = [0, 1, 999, 1000, 1001, 1023, 1024, 1025, 1_500_000, 2 ** 40, 10 ** 15 + 1, 10 ** 18, -1]
+
+
+def test_human_readable_units():
+    # a unit is chosen once the value exceeds it
+    assert human_readable_units_batch(SIZES) == [
+        '0B', '1B', '999B', '1000B', '1.00KB', '1.02KB', '1.02KB', '1.02KB', '1.50MB', '1.10TB',
+        '1.00PB', '1000.00PB', '-1B']
+    assert human_readable_units_batch(SIZES, value_type='I', decimal_places=1) == [
+        '0B', '1B', '999B', '1000B', '1001B', '1023B', '1024B', '1.0KiB', '1.4MiB', '1024.0GiB',
+        '909.5TiB', '888.2PiB', '-1B']
+    assert human_readable_units(1_500_000, value_type='M', decimal_places=0) == '2M'
+    assert human_readable_units(1_500_000, 'GiB', decimal_places=4) == '0.0014GiB'
+    # out of range decimal places fall back to 2
+    assert human_readable_units(1_500_000, decimal_places=10) == '1.50MB'
+    for value_type in ('B', 'M', 'I'):
+        for unit in ('auto', 'KB', ''):
+            assert (human_readable_units_batch(iter(SIZES), unit, value_type)
+                    == [human_readable_units(size, unit, value_type) for size in SIZES])
+    try:
+        human_readable_units(1, 'XB')
+    except ReadableUnitError:
+        pass
+    else:
+        assert False, 'expected ReadableUnitError'
+
+
+def test_unit_scale():
+    scale = UnitScale(('B', 'KiB', 'MiB'), 1024, inclusive=True, separator=' ')
+    assert scale.format_many([1023, 1024, 1024.0, 2 ** 30, 1.5 * 2 ** 20]) == [
+        '1023 B', '1.00 KiB', '1.00 KiB', '1024.00 MiB', '1.50 MiB']
+    assert scale.index(2 ** 20 - 1) == 1
+
+    # quickscan's sizes come from its copy of the engine, which must agree with this one
+    values = SIZES + [2 ** 60, 2 ** 70, 1024 ** 6 - 1, 0.5, 1536.0]
+    for args in ((('B', 'KB', 'MB', 'GB', 'TB', 'PB'), 1024, True, ' ', 2),
+                 (('B', 'KiB', 'MiB'), 1024), (('', 'K', 'M'), 1000, False, '%')):
+        copy, engine = units.UnitScale(*args), UnitScale(*args)
+        for decimal_places in (0, 2, 5):
+            assert ([copy.format(value, decimal_places) for value in values]
+                    == [engine.format(value, decimal_places) for value in values])
+            assert (copy.format_many(values, decimal_places)
+                    == engine.format_many(values, decimal_places))
+    assert human_readable_size(512) == '512.00 B'
+    assert human_readable_size(1024) == '1.00 KB'
+    assert human_readable_size(10737418240) == '10.00 GB'
+    assert human_readable_size(1024 ** 6) == '1024.00 PB'
+
+    try:
+        import numpy
+    except ImportError:
+        return
+    sizes = numpy.array(SIZES[:-1], dtype=numpy.int64)
+    assert human_readable_units_batch(sizes) == human_readable_units_batch(SIZES[:-1])
+    assert (human_readable_units_batch(sizes, value_type='I')
+            == human_readable_units_batch(SIZES[:-1], value_type='I'))
+
+
+if __name__ == "__main__":
+    test_human_readable_units()
+    test_unit_scale()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the pydiskinfo modules on sys.path
+
+from pydiskinfo_system import WindowsSystem
+from pydiskinfo_wmi import LiveWMIProvider, RecordedWMIProvider, record_dataset, reference_key
+from fake_wmi import make_wmi, x_access_denied
+
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'wmi')
+
+
+def windows_system(*args, **kwargs):
+    return WindowsSystem(provider=LiveWMIProvider(make_wmi(*args, **kwargs)))
+
+
+def test_system_indexes():
+    # every 3rd partition's volume spans the next partition too
+    system = windows_system(3, partitions=4, span_every=3)
+    assert system['Type'] == "Microsoft Windows"
+    assert len(system['Physical Disks']) == 3
+    assert len(system['Partitions']) == 12
+    assert len(system['Logical Disks']) == 8
+    assert system.disks_by_number[2] is system['Physical Disks'][2]
+    assert list(system.partitions_by_id.values()) == system['Partitions']
+    assert list(system.logical_disks_by_id.values()) == system['Logical Disks']
+
+    spanned = system.logical_disks_by_id['V0:']
+    first = system.partitions_by_id['Disk #0, Partition #0']
+    second = system.partitions_by_id['Disk #0, Partition #1']
+    assert spanned['Partitions'] == [first, second]
+    assert first['Logical Disks'] == [spanned]
+    assert second['Logical Disks'] == [spanned]
+    # the span crosses over to the next disk
+    assert (system.partitions_by_id['Disk #1, Partition #0']['Logical Disks']
+            == [system.logical_disks_by_id['V3:']])
+
+    # linking the same logical disk twice keeps one
+    first.add_logical_disk(spanned)
+    assert first['Logical Disks'] == [spanned]
+
+
+def test_bulk_queries():
+    wmi = make_wmi(4, partitions=5)
+    provider = LiveWMIProvider(wmi)
+    system = WindowsSystem(provider=provider)
+    # one query per class, however many disks and partitions there are
+    assert provider.round_trips == 5
+    assert wmi.WMI().round_trips == 5
+    disk = system.disks_by_number[3]
+    assert disk['Path'] == "\\\\.\\PHYSICALDRIVE3"
+    assert disk['Size'] == 5 * 2 ** 30 + 2 ** 20
+    assert [partition['Partition Number'] for partition in disk['Partitions']] == [0, 1, 2, 3, 4]
+    # the CD drive has no partition
+    assert 'Z:' not in system.logical_disks_by_id
+
+    assert reference_key('\\\\HOST\\root\\cimv2:Win32_DiskDrive.DeviceID='
+                         '"\\\\\\\\.\\\\PHYSICALDRIVE0"') == '\\\\.\\PHYSICALDRIVE0'
+    assert reference_key('') == ''
+
+    def denied():
+        raise x_access_denied('denied')
+    wmi.WMI = denied
+    try:
+        LiveWMIProvider(wmi)
+    except PermissionError:
+        pass
+    else:
+        assert False, 'expected PermissionError'
+
+
+def test_recorded_dataset():
+    provider = RecordedWMIProvider(os.path.join(fixture_dir, 'windows_system.json'))
+    system = WindowsSystem(provider=provider)
+    assert provider.round_trips == 5
+    assert len(system['Physical Disks']) == 2
+    assert len(system['Partitions']) == 6
+    assert sorted(system.logical_disks_by_id) == ['V0:', 'V2:', 'V3:', 'V4:']
+    spanned = system.logical_disks_by_id['V4:']
+    assert ([partition['Device I.D.'] for partition in spanned['Partitions']]
+            == ['Disk #1, Partition #1', 'Disk #1, Partition #2'])
+    logical_disk = system.logical_disks_by_id['V3:']
+    assert logical_disk['Path'] == "V3:\\"
+    assert logical_disk['Drive Type'] == "Local Disk"
+    assert logical_disk['Free Space'] == 2 ** 29
+
+    # a recording of the same system builds the same system
+    with tempfile.TemporaryDirectory() as tmpdir:
+        recorded = os.path.join(tmpdir, 'windows_system.json')
+        record_dataset(RecordedWMIProvider(os.path.join(fixture_dir, 'windows_system.json')),
+                       recorded)
+        assert str(WindowsSystem(provider=RecordedWMIProvider(recorded))) == str(system)
+
+
+if __name__ == "__main__":
+    test_system_indexes()
+    test_bulk_queries()
+    test_recorded_dataset()
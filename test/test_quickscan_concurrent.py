@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common.concurrent import concurrent_cmds, async_run
+
+# stand-in for wipefs: sleeps, then echoes the device names it was given
+FAKE_WIPEFS = """#!/bin/sh
+sleep {delay}
+shift 2
+echo "$@"
+"""
+
+
+def _fake_wipefs(tmpdir, delay):
+    path = os.path.join(tmpdir, 'wipefs')
+    with open(path, 'w') as f:
+        f.write(FAKE_WIPEFS.format(delay=delay))
+    os.chmod(path, 0o755)
+    return path
+
+
+def _groups(wipefs, count):
+    return [f'{wipefs} -J --noheadings /dev/sd{chr(97 + i)}' for i in range(count)]
+
+
+def _timed_run(cmds, **kwargs):
+    start = time.time()
+    data = async_run(concurrent_cmds(cmds, **kwargs))
+    return data, time.time() - start
+
+
+def test_wall_time_scales_with_concurrency():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cmds = _groups(_fake_wipefs(tmpdir, 0.5), 6)
+
+        _data, elapsed = _timed_run(cmds, max_concurrency=6)
+        # a serial run would need 6 x 0.5s
+        assert elapsed < 1.5
+
+        _data, elapsed = _timed_run(cmds, max_concurrency=2)
+        # 3 batches of 0.5s
+        assert 1.4 <= elapsed < 2.5
+
+
+def test_results_are_ordered():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cmds = _groups(_fake_wipefs(tmpdir, 0.1), 8)
+        data, _elapsed = _timed_run(cmds, max_concurrency=3)
+        assert [c.args for c in data] == [cmd.split(' ') for cmd in cmds]
+        assert [c.stdout.decode().strip() for c in data] == [cmd.split(' ')[-1] for cmd in cmds]
+        assert all(c.returncode == 0 for c in data)
+
+
+def test_on_complete_in_finish_order():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.mkdir(os.path.join(tmpdir, 'slow'))
+        slow = f'{_fake_wipefs(os.path.join(tmpdir, "slow"), 0.5)} -J --noheadings /dev/sda'
+        fast = f'{_fake_wipefs(tmpdir, 0)} -J --noheadings /dev/sdb'
+        finished = []
+        data = async_run(concurrent_cmds([slow, fast],
+                                         on_complete=lambda c: finished.append(c.args[-1])))
+        assert finished == ['/dev/sdb', '/dev/sda']
+        assert [c.args[-1] for c in data] == ['/dev/sda', '/dev/sdb']
+
+
+def test_timeout_kills_command():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cmds = _groups(_fake_wipefs(tmpdir, 10), 2)
+        data, elapsed = _timed_run(cmds, max_concurrency=2, timeout=0.5)
+        assert elapsed < 5
+        assert all(c.returncode != 0 for c in data)
+
+
+def test_missing_command():
+    data, _elapsed = _timed_run(['/nonexistent/wipefs -J'])
+    assert data[0].returncode == 127
+
+
+if __name__ == "__main__":
+    test_wall_time_scales_with_concurrency()
+    test_results_are_ordered()
+    test_on_complete_in_finish_order()
+    test_timeout_kills_command()
+    test_missing_command()
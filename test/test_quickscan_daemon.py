@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import json
+import struct
+import socket
+import asyncio
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.filter import ObjectFilter
+from quickscan.common.uevent import parse_uevent, read_event_file
+from quickscan.quickscan.daemon import InventoryDaemon
+from synthetic_host import LVM_BACKUP, SyntheticHost, make_disk
+
+
+def _event(action, devpath, devtype='disk'):
+    return {'ACTION': action, 'SUBSYSTEM': 'block', 'DEVTYPE': devtype,
+            'DEVPATH': f'/devices/pci0000:00/host0/block/{devpath}'}
+
+
+def _free_disk(devices):
+    return [dev for dev in devices._device_data
+            if dev.available and not dev.mpath_device][0]
+
+
+def test_parse_kernel_uevent():
+    data = b'add@/block/sdb\x00ACTION=add\x00DEVPATH=/block/sdb\x00SUBSYSTEM=block\x00SEQNUM=7\x00'
+    assert parse_uevent(data) == {'ACTION': 'add', 'DEVPATH': '/block/sdb',
+                                  'SUBSYSTEM': 'block', 'SEQNUM': '7'}
+    assert parse_uevent(b'garbage') is None
+
+
+def test_parse_udev_uevent():
+    properties = b'ACTION=remove\x00DEVPATH=/block/sdc\x00SUBSYSTEM=block\x00'
+    header = b'libudev\x00' + struct.pack('>I', 0xfeedcafe) + struct.pack('=IIIIIII', 40, 40,
+                                                                          len(properties),
+                                                                          0, 0, 0, 0)
+    assert parse_uevent(header + properties)['ACTION'] == 'remove'
+
+
+def test_read_event_file(tmp_path):
+    path = tmp_path / 'events'
+    path.write_text('UDEV  [1.0] add /block/sdb (block)\n'
+                    'ACTION=add\nDEVPATH=/block/sdb\nSUBSYSTEM=block\n\n'
+                    'UDEV  [2.0] remove /block/sdc (block)\n'
+                    'ACTION=remove\nDEVPATH=/block/sdc\nSUBSYSTEM=block\n')
+    assert [e['ACTION'] for e in read_event_file(str(path))] == ['add', 'remove']
+
+
+def test_incremental_updates():
+    with SyntheticHost() as host:
+        devices = Devices(False, root=host.root)
+        daemon = InventoryDaemon(devices, os.path.join(host.root, 'qs.sock'), netlink=False)
+        before = {dev._dev_node: dev for dev in devices._device_data}
+
+        # a new partition rejects its disk, without touching any other device
+        free = _free_disk(devices)
+        name = free._dev_node
+        os.makedirs(os.path.join(host.block_dir, name, f'{name}1'))
+        daemon.apply_events([_event('add', f'{name}/{name}1', 'partition')])
+        after = {dev._dev_node: dev for dev in devices._device_data}
+        assert after[name].reject_reasons == ['Has partitions']
+        assert all(after[node] is dev for node, dev in before.items() if node != name)
+
+        # a disk being removed
+        gone = _free_disk(devices)._dev_node
+        os.rename(os.path.join(host.block_dir, gone), os.path.join(host.root, gone))
+        daemon.apply_events([_event('remove', gone)])
+        assert gone not in {dev._dev_node for dev in devices._device_data}
+
+        # a new disk
+        added = make_disk(host.block_dir, 500)
+        open(host.dev(added), 'w').close()
+        daemon.apply_events([_event('add', added)])
+        assert devices._devices_by_node[added].available
+        assert daemon.generation == 3
+
+
+def test_dm_event_updates_slaves():
+    with SyntheticHost() as host:
+        devices = Devices(False, root=host.root)
+        daemon = InventoryDaemon(devices, os.path.join(host.root, 'qs.sock'), netlink=False)
+        name = _free_disk(devices)._dev_node
+
+        # the disk becomes an LVM PV, with an LV (dm-99) on it
+        os.symlink(f'../../{name}',
+                   os.path.join(host.root, 'dev/disk/by-id', 'lvm-pv-uuid-new'))
+        os.makedirs(os.path.join(host.block_dir, 'dm-99', 'slaves'))
+        os.symlink(f'../../{name}', os.path.join(host.block_dir, 'dm-99', 'slaves', name))
+        os.symlink('../../dm-99', os.path.join(host.block_dir, name, 'holders', 'dm-99'))
+        assert daemon.affected_devices(_event('add', 'dm-99')) == [name]
+        daemon.apply_events([_event('add', 'dm-99')])
+        assert devices._devices_by_node[name].reject_reasons == ['LVM device']
+
+
+def _query(socket_path, request=b''):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(request + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+@contextmanager
+def _serving(daemon, socket_path):
+    """Run the daemon on a thread until the block exits, once its queued updates are applied"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def serve():
+        task = loop.create_task(daemon.serve())
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        await daemon.wait_idle()
+        ready.set()
+        await task
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(serve(),))
+    thread.start()
+    try:
+        assert ready.wait(10)
+        yield
+    finally:
+        daemon.stop()
+        thread.join(10)
+        loop.close()
+
+
+def test_serve_replayed_events(tmp_path):
+    with SyntheticHost(count=12) as host:
+        devices = Devices(False, root=host.root)
+        name = _free_disk(devices)._dev_node
+        os.makedirs(os.path.join(host.block_dir, name, f'{name}1'))
+        events = tmp_path / 'events'
+        events.write_text(f'ACTION=add\nSUBSYSTEM=block\nDEVTYPE=partition\n'
+                          f'DEVPATH=/devices/block/{name}/{name}1\n')
+        socket_path = os.path.join(host.root, 'run', 'qs.sock')
+        daemon = InventoryDaemon(devices, socket_path, event_file=str(events), netlink=False)
+
+        with _serving(daemon, socket_path):
+            report = _query(socket_path)
+            assert report['generation'] == 1
+            assert len(report['devices']) == 10
+            by_node = {os.path.basename(dev['dev_path']): dev for dev in report['devices']}
+            assert by_node[name]['reject_reasons'] == ['Has partitions']
+            assert 'error' in _query(socket_path, b'{"command": "bogus"}')
+        assert not os.path.exists(socket_path)
+
+
+def test_revalidate():
+    with SyntheticHost(count=12) as host:
+        devices = Devices(False, root=host.root, track_changes=True)
+        assert devices.revalidate() == []
+
+        # changes no uevent reported: a new partition, and a disk gone
+        free, gone = [dev._dev_node for dev in devices._device_data
+                      if dev.available and not dev.mpath_device][:2]
+        os.makedirs(os.path.join(host.block_dir, free, f'{free}1'))
+        shutil.rmtree(os.path.join(host.block_dir, gone))
+        assert devices.revalidate() == sorted([free, gone])
+        assert devices._devices_by_node[free].reject_reasons == ['Has partitions']
+        assert gone not in devices._devices_by_node
+        assert devices.revalidate() == []
+
+
+def test_updates_built_aside():
+    with SyntheticHost(count=12) as host:
+        devices = Devices(False, root=host.root, track_changes=True)
+        dev_filter = ObjectFilter('available=true')
+        topology, device_data = devices.topology, devices._device_data
+        assert devices.select(dev_filter)
+        stale_index = devices._filter_index
+
+        free = _free_disk(devices)
+        name = free._dev_node
+        os.makedirs(os.path.join(host.block_dir, name, f'{name}1'))
+        devices.update_devices([name])
+        # what requests were reading meanwhile is as it was
+        assert topology.partitions(name) == [] and free.available
+        assert devices._device_data is not device_data
+        assert devices.topology.partitions(name) == [f'{name}1']
+        assert all(dev._topology is devices.topology for dev in devices._device_data)
+
+        # an index a request built from the old devices, stored after the update, isn't used
+        devices._filter_index = stale_index
+        assert free.path not in [dev.path for dev in devices.select(dev_filter)]
+        assert devices._filter_index.objects is devices._device_data
+
+
+def _add_ceph_lv(host, name, i):
+    # the disk becomes the PV of a Ceph OSD's LV (dm-99), with its LVM metadata backup
+    dm_dir = os.path.join(host.block_dir, 'dm-99')
+    os.makedirs(os.path.join(dm_dir, 'dm'))
+    os.makedirs(os.path.join(dm_dir, 'slaves'))
+    for attribute, value in (('dm/name', f'ceph{i}-osd{i}'),
+                             ('dm/uuid', f'LVM-{i:032d}{i + 1:032d}'), ('dev', '253:99')):
+        with open(os.path.join(dm_dir, attribute), 'w') as f:
+            f.write(value + '\n')
+    open(host.dev('dm-99'), 'w').close()
+    os.symlink(f'../../{name}', os.path.join(dm_dir, 'slaves', name))
+    os.symlink('../../dm-99', os.path.join(host.block_dir, name, 'holders', 'dm-99'))
+    by_id = os.path.join(host.root, 'dev/disk/by-id')
+    os.symlink(f'../../{name}', os.path.join(by_id, f'lvm-pv-uuid-{i:06d}-pv'))
+    os.symlink('../../dm-99', os.path.join(by_id, f'dm-name-ceph{i}-osd{i}'))
+    with open(os.path.join(host.root, 'etc/lvm/backup', f'ceph{i}'), 'w') as f:
+        f.write(LVM_BACKUP.format(vg=f'ceph{i}', lv=f'osd{i}', pv=name, i=i))
+
+
+def test_updated_lv_tags():
+    # an LV created after the first scan is tagged as a fresh scan would tag it
+    for update in ('uevent', 'revalidate'):
+        with SyntheticHost(count=12) as host:
+            devices = Devices(False, root=host.root, track_changes=True)
+            daemon = InventoryDaemon(devices, os.path.join(host.root, 'qs.sock'), netlink=False)
+            name = _free_disk(devices)._dev_node
+            assert devices._devices_by_node[name].lvs == []
+            _add_ceph_lv(host, name, 99)
+            if update == 'uevent':
+                daemon.apply_events([_event('add', 'dm-99')])
+            else:
+                assert name in devices.revalidate()
+            expected = Devices(False, root=host.root, use_cache=False)
+            lvs = devices._devices_by_node[name].lvs
+            assert lvs == expected._devices_by_node[name].lvs, update
+            assert [(lv['osd_id'], lv['type']) for lv in lvs] == [('99', 'block')], update
+
+
+def test_query_protocol():
+    with SyntheticHost(count=12) as host:
+        devices = Devices(False, root=host.root, track_changes=True)
+        socket_path = os.path.join(host.root, 'run', 'qs.sock')
+        daemon = InventoryDaemon(devices, socket_path, netlink=False)
+        available = sorted(dev.path for dev in devices._device_data if dev.available)
+
+        with _serving(daemon, socket_path):
+            request = json.dumps({'command': 'report', 'filter': 'available=true',
+                                  'fields': ['path', 'size']}).encode()
+            report = _query(socket_path, request)
+            assert sorted(dev['path'] for dev in report['devices']) == available
+            assert all(set(dev) == {'path', 'sys_api'} for dev in report['devices'])
+            paths = _query(socket_path, b'{"command": "filter", "filter": "available=true"}')
+            assert paths['generation'] == 0 and sorted(paths['paths']) == available
+
+            # concurrent clients get the same answers
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                answers = list(executor.map(lambda _i: _query(socket_path, request), range(32)))
+            assert all(answer == report for answer in answers)
+
+            for bad in (b'{"filter": "size"}', b'{"fields": ["bogus"]}', b'[1]', b'{'):
+                assert 'error' in _query(socket_path, bad)
+
+            # a change the daemon wasn't told about is picked up by a revalidation
+            name = os.path.basename(available[-1])
+            os.makedirs(os.path.join(host.block_dir, name, f'{name}1'))
+            assert _query(socket_path, b'{"command": "revalidate"}') == {
+                'generation': 1, 'changed': [name]}
+            report = _query(socket_path, request)
+            assert report['generation'] == 1
+            assert len(report['devices']) == len(available) - 1
+
+
+if __name__ == "__main__":
+    test_parse_kernel_uevent()
+    test_parse_udev_uevent()
+    test_incremental_updates()
+    test_dm_event_updates_slaves()
+    test_revalidate()
+    test_updates_built_aside()
+    test_query_protocol()
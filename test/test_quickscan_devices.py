@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import io
+import sys
+import os
+import json
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.filter import ObjectFilter
+from quickscan.common.report import report_writer
+from quickscan.quickscan.sysapi import SysApi
+from synthetic_host import SyntheticHost, gpt_regions, write_image
+
+
+def _by_path(devices):
+    return {dev.path: dev for dev in devices._device_data}
+
+
+def _records(devices):
+    # everything but the lock probe latency is the same from one scan to the next
+    return [dict(dev.as_dict(), lock_probe_ms=None) for dev in devices._device_data]
+
+
+def test_can_run_on_synthetic_root():
+    with SyntheticHost() as host:
+        ok, reasons = Devices.can_run(host.root)
+        assert ok, reasons
+
+
+def test_scan_synthetic_root():
+    with SyntheticHost() as host:
+        devices = Devices(False, root=host.root)
+        by_path = _by_path(devices)
+        summary = host.summary
+
+        # each multipath pair is reported once, under its mapper path
+        assert len(by_path) == len(summary['disks']) - len(summary['mpath'])
+        for mpath, node, partner in summary['mpath']:
+            dev = by_path[os.path.join(host.root, 'dev/mapper', mpath)]
+            assert sorted(dev._dev_nodes_str.split(',')) == [node, partner]
+        for name in summary['pv']:
+            assert 'LVM device' in by_path[host.dev(name)].reject_reasons
+            assert by_path[host.dev(name)].lvs[0]['osd_id']
+        for name in summary['partitioned']:
+            assert by_path[host.dev(name)].reject_reasons == ['Has partitions']
+        for name in summary['signature']:
+            types = ','.join(summary['signatures'][name])
+            assert by_path[host.dev(name)].reject_reasons == [f'{types} detected']
+
+        available = [dev for dev in by_path.values() if dev.available]
+        assert available
+        assert all(dev.sys_api['size'] == 104857600 * 512 for dev in available)
+
+
+def test_parallel_scan_matches_serial():
+    with SyntheticHost() as host:
+        serial = Devices(False, root=host.root, max_workers=0)
+        parallel = Devices(False, root=host.root, max_workers=8)
+        assert _records(parallel) == _records(serial)
+        assert list(parallel._devices_by_node) == list(serial._devices_by_node)
+
+
+def test_report_on_synthetic_root():
+    with SyntheticHost(count=12) as host:
+        devices = Devices(True, root=host.root)
+        assert devices.report(mode='text').endswith('10 devices listed')
+
+        records = json.loads(devices.report(mode='json'))
+        assert [r['path'] for r in records] == [dev.path for dev in devices._device_data]
+        assert 'available' not in records[0]
+
+        lines = devices.report(mode='ndjson').splitlines()
+        assert [json.loads(line) for line in lines] == records
+
+        f = io.StringIO()
+        assert devices.write_report(f, 'json', ObjectFilter('mpath_node=dm-0')) == 1
+        assert json.loads(f.getvalue())[0]['mpath_node'] == 'dm-0'
+
+
+def test_streamed_report():
+    with SyntheticHost() as host:
+        f = io.StringIO()
+        writer = report_writer('ndjson', f)
+        devices = Devices(False, root=host.root, on_device=lambda dev: writer.write(dev.as_dict()))
+        writer.close()
+
+        records = [json.loads(line) for line in f.getvalue().splitlines()]
+        assert len(records) == len(devices._device_data)
+        # rejected devices need no signature probe, so they are written first
+        assert not any(r['available'] for r in records[:len(host.summary['pv'])])
+        by_path = {r['path']: r for r in records}
+        assert by_path == {dev.path: dev.as_dict() for dev in devices._device_data}
+
+
+def _reasons(devices):
+    return {dev.path: sorted(dev.reject_reasons) for dev in devices._device_data}
+
+
+def test_scan_cache():
+    with SyntheticHost() as host:
+        first = Devices(False, root=host.root, use_cache=True)
+        assert first._cache.misses == len(host.summary['disks'])
+
+        # lvs is gone, so LV details not served from the cache would change
+        os.remove(os.path.join(host.summary['bin_dir'], 'lvs'))
+        second = Devices(False, root=host.root, use_cache=True)
+        assert second._cache.hits == len(host.summary['disks'])
+        assert _reasons(second) == _reasons(first)
+        assert second._lv_metadata_data is None
+
+        # signatures aren't cached: a disk given a partition table within the ttl is rejected
+        gpt = [dev for dev in second._device_data if dev.available and not dev.mpath_device][-1]
+        write_image(gpt.dev_path, 64 * 1024 * 1024, gpt_regions())
+        rewritten = Devices(False, root=host.root, use_cache=True)
+        assert rewritten._cache.hits == len(host.summary['disks'])
+        assert _by_path(rewritten)[gpt.path].reject_reasons == ['gpt,PMBR detected']
+
+        # a new partition changes the fingerprint of that device only
+        free = [dev for dev in second._device_data if dev.available and not dev.mpath_device][0]
+        os.makedirs(os.path.join(host.root, 'sys/block', free._dev_node, f'{free._dev_node}1'))
+        third = Devices(False, root=host.root, use_cache=True)
+        assert third._cache.misses == 1
+        assert _by_path(third)[free.path].reject_reasons == ['Has partitions']
+
+
+def test_scan_cache_ttl():
+    with SyntheticHost(count=5) as host:
+        Devices(False, root=host.root, use_cache=True)
+        expired = Devices(False, root=host.root, use_cache=True, cache_ttl=0)
+        assert expired._cache.hits == 0
+
+
+def test_sysapi():
+    sys_api = SysApi({'size': '1024', 'rotational': '0', 'vendor': 'QEMU', 'nr_requests': 'x'})
+    assert sys_api['size'] == 1024 and sys_api['rotational'] == 0
+    assert sys_api['nr_requests'] is None
+    assert 'serial' not in sys_api and sys_api.get('serial') is None
+    sys_api['lsm_health'] = 'good'
+    assert dict(sys_api) == sys_api.to_dict() == {
+        'size': 1024, 'rotational': 0, 'nr_requests': None, 'vendor': 'QEMU',
+        'lsm_health': 'good'}
+    del sys_api['vendor']
+    assert len(sys_api) == 4
+    assert not hasattr(sys_api, '__dict__')
+
+
+def test_device_records():
+    with SyntheticHost(count=5) as host:
+        devices = Devices(False, root=host.root, use_cache=True)
+        dev = devices._device_data[0]
+        assert not hasattr(dev, '__dict__')
+        assert dev.sys_api['rotational'] == 1 and dev.sys_api['sectorsize'] == 512
+        assert ObjectFilter('sys_api/rotational=1').ok(dev)
+        assert json.loads(dev.as_json())['sys_api'] == dev.sys_api.to_dict()
+
+        cached = Devices(False, root=host.root, use_cache=True)
+        assert cached._cache.hits == 5
+        assert isinstance(cached._device_data[0].sys_api, SysApi)
+        assert _records(cached) == _records(devices)
+
+
+def test_fields_on_demand():
+    with SyntheticHost() as host:
+        full = Devices(False, root=host.root)
+        dev_filter = ObjectFilter('size>=10G,rotational=1', aliases=Devices.filter_aliases)
+        assert dev_filter.fields == ['sys_api/rotational', 'sys_api/size']
+
+        lean = Devices(False, root=host.root, use_cache=True,
+                       fields=['path', 'size', 'available', 'size'])
+        assert lean.fields == ['path', 'sys_api/size', 'available']
+        # only the size and the device id inputs were read, and the LVs weren't gathered
+        dev = lean._device_data[0]
+        assert set(dev.sys_api.to_dict(load=False)) == {
+            'size', 'sectors', 'sectorsize', 'human_readable_size', 'vendor', 'model', 'serial'}
+        assert all(dev._lvs is None for dev in lean._device_data)
+        assert lean._lv_metadata_data is None
+        records = [json.loads(line) for line in lean.report('ndjson').splitlines()]
+        assert records == [{'path': dev.path, 'available': dev.available,
+                            'sys_api': {'size': dev.sys_api['size']}}
+                           for dev in full._device_data]
+
+        # anything else is read when first asked for, including by a cached device
+        assert _records(lean) == _records(full)
+        cached = Devices(False, root=host.root, use_cache=True)
+        assert cached._cache.hits == len(host.summary['disks'])
+        assert _records(cached) == _records(full)
+
+
+def test_failed_signature_check():
+    with SyntheticHost(count=12) as host:
+        found = Devices(False, root=host.root, native_signatures=False)
+        free = [dev.path for dev in found._device_data if dev.available]
+        # a wipefs that hangs past the timeout, or fails, says nothing about the devices
+        with open(os.path.join(host.summary['bin_dir'], 'wipefs'), 'w') as f:
+            f.write('#!/bin/sh\nsleep 5\n')
+        hung = Devices(False, root=host.root, native_signatures=False, cmd_timeout=0.2)
+        by_path = _by_path(hung)
+        assert free and all(by_path[path].reject_reasons == ['signature check failed']
+                            for path in free)
+        assert not any(dev.available for dev in hung._device_data)
+
+
+if __name__ == "__main__":
+    test_can_run_on_synthetic_root()
+    test_scan_synthetic_root()
+    test_parallel_scan_matches_serial()
+    test_report_on_synthetic_root()
+    test_streamed_report()
+    test_scan_cache()
+    test_scan_cache_ttl()
+    test_sysapi()
+    test_device_records()
+    test_fields_on_demand()
+    test_failed_signature_check()
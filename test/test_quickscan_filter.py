@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.filter import ObjectFilter, FilterIndex
+from synthetic_host import SyntheticHost
+
+
+class Disk:
+    def __init__(self, name, size, rotational, model, available):
+        self.name = name
+        self.available = available
+        self.sys_api = {'size': size, 'rotational': rotational, 'model': model}
+
+
+DISKS = [
+    Disk('sda', 2 * 1024 ** 4, 0, 'SAMSUNG MZ7LH', True),
+    Disk('sdb', 500 * 1024 ** 3, 1, 'ST4000NM', False),
+    Disk('sdc', 4 * 1024 ** 4, 1, 'SAMSUNG PM883', True),
+    Disk('sdd', 1024 ** 4, 0, 'INTEL SSDSC2', False),
+]
+ALIASES = {'size': 'sys_api/size', 'rotational': 'sys_api/rotational', 'model': 'sys_api/model'}
+
+
+def _names(expr):
+    dev_filter = ObjectFilter(expr, aliases=ALIASES)
+    assert dev_filter.valid
+    names = [disk.name for disk in DISKS if dev_filter.ok(disk)]
+    # the indexed path must agree with evaluating every object
+    assert [disk.name for disk in dev_filter.select(DISKS, FilterIndex(DISKS))] == names
+    return names
+
+
+def test_operators():
+    assert _names('size>=1T') == ['sda', 'sdc', 'sdd']
+    assert _names('size<1T') == ['sdb']
+    assert _names('sys_api/size=500G') == ['sdb']
+    assert _names('rotational=0') == ['sda', 'sdd']
+    assert _names('rotational!=0') == ['sdb', 'sdc']
+    assert _names('model~=SAMSUNG.*') == ['sda', 'sdc']
+    assert _names('model~=.*SSD') == ['sdd']
+    assert _names('size>=1T,rotational=1') == ['sdc']
+
+
+def test_booleans():
+    assert _names('available=false') == ['sdb', 'sdd']
+    assert _names('available=TRUE') == ['sda', 'sdc']
+
+
+def test_value_lists():
+    assert _names('name=sda|sdd') == ['sda', 'sdd']
+    assert _names('name!=sda|sdd') == ['sdb', 'sdc']
+
+
+def test_unknown_keys_are_ignored():
+    assert _names('enclosure=1,name=sdb') == ['sdb']
+    assert _names('sys_api/serial=X') == [disk.name for disk in DISKS]
+
+
+def test_invalid_filters():
+    for expr in ('size', 'size>=', 'model~=(', ''):
+        assert not ObjectFilter(expr).valid
+
+
+def test_devices_select():
+    with SyntheticHost() as host:
+        devices = Devices(False, root=host.root)
+        for expr in ('available=false', 'size>=40G,rotational=1', 'mpath_node~=dm-',
+                     'lvs=[]'):
+            dev_filter = ObjectFilter(expr, aliases=Devices.filter_aliases)
+            expected = [dev for dev in devices._device_data if dev_filter.ok(dev)]
+            assert devices.select(dev_filter) == expected
+        rejected = devices.select(ObjectFilter('available=false'))
+        assert len(rejected) >= len(host.summary['pv'])
+
+
+if __name__ == "__main__":
+    test_operators()
+    test_booleans()
+    test_value_lists()
+    test_unknown_keys_are_ignored()
+    test_invalid_filters()
+    test_devices_select()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import io
+import sys
+import os
+import json
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common import sysfs
+from quickscan.common.instrument import Instrumentation, instrumentation
+from synthetic_host import SyntheticHost
+
+
+def _scan(host, **kwargs):
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        return Devices(False, root=host.root, use_cache=False, **kwargs)
+    finally:
+        instrumentation.enable(False)
+
+
+def test_disabled_records_nothing():
+    timer = Instrumentation()
+    with timer.phase('sysfs', 'sda'):
+        pass
+    timer.add_time('lvs', 1.0)
+    timer.count('subprocesses')
+    assert timer.report() == {'phases': {}, 'devices': {}, 'counters': {}}
+
+    timer.enable()
+    with timer.phase('sysfs', 'sda'):
+        pass
+    timer.count('subprocesses', 2)
+    report = timer.report()
+    assert report['phases']['sysfs']['calls'] == 1
+    assert 'sysfs' in report['devices']['sda']
+    assert report['counters'] == {'subprocesses': 2}
+
+
+def test_scan_phases():
+    # big enough for a device only wipefs can identify
+    with SyntheticHost(count=30) as host:
+        try:
+            devices = _scan(host)
+            report = instrumentation.report()
+        finally:
+            instrumentation.reset()
+
+        for phase in ('scan', 'sysfs', 'holder_scan', 'link_resolution', 'signature_probe',
+                      'wipefs', 'lock_probe'):
+            assert phase in report['phases'], phase
+        assert report['phases']['sysfs']['calls'] == len(report['devices'])
+        assert report['phases']['lock_probe']['calls'] == report['counters']['lock_probes']
+        assert report['counters']['files_read'] > 0
+        assert report['counters']['subprocesses'] >= 1
+        assert all('sysfs' in timers for timers in report['devices'].values())
+        assert devices._device_data
+
+
+def test_os_calls_counted(tmp_path, monkeypatch):
+    # the counter tallies the calls made, so a file spanning several reads counts each of them
+    calls = []
+    for name in ('open', 'read', 'close', 'scandir'):
+        def counted(*args, _call=getattr(os, name), _name=name):
+            calls.append(_name)
+            return _call(*args)
+        monkeypatch.setattr(sysfs.os, name, counted)
+    (tmp_path / 'short').write_text('1\n')
+    (tmp_path / 'long').write_text('x' * (sysfs._READ_SIZE * 2 + 1))
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        sysfs.read_attribute(str(tmp_path / 'short'))
+        sysfs.read_attribute(str(tmp_path / 'long'))
+        sysfs.read_attribute(str(tmp_path / 'missing'))
+        sysfs._list_dir(str(tmp_path))
+        counters = instrumentation.report()['counters']
+    finally:
+        instrumentation.enable(False)
+        instrumentation.reset()
+    assert calls.count('read') == 4
+    assert counters['os_calls'] == len(calls) == 10
+
+
+def test_scan_without_instrumentation():
+    with SyntheticHost(count=4) as host:
+        instrumentation.reset()
+        Devices(False, root=host.root, use_cache=False)
+        assert instrumentation.report() == {'phases': {}, 'devices': {}, 'counters': {}}
+
+
+def test_timings_section():
+    with SyntheticHost(count=4) as host:
+        try:
+            devices = _scan(host)
+            f = io.StringIO()
+            devices.write_report(f, 'json', timings=True)
+            report = json.loads(f.getvalue())
+            assert len(report['devices']) == len(devices._device_data)
+            assert 'scan' in report['timings']['phases']
+
+            f = io.StringIO()
+            devices.write_report(f, 'ndjson', timings=True)
+            lines = [json.loads(line) for line in f.getvalue().splitlines()]
+            assert len(lines) == len(devices._device_data) + 1
+            assert list(lines[-1]) == ['timings']
+        finally:
+            instrumentation.reset()
+
+
+if __name__ == "__main__":
+    test_disabled_records_nothing()
+    test_scan_phases()
+    test_scan_without_instrumentation()
+    test_timings_section()
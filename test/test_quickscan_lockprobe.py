@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.lockprobe import LockProber
+from quickscan.quickscan import devices as devices_module
+from synthetic_host import SyntheticHost
+
+
+def open_for_read(path):
+    # opening a FIFO for reading blocks until a writer appears, like a device stuck in recovery
+    os.close(os.open(path, os.O_RDONLY))
+    return False
+
+
+def test_fifo_probe_times_out():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(6):
+            paths.append(os.path.join(tmpdir, f'disk{i}'))
+            open(paths[-1], 'w').close()
+        stuck = os.path.join(tmpdir, 'stuck')
+        os.mkfifo(stuck)
+
+        start = time.monotonic()
+        results = LockProber(open_for_read, timeout=0.3, max_workers=2).probe([stuck] + paths)
+        elapsed = time.monotonic() - start
+
+        assert results[stuck].locked is None
+        assert results[stuck].latency == 0.3
+        assert all(results[path].locked is False for path in paths)
+        # the stuck probe's thread was replaced, so the others didn't wait for it
+        assert elapsed < 1
+
+        # release the abandoned thread
+        os.close(os.open(stuck, os.O_WRONLY | os.O_NONBLOCK))
+
+
+def test_probes_run_concurrently():
+    def slow_probe(path):
+        time.sleep(0.2)
+        return path.endswith('locked')
+
+    paths = [f'/dev/sd{chr(97 + i)}' for i in range(8)] + ['/dev/locked']
+    start = time.monotonic()
+    results = LockProber(slow_probe, timeout=5, max_workers=9).probe(paths)
+    assert time.monotonic() - start < 1
+    assert results['/dev/locked'].locked
+    assert not results['/dev/sda'].locked
+    assert results['/dev/sda'].latency >= 0.2
+
+
+def test_devices_reject_stuck_probe():
+    release = threading.Event()
+    real_probe = devices_module.is_device_locked
+
+    def probe(path):
+        if path.endswith('/sdc'):
+            release.wait()
+        return real_probe(path)
+
+    devices_module.is_device_locked = probe
+    try:
+        with SyntheticHost(count=5) as host:
+            devices = Devices(False, root=host.root, probe_timeout=0.2)
+            by_path = {dev.path: dev for dev in devices._device_data}
+            assert by_path[host.dev('sdc')].reject_reasons == ['probe timed out']
+            assert by_path[host.dev('sdd')].available
+            assert by_path[host.dev('sdd')].lock_probe_ms < 200
+            assert by_path[host.dev('sdd')].as_dict()['lock_probe_ms'] is not None
+    finally:
+        devices_module.is_device_locked = real_probe
+        release.set()
+
+
+if __name__ == "__main__":
+    test_fifo_probe_times_out()
+    test_probes_run_concurrently()
+    test_devices_reject_stuck_probe()
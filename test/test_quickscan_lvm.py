@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import glob
+import shutil
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common.instrument import instrumentation
+from quickscan.common.lvm import (
+    LVMBackups, LVMMetadataError, is_lv_uuid, parse_metadata, split_dm_name, vg_lvs)
+from quickscan.common.topology import Topology
+from synthetic_host import SyntheticHost
+
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'lvm')
+
+
+def _scan(host, **kwargs):
+    # scan, noting which of the LVM metadata sources were used
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        devices = Devices(False, root=host.root, **kwargs)
+        return devices, sorted(set(instrumentation.report()['phases']) & {'lvm_backup', 'lvs'})
+    finally:
+        instrumentation.enable(False)
+        instrumentation.reset()
+
+
+def _osd(host, name):
+    return f'osd{host.summary["disks"].index(name)}'
+
+
+def test_parse_backup_fixture():
+    with open(os.path.join(fixture_dir, 'ceph-block-0')) as f:
+        metadata = parse_metadata(f.read())
+    assert metadata['contents'] == 'Text Format Volume Group'
+    vg = metadata['ceph-block-0']
+    assert vg['seqno'] == 7
+    assert vg['tags'] == ['ceph.cluster="prod"']
+    assert vg['logical_volumes']['scratch']['segment1']['stripes'] == ['pv0', 228927]
+
+    lvs = {lv['lv_name']: lv['lv_tags'] for lv in vg_lvs(metadata, 'ceph-block-0')}
+    assert lvs['osd-block-3'] == ('ceph.block_device=/dev/ceph-block-0/osd-block-3,'
+                                  'ceph.osd_id=3,ceph.type=block,ceph.crush_device_class=ssd')
+    assert lvs['scratch'] == ''
+    assert 'lvol0_pmspare' in lvs
+    assert vg_lvs(metadata, 'other') is None
+
+
+def test_parse_errors():
+    for text in ('vg {\n\tseqno = 1\n', 'vg {\n\tseqno = \n}', 'seqno = 1 = 2', 'vg { id = } }',
+                 'tags = ["a", "b"'):
+        try:
+            parse_metadata(text)
+        except LVMMetadataError:
+            pass
+        else:
+            raise AssertionError(f'{text!r} parsed')
+
+
+def test_dm_names():
+    assert split_dm_name('ceph--block--0-osd--block--3') == ('ceph-block-0', 'osd-block-3')
+    assert split_dm_name('vg0-lv0') == ('vg0', 'lv0')
+    assert split_dm_name('vg0-pool-tpool') is None
+    assert split_dm_name('mpatha') is None
+    assert is_lv_uuid('LVM-' + 'a' * 64)
+    assert not is_lv_uuid('LVM-' + 'a' * 64 + '-real')
+    assert not is_lv_uuid('mpath-3600508b400105e210000900000490000')
+
+
+def test_read_backups():
+    lv = {'vg_name': 'ceph-block-0', 'lv_name': 'osd-block-3'}
+    backups = LVMBackups(fixture_dir)
+    lvs = backups.read([lv])
+    assert sorted(lvs) == ['ceph-block-0-lvol0_pmspare', 'ceph-block-0-osd-block-3',
+                           'ceph-block-0-scratch']
+    # an LV the backup doesn't know about means it is stale, and a missing VG that there's none
+    assert backups.read([dict(lv, lv_name='osd-block-4')]) is None
+    assert backups.read([lv, {'vg_name': 'vg1', 'lv_name': 'lv0'}]) is None
+
+
+def test_backups_reparsed_on_change():
+    lv = {'vg_name': 'ceph-block-0', 'lv_name': 'osd-block-3'}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'ceph-block-0')
+        shutil.copy(os.path.join(fixture_dir, 'ceph-block-0'), path)
+        backups = LVMBackups(tmpdir)
+        assert 'ceph.osd_id=3' in backups.read([lv])['ceph-block-0-osd-block-3']['lv_tags']
+
+        with open(path) as f:
+            text = f.read()
+        with open(path, 'w') as f:
+            f.write(text.replace('ceph.osd_id=3', 'ceph.osd_id=12'))
+        assert 'ceph.osd_id=12' in backups.read([lv])['ceph-block-0-osd-block-3']['lv_tags']
+
+        with open(path, 'w') as f:
+            f.write('ceph-block-0 {\n\tlogical_volumes {\n')
+        assert backups.read([lv]) is None
+
+
+def test_topology_from_dm():
+    with SyntheticHost(count=15) as host:
+        # without udev's by-id links, LVs are still known from their dm name and uuid
+        for link in glob.glob(os.path.join(host.root, 'dev/disk/by-id/dm-name-*')):
+            os.remove(link)
+        topology = Topology(host.block_dir, os.path.join(host.root, 'dev'))
+        lvs = sorted(lv['lv_name'] for lv in topology.lv_devices.values())
+        assert lvs == sorted(_osd(host, name) for name in host.summary['pv'])
+        # multipath maps aren't LVs
+        assert len(topology.lv_devices) == len(host.summary['pv'])
+
+
+def test_native_matches_lvs():
+    with SyntheticHost(count=30) as host:
+        native, sources = _scan(host)
+        assert sources == ['lvm_backup']
+        forked, sources = _scan(host, native_lvm=False)
+        assert sources == ['lvs']
+        assert native._lv_metadata == forked._lv_metadata
+        assert ([dev.lvs for dev in native._device_data] ==
+                [dev.lvs for dev in forked._device_data])
+        assert any(dev.lvs for dev in native._device_data)
+
+
+def test_fallback_to_lvs():
+    with SyntheticHost(count=30) as host:
+        backup_dir = os.path.join(host.root, 'etc', 'lvm', 'backup')
+        stale_vg = f'ceph{host.summary["disks"].index(host.summary["pv"][1])}'
+        os.remove(os.path.join(backup_dir, stale_vg))
+        devices, sources = _scan(host)
+        assert sources == ['lvm_backup', 'lvs']
+        pvs = [host.dev(name) for name in host.summary['pv']]
+        assert all(dev.lvs[0]['osd_id'] for dev in devices._device_data if dev.dev_path in pvs)
+
+        shutil.rmtree(backup_dir)
+        assert _scan(host)[1] == ['lvm_backup', 'lvs']
+
+
+if __name__ == "__main__":
+    test_parse_backup_fixture()
+    test_parse_errors()
+    test_dm_names()
+    test_read_backups()
+    test_backups_reparsed_on_change()
+    test_topology_from_dm()
+    test_native_matches_lvs()
+    test_fallback_to_lvs()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import json
+import shutil
+import struct
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan import Devices
+from quickscan.common import signatures
+from quickscan.common.instrument import instrumentation
+from quickscan.common.signatures import SignatureProber, probe_signatures
+from synthetic_host import SyntheticHost, gpt_regions, vfat_regions, write_image
+
+SIZE = 64 * 1024 * 1024
+
+
+def _md(major_version):
+    return struct.pack('<II', 0xa92b4efc, major_version)
+
+
+def _ext(compat, incompat):
+    sb = bytearray(0x68)
+    struct.pack_into('<H', sb, 0x38, 0xef53)
+    struct.pack_into('<II', sb, 0x5c, compat, incompat)
+    return bytes(sb)
+
+
+def _mbr(boot_flag=0x80, part_type=0x83):
+    mbr = bytearray(512)
+    mbr[446] = boot_flag
+    mbr[446 + 4] = part_type
+    mbr[510:512] = b'\x55\xaa'
+    return bytes(mbr)
+
+
+# sparse images, as {offset: bytes} regions (negative offsets from the end), and the signatures
+# they carry: None for data the prober doesn't recognise
+IMAGES = {
+    'blank': ({}, []),
+    'data': ({1 << 20: b'not a signature'}, []),
+    'head_data': ({100: b'hello'}, None),
+    'tail_data': ({-100: b'hello'}, None),
+    'gpt': (gpt_regions(), ['gpt', 'PMBR']),
+    'gpt_backup_only': ({-512: b'EFI PART'}, ['gpt']),
+    'gpt_4k': ({4096: b'EFI PART'}, ['gpt']),
+    'dos': ({0: _mbr()}, ['dos']),
+    'dos_bad_boot_flag': ({0: _mbr(boot_flag=0x12)}, None),
+    'vfat': (vfat_regions(), None),
+    'ntfs': ({0: b'\xeb\x52\x90NTFS    ', 510: b'\x55\xaa'}, None),
+    'lvm': ({512: b'LABELONE' + bytes(16) + b'LVM2 001'}, ['LVM2_member']),
+    'lvm_sector3': ({1536: b'LABELONE' + bytes(16) + b'LVM2 001'}, ['LVM2_member']),
+    'md_1.1': ({0: _md(1)}, ['linux_raid_member']),
+    'md_1.2': ({4096: _md(1)}, ['linux_raid_member']),
+    'md_1.0': ({-8192: _md(1)}, ['linux_raid_member']),
+    'md_0.90': ({-65536: _md(0)}, ['linux_raid_member']),
+    'md_bad_version': ({4096: _md(7)}, None),
+    'bluestore': ({0: b'bluestore block device\n'}, ['ceph_bluestore']),
+    'luks': ({0: b'LUKS\xba\xbe\x00\x01'}, ['crypto_LUKS']),
+    'xfs': ({0: b'XFSB'}, ['xfs']),
+    'ext2': ({1024: _ext(0, 0x2)}, ['ext2']),
+    'ext3': ({1024: _ext(0x4, 0x2)}, ['ext3']),
+    'ext4': ({1024: _ext(0x4, 0x2 | 0x40)}, ['ext4']),
+    'btrfs': ({0x10040: b'_BHRfS_M'}, ['btrfs']),
+    'swap': ({4086: b'SWAPSPACE2'}, ['swap']),
+    'swap_64k': ({65526: b'SWAP-SPACE'}, ['swap']),
+    'lvm_and_gpt': ({**gpt_regions(), 1024: b'LABELONE' + bytes(16) + b'LVM2 001'},
+                    ['LVM2_member', 'gpt', 'PMBR']),
+}
+
+
+def test_signature_images():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, (regions, expected) in IMAGES.items():
+            path = os.path.join(tmpdir, name)
+            write_image(path, SIZE, regions)
+            assert probe_signatures(path) == expected, name
+
+        # devices smaller than the regions read, and ones that can't be opened
+        path = os.path.join(tmpdir, 'tiny')
+        write_image(path, 1000, {})
+        assert probe_signatures(path) == []
+        write_image(path, 1000, {512: b'EFI PART'})
+        assert probe_signatures(path) == ['gpt']
+        assert probe_signatures(os.path.join(tmpdir, 'missing')) is None
+
+
+def test_matches_wipefs():
+    # only where libblkid accepts a bare magic value (it checks the checksums of GPT, LVM and
+    # md headers, and the rest of an xfs or swap superblock)
+    if not shutil.which('wipefs'):
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for name in ('blank', 'data', 'bluestore', 'luks', 'btrfs'):
+            paths.append(os.path.join(tmpdir, name))
+            write_image(paths[-1], SIZE, IMAGES[name][0])
+        out = subprocess.run(['wipefs', '-J', '--noheadings'] + paths, stdout=subprocess.PIPE,
+                             check=True).stdout
+        found = {path: [] for path in paths}
+        for sig in json.loads(out)['signatures'] if out.strip() else []:
+            found[os.path.join(tmpdir, sig['device'])].append(sig['type'])
+        for path in paths:
+            assert probe_signatures(path) == found[path], path
+
+
+def test_buffers_reused():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = {}
+        for name, (regions, expected) in IMAGES.items():
+            paths[os.path.join(tmpdir, name)] = expected
+            write_image(os.path.join(tmpdir, name), SIZE, regions)
+        # a small blank device probed after ones full of data sees none of their leftovers
+        paths[os.path.join(tmpdir, 'tiny')] = []
+        write_image(os.path.join(tmpdir, 'tiny'), 5000, {})
+
+        instrumentation.reset()
+        instrumentation.enable()
+        try:
+            prober = SignatureProber()
+            assert [prober.probe(path) for path in paths] == list(paths.values())
+            assert prober.allocations == 1
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for _i in range(5):
+                    assert list(executor.map(prober.probe, paths)) == list(paths.values())
+            assert prober.allocations <= 4
+
+            counters = instrumentation.report()['counters']
+            per_device = signatures.head_size + signatures.tail_size
+            assert counters['bytes_read'] == 6 * ((len(paths) - 1) * per_device + 2 * 5000)
+            assert counters['buffer_allocations'] == prober.allocations
+        finally:
+            instrumentation.enable(False)
+            instrumentation.reset()
+
+
+def test_window_coverage():
+    # data anywhere in the head and tail windows is looked at more closely, data between them
+    # isn't read at all - a VMFS volume header at 1MiB reads as blank
+    head, tail = signatures.head_size, signatures.tail_size
+    cases = {
+        'head_end': ({head - 1: b'x'}, None),
+        'after_head': ({head: b'x'}, []),
+        'tail_start': ({-tail: b'x'}, None),
+        'before_tail': ({-tail - 1: b'x'}, []),
+        'vmfs': ({1 << 20: struct.pack('<I', 0x2fabf15e)}, []),
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, (regions, expected) in cases.items():
+            path = os.path.join(tmpdir, name)
+            write_image(path, SIZE, regions)
+            assert probe_signatures(path) == expected, name
+
+
+def test_pread_fallback():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        preadv = signatures._preadv
+        signatures._preadv = False
+        try:
+            prober = SignatureProber()
+            for name in ('blank', 'head_data', 'gpt', 'md_0.90'):
+                regions, expected = IMAGES[name]
+                write_image(os.path.join(tmpdir, name), SIZE, regions)
+                assert prober.probe(os.path.join(tmpdir, name)) == expected, name
+        finally:
+            signatures._preadv = preadv
+
+
+def test_devices_native_matches_wipefs():
+    with SyntheticHost(count=30) as host:
+        native = Devices(False, root=host.root)
+        forked = Devices(False, root=host.root, native_signatures=False)
+        reasons = {dev.path: dev.reject_reasons for dev in native._device_data}
+        assert reasons == {dev.path: dev.reject_reasons for dev in forked._device_data}
+        # the FAT file system was left to wipefs
+        for name in host.summary['signature']:
+            types = ','.join(host.summary['signatures'][name])
+            assert reasons[host.dev(name)] == [f'{types} detected']
+
+
+if __name__ == "__main__":
+    test_signature_images()
+    test_matches_wipefs()
+    test_buffers_reused()
+    test_window_coverage()
+    test_pread_fallback()
+    test_devices_native_matches_wipefs()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import re
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common import utils
+from synthetic_host import SyntheticHost
+
+QUICKSCAN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'quickscan',
+                         'quickscan.py')
+# only imported when they're used
+DEFERRED = ['asyncio', 'lsm', 'cProfile', 'pstats', 'quickscan.quickscan.daemon',
+            'quickscan.common.concurrent']
+
+
+def imported_modules(args, cwd):
+    completed = subprocess.run([sys.executable, '-X', 'importtime', QUICKSCAN] + args, cwd=cwd,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    assert completed.returncode == 0, completed.stderr
+    return {match.group(1) for match in re.finditer(r'^import time:.*\|\s*(\S+)$',
+                                                    completed.stderr, re.MULTILINE)}
+
+
+def test_scan_skips_deferred_imports():
+    with SyntheticHost(count=12, signature_every=100) as host:
+        for args in (['--skip-analysis'], ['--format', 'ndjson']):
+            modules = imported_modules(['--root', host.root, '--no-cache'] + args, host.root)
+            assert 'quickscan.quickscan.devices' in modules
+            assert not modules.intersection(DEFERRED), args
+
+        # data only wipefs can identify brings in the asyncio runner
+        modules = imported_modules(['--root', host.root, '--no-cache', '--use-wipefs'],
+                                   host.root)
+        assert 'asyncio' in modules
+
+
+def test_find_program():
+    with SyntheticHost(count=2) as host:
+        lvs = os.path.join(host.summary['bin_dir'], 'lvs')
+        assert utils.find_program('lvs') == lvs
+        assert utils.find_program('no-such-program') is None
+        # remembered, but checked again before being returned
+        os.remove(lvs)
+        assert utils.find_program('lvs') != lvs
+
+
+if __name__ == "__main__":
+    test_scan_skips_deferred_imports()
+    test_find_program()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import src  # noqa: F401 - puts the quickscan package on sys.path
+
+from quickscan.common.sysfs import BlockIndex, read_device_attributes
+from quickscan.common.topology import Topology
+from quickscan.common.utils import read_file, resolve_link, scan_links
+from quickscan.quickscan.devices import BaseDevice
+from synthetic_host import make_block_dir, make_host
+
+ATTRIBUTES = BaseDevice._sysfs_attributes + ['device/missing', 'not_there']
+
+
+def test_matches_read_file():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        names = make_block_dir(tmpdir, 3)
+        for name in names:
+            dev_dir = os.path.join(tmpdir, name)
+            data = read_device_attributes(dev_dir, ATTRIBUTES)
+            assert data == {a: read_file(os.path.join(dev_dir, a)) for a in ATTRIBUTES}
+            assert data['not_there'] == 'unknown'
+            assert data['queue/logical_block_size'] == '512'
+
+
+def test_block_index():
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, 30)
+        block_dir = os.path.join(root, 'sys', 'block')
+        index = BlockIndex(block_dir)
+        for name in summary['partitioned']:
+            assert index.partitions[name] == [f'{name}1']
+        for name in summary['pv']:
+            assert index.holders[name][0].startswith('dm-')
+        mpath, node, partner = summary['mpath'][0]
+        assert index.holders[node] == index.holders[partner]
+        assert index.bsg['sdc'] == '0:0:2:0'
+        assert 'dm-0' in index.holders
+
+        os.rename(os.path.join(block_dir, 'sdc'), os.path.join(root, 'sdc'))
+        index.update(['sdc'])
+        assert 'sdc' not in index.bsg
+
+
+def test_topology():
+    with tempfile.TemporaryDirectory() as root:
+        summary = make_host(root, 30)
+        block_dir = os.path.join(root, 'sys', 'block')
+        topology = Topology(block_dir, os.path.join(root, 'dev'))
+        assert topology.name('8:32') == 'sdc'
+        assert topology.scsi_addr('8:32') == topology.scsi_addr('sdc') == '0:0:2:0'
+        for name in summary['pv']:
+            assert topology.is_pv(name)
+            lv_dev = topology.holders(name)[0]
+            assert topology.lv(lv_dev)['lv_name']
+            assert topology.held_by(lv_dev) == [name]
+            assert topology.links(name)[0].startswith('lvm-pv-uuid-')
+        mpath, node, partner = summary['mpath'][0]
+        map_dev = topology.holders(node)[0]
+        assert topology.mpath_device(map_dev).endswith(mpath)
+        assert topology.held_by(map_dev) == sorted([node, partner])
+        assert not topology.is_pv('sdc')
+
+        os.rename(os.path.join(block_dir, 'sdc'), os.path.join(root, 'sdc'))
+        updated = topology.updated([])
+        assert updated.name('8:32') == '8:32'
+        assert updated.scsi_addr('sdc') == ''
+        # the topology it was updated from is left as it was
+        assert topology.scsi_addr('sdc') == '0:0:2:0'
+
+
+def test_scan_links():
+    with tempfile.TemporaryDirectory() as root:
+        dev_dir = os.path.join(root, 'dev')
+        by_id = os.path.join(dev_dir, 'disk', 'by-id')
+        mapper = os.path.join(dev_dir, 'mapper')
+        os.makedirs(by_id)
+        os.makedirs(mapper)
+        for name in ('sda', 'dm-0', 'dm-1'):
+            open(os.path.join(dev_dir, name), 'w').close()
+        os.symlink('../../sda', os.path.join(by_id, 'lvm-pv-uuid-abc'))
+        os.symlink('../../sda', os.path.join(by_id, 'wwn-0x5000c500'))
+        os.symlink('../dm-0', os.path.join(mapper, 'mpatha'))
+        # a link to a link, a device node in place of a link, and a loop
+        os.symlink('../../mapper/mpatha', os.path.join(by_id, 'dm-name-mpatha'))
+        open(os.path.join(mapper, 'mpathb'), 'w').close()
+        os.symlink('mpathd', os.path.join(mapper, 'mpathc'))
+        os.symlink('mpathc', os.path.join(mapper, 'mpathd'))
+
+        resolved = {}
+        links = scan_links(by_id, ('lvm-pv-uuid-', 'dm-name-'), resolved)
+        assert links == {'lvm-pv-uuid-': [(os.path.join(by_id, 'lvm-pv-uuid-abc'), 'sda')],
+                         'dm-name-': [(os.path.join(by_id, 'dm-name-mpatha'), 'dm-0')]}
+        mpaths = scan_links(mapper, ('mpath',), resolved)['mpath']
+        assert [target for _link, target in mpaths[:2]] == ['dm-0', 'mpathb']
+        for link, target in mpaths[:2] + links['lvm-pv-uuid-'] + links['dm-name-']:
+            assert target == Path(link).resolve().name
+        assert resolve_link(os.path.join(mapper, 'mpathc'), resolved) in ('mpathc', 'mpathd')
+        # the shared cache resolved the mpatha link once
+        assert resolved[os.path.join(mapper, 'mpatha')] == 'dm-0'
+        assert scan_links(os.path.join(root, 'missing'), ('x',), resolved) == {'x': []}
+
+
+if __name__ == "__main__":
+    test_matches_read_file()
+    test_block_index()
+    test_topology()
+    test_scan_links()